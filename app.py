@@ -7,6 +7,11 @@ Delegates storage, PDF, validation, and extraction to the pdfharvest package.
 from __future__ import annotations
 
 import os
+import tempfile
+import threading
+import time
+import weakref
+from functools import partial
 from pathlib import Path
 
 import pandas as pd
@@ -14,13 +19,27 @@ import streamlit as st
 
 from pdfharvest import (
     OUTPUT_FORMAT_CSV,
+    OUTPUT_FORMAT_TSV,
     OUTPUT_FORMATS,
     get_storage_dir,
 )
+from pdfharvest.columnar import columnar_available, write_columnar
 from pdfharvest.config import (
+    COLUMNAR_OUTPUT_FORMATS,
     ENV_OPENROUTER_API_KEY,
     ENV_OPENROUTER_MODEL,
     DEFAULT_OPENROUTER_MODEL,
+    DEFAULT_PACK_TOKENS,
+    MAX_CONCURRENCY_LIMIT,
+    OCR_MODES,
+    OUTPUT_FILE_EXTENSIONS,
+    OUTPUT_FORMAT_ARROW,
+    OUTPUT_FORMAT_PARQUET,
+    TEXT_OUTPUT_FORMATS,
+    get_hedge_enabled,
+    get_hedge_model,
+    get_results_dir,
+    get_use_workers,
 )
 from pdfharvest.exceptions import (
     ExtractionError,
@@ -28,13 +47,57 @@ from pdfharvest.exceptions import (
     StorageError,
     ValidationError,
 )
-from pdfharvest.extraction import run_extraction, serialize_rows
-from pdfharvest.storage import remove_if_exists, save_upload_to_storage
-from pdfharvest.pdf_utils import get_total_pages
+from pdfharvest.cache import PageTextCache, ResponseCache
+from pdfharvest.extraction import collect_page_results, write_rows
+from pdfharvest.hedging import HedgePolicy
+from pdfharvest.job_queue import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JobQueue
+from pdfharvest.jobs import create_job, delete_job, iter_job, list_jobs, load_job
+from pdfharvest.llm_clients import LlmClientPool, api_key_hash
+from pdfharvest.storage import StoredUpload, release_upload, save_upload_to_storage
+from pdfharvest.pdf_utils import Document, OcrResult, get_total_pages
+from pdfharvest.row_store import RowStore
+from pdfharvest.scheduler import LlmScheduler
+from pdfharvest.telemetry import RunSummary, Telemetry
 from pdfharvest.validation import validate_page_range
 
 st.set_page_config(page_title="pdfharvest", layout="wide")
 
+# With PDFHARVEST_USE_WORKERS set, jobs run in `python -m pdfharvest worker`
+# processes and this script only submits them and polls their status.
+job_queue: JobQueue | None = None
+if get_use_workers():
+    try:
+        job_queue = JobQueue.default()
+    except StorageError as e:
+        st.error(str(e))
+        st.stop()
+
+
+DOWNLOAD_MIME_TYPES = {
+    OUTPUT_FORMAT_CSV: "text/csv",
+    OUTPUT_FORMAT_TSV: "text/tab-separated-values",
+    OUTPUT_FORMAT_PARQUET: "application/vnd.apache.parquet",
+    OUTPUT_FORMAT_ARROW: "application/vnd.apache.arrow.file",
+}
+# Rows shown in the live table during extraction, and per page of the result table
+LIVE_TABLE_ROWS = 200
+RESULT_PAGE_ROWS = 1000
+
+
+@st.cache_resource
+def llm_scheduler() -> LlmScheduler:
+    """One LLM scheduler per server process, so rate limits apply across sessions."""
+    return LlmScheduler.from_env(MAX_CONCURRENCY_LIMIT)
+
+
+def rows_to_dataframe(rows: list[list[str]], width: int = 0) -> pd.DataFrame:
+    """First row as header, rest as data; normalize column count (LLM may return uneven rows)."""
+    max_cols = max(width, *(len(r) for r in rows))
+    header = list(rows[0]) + [f"col_{i}" for i in range(len(rows[0]), max_cols)]
+    data = [(row + [""] * max_cols)[:max_cols] for row in rows[1:]]
+    return pd.DataFrame(data, columns=header)
+
+
 st.title("PDF Harvest")
 st.write("Upload a PDF and provide a prompt describing what to extract.")
 
@@ -59,9 +122,87 @@ with st.sidebar:
     )
     output_format = st.selectbox(
         "Output format",
-        options=list(OUTPUT_FORMATS),
+        # Parquet and Arrow only when the optional pyarrow package is installed
+        options=list(OUTPUT_FORMATS if columnar_available() else TEXT_OUTPUT_FORMATS),
         index=0,
+        help="Parquet and Arrow keep the header as the schema, with one text column per field.",
+    )
+    max_concurrency = st.number_input(
+        "Concurrent requests",
+        min_value=1,
+        max_value=MAX_CONCURRENCY_LIMIT,
+        value=4,
+        help="Number of pages sent to the model at the same time.",
+    )
+    pack_pages = st.checkbox(
+        "Pack short pages",
+        value=False,
+        help="Send several consecutive pages per request to save prompt tokens on sparse documents.",
+    )
+    pack_tokens = st.number_input(
+        "Tokens per request",
+        min_value=100,
+        max_value=100_000,
+        value=DEFAULT_PACK_TOKENS,
+        step=500,
+        disabled=not pack_pages,
+        help="Approximate page-text budget for one packed request.",
     )
+    preprocess = st.checkbox(
+        "Strip repeated headers/footers",
+        value=False,
+        help="Remove page numbers and header/footer lines that repeat across pages, and compact "
+        "whitespace, before sending text to the model.",
+    )
+    hedge_requests = st.checkbox(
+        "Hedge slow requests",
+        value=get_hedge_enabled(),
+        help="Send a duplicate request (to PDFHARVEST_HEDGE_MODEL, if set) when a page takes much "
+        "longer than the others; the first answer is used. Costs up to 10% extra requests.",
+    )
+    stream_rows = st.checkbox(
+        "Show rows while generating",
+        value=True,
+        help="Stream model replies and show rows as they arrive, before each page finishes.",
+    )
+    ocr_mode = st.selectbox(
+        "OCR",
+        options=list(OCR_MODES),
+        index=0,
+        help="auto: OCR only pages without a usable text layer.",
+    )
+    bypass_response_cache = st.checkbox(
+        "Bypass response cache",
+        value=False,
+        help="Always call the model, even for pages it has already answered with this prompt.",
+    )
+
+    queued_job_ids = (
+        {job.job_id for job in job_queue.jobs() if job.status in (JOB_QUEUED, JOB_RUNNING)}
+        if job_queue is not None
+        else set()
+    )
+    unfinished_jobs = {
+        job.job_id: job
+        for job in list_jobs()
+        if not job.finished and job.job_id not in queued_job_ids
+    }
+    resume_job_id = None
+    resume_button = discard_button = False
+    if unfinished_jobs:
+        st.header("Unfinished jobs")
+        resume_job_id = st.selectbox(
+            "Job",
+            options=list(unfinished_jobs),
+            format_func=lambda job_id: (
+                f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(unfinished_jobs[job_id].created))}"
+                f" · {len(unfinished_jobs[job_id].pages)} page(s) done"
+                f" · {unfinished_jobs[job_id].user_prompt[:40]}"
+            ),
+            help="Jobs that stopped before finishing (error, quota, restart).",
+        )
+        resume_button = st.button("Resume", help="Continue from the first unfinished page.")
+        discard_button = st.button("Discard", help="Delete the job and its uploaded PDF.")
 
 uploaded_file = st.file_uploader("PDF file", type=["pdf"])
 user_prompt = st.text_area(
@@ -78,102 +219,424 @@ extract_button = st.button(
 
 storage_dir = get_storage_dir()
 
-if extract_button:
+
+def run_job(
+    job_id: str, api_key: str, output_format: str, document: Document | None = None
+) -> None:
+    """Run (or resume) a job with live progress and store its result in session state."""
+
+    def progress_cb(progress: float, text: str) -> None:
+        progress_bar.progress(progress, text=text)
+
+    progress_bar = st.progress(0.0, text="Extracting page 1/1")
+    ocr_results: dict[int, OcrResult] = {}
+    try:
+        page_cache: PageTextCache | None = PageTextCache.default()
+        response_cache: ResponseCache | None = ResponseCache.default(
+            bypass=bypass_response_cache
+        )
+    except StorageError:
+        page_cache = None
+        response_cache = None
+    # Spills to disk beyond PDFHARVEST_RESULT_MEMORY_MB; kept as the session's result
+    output_rows = RowStore()
+    extracted_pages = 0
+    effective_total = 0
+    live_table = st.empty()
+    last_refresh = 0.0
+    # Rows streamed for pages not yielded yet; the callback runs in request threads
+    streaming: dict[int, list[list[str]]] = {}
+    streaming_header: list[str] | None = None
+    streaming_lock = threading.Lock()
+    script_thread = threading.current_thread()
+
+    def refresh_table() -> None:
+        nonlocal last_refresh
+        # Rebuilding the table is O(rows); refresh at most every 2s
+        if time.monotonic() - last_refresh < 2.0:
+            return
+        with streaming_lock:
+            pending = [row for page in sorted(streaming) for row in streaming[page]]
+        # Header plus the latest rows, so the refresh cost does not grow with the result
+        header = output_rows.slice(0, 1) or ([streaming_header] if streaming_header else [])
+        recent = output_rows.slice(max(1, len(output_rows) - LIVE_TABLE_ROWS))
+        if header and (recent or pending):
+            live_table.dataframe(
+                rows_to_dataframe(header + recent + pending[-LIVE_TABLE_ROWS:]),
+                use_container_width=True,
+            )
+            last_refresh = time.monotonic()
+
+    def rows_cb(page_number: int, header: list[str] | None, rows: list[list[str]]) -> None:
+        nonlocal streaming_header
+        with streaming_lock:
+            streaming[page_number] = rows
+            streaming_header = streaming_header or header
+        # Streamlit elements can only be updated from the script's thread
+        if threading.current_thread() is script_thread:
+            refresh_table()
+
+    telemetry = Telemetry.default()
+    scheduler = llm_scheduler()
+    before = scheduler.stats()
+    with st.spinner("Extracting..."):
+        try:
+            for page in iter_job(
+                job_id,
+                api_key=api_key,
+                progress_callback=progress_cb,
+                max_concurrency=int(max_concurrency),
+                page_cache=page_cache,
+                response_cache=response_cache,
+                on_event=telemetry,
+                document=document,
+                scheduler=scheduler,
+                hedge=HedgePolicy(fallback_model=get_hedge_model()) if hedge_requests else None,
+                on_rows=rows_cb if stream_rows else None,
+            ):
+                effective_total += 1
+                if page.header is not None:
+                    output_rows.append(page.header)
+                output_rows.extend(page.rows)
+                extracted_pages += bool(page.rows)
+                if page.ocr_result is not None:
+                    ocr_results[page.page_number] = page.ocr_result
+                with streaming_lock:
+                    streamed = streaming.pop(page.page_number, None)
+                if page.rows or streamed:
+                    refresh_table()
+        except (ExtractionError, PDFError, StorageError) as e:
+            telemetry.finish()
+            st.error(f"{e} Completed pages are saved; resume the job from the sidebar.")
+            st.stop()
+    delete_job(job_id)
+    summary = telemetry.finish()
+    after = scheduler.stats()
+
+    progress_bar.empty()
+    live_table.empty()
+
+    store_result(
+        output_rows,
+        extracted_pages,
+        effective_total,
+        output_format,
+        ocr_results,
+        [
+            f"{label}: {cache.hits} hit(s), {cache.misses} miss(es)"
+            for label, cache in (("Page cache", page_cache), ("Response cache", response_cache))
+            if cache is not None
+        ]
+        + (
+            [
+                f"Rate limits: {after.throttled - before.throttled} request(s) throttled, "
+                f"{after.rate_limited - before.rate_limited} HTTP 429"
+            ]
+            if after.throttled > before.throttled or after.rate_limited > before.rate_limited
+            else []
+        ),
+        summary,
+    )
+
+
+def store_result(
+    output_rows: RowStore,
+    extracted_pages: int,
+    effective_total: int,
+    output_format: str,
+    ocr_results: dict[int, OcrResult],
+    cache_stats: list[str],
+    telemetry: RunSummary | None = None,
+) -> None:
+    """Keep a finished job's result in session state for display and download."""
+    drop_result()
+    if not output_rows:
+        output_rows.close()
+        st.error("No text could be extracted from the PDF.")
+        st.stop()
+    st.session_state["result"] = {
+        "rows": output_rows,
+        # Serialized files by compression, written when first downloaded
+        "downloads": {},
+        "downloads_lock": threading.Lock(),
+        "extracted_pages": extracted_pages,
+        "effective_total": effective_total,
+        "output_format": output_format,
+        "ocr_results": ocr_results,
+        "cache_stats": cache_stats,
+        "telemetry": telemetry,
+    }
+
+
+def drop_result() -> None:
+    """Forget the session's previous result and delete its spilled rows and download files."""
+    result = st.session_state.pop("result", None)
+    if result is not None:
+        result["rows"].close()
+        for _, remove in result["downloads"].values():
+            remove()
+
+
+def result_download(result: dict, compress: bool) -> bytes:
+    """
+    Contents of the result's download file, written on first use and then reused.
+
+    Rows are streamed from the RowStore to the file; only the finished file
+    is read into memory, which Streamlit needs to serve it.
+    """
+    with result["downloads_lock"]:
+        if compress not in result["downloads"]:
+            results_dir = get_results_dir()
+            results_dir.mkdir(parents=True, exist_ok=True)
+            fd, name = tempfile.mkstemp(prefix="download-", dir=str(results_dir))
+            os.close(fd)
+            path = Path(name)
+            # Deleted with the result, or with its rows when the session ends
+            remove = weakref.finalize(result["rows"], path.unlink, missing_ok=True)
+            try:
+                if result["output_format"] in COLUMNAR_OUTPUT_FORMATS:
+                    write_columnar(
+                        result["rows"], result["output_format"], path, width=result["rows"].width
+                    )
+                else:
+                    write_rows(result["rows"], result["output_format"], path, compress=compress)
+            except (StorageError, ValidationError):
+                remove()
+                raise
+            result["downloads"][compress] = (path, remove)
+        path, _ = result["downloads"][compress]
+    return path.read_bytes()
+
+
+def submit_job(job_id: str) -> None:
+    """Queue a job for the workers; the status panel below picks it up."""
+    job_queue.submit(job_id, api_key=api_key_input or None)
+    st.session_state["active_job"] = job_id
+    drop_result()
+
+
+@st.fragment(run_every=2.0)
+def job_status_panel(job_id: str) -> None:
+    """Poll a queued job; when it is done, load its result from the journal."""
+    queued = job_queue.get(job_id)
+    try:
+        job = load_job(job_id)
+    except (StorageError, ValidationError) as e:
+        st.error(str(e))
+        st.session_state.pop("active_job", None)
+        return
+    if queued is None or queued.status == JOB_FAILED:
+        error = queued.error if queued is not None else "Job is no longer queued."
+        st.error(f"{error} Completed pages are saved; resume the job from the sidebar.")
+        st.session_state.pop("active_job", None)
+        return
+    if queued.status == JOB_DONE:
+        ocr_results: dict[int, OcrResult] = {}
+        output_rows, extracted_pages, effective_total = collect_page_results(
+            job.pages, ocr_results, RowStore()
+        )
+        delete_job(job_id)
+        job_queue.remove(job_id)
+        st.session_state.pop("active_job", None)
+        store_result(output_rows, extracted_pages, effective_total, job.output_format, ocr_results, [])
+        st.rerun()
+    totals = st.session_state.setdefault("job_totals", {})
+    if job_id not in totals:
+        total = get_total_pages(job.pdf_path) - job.page_offset
+        totals[job_id] = min(total, job.limit_pages) if job.limit_pages else total
+    total = max(totals[job_id], 1)
+    st.progress(
+        min(len(job.pages) / total, 1.0),
+        text=(
+            f"Extracting page {len(job.pages)}/{total}"
+            if queued.status == JOB_RUNNING
+            else "Waiting for a worker..."
+        ),
+    )
+
+
+def _get_api_key() -> str:
     api_key = api_key_input or os.getenv(ENV_OPENROUTER_API_KEY, "")
     if not api_key:
         st.error("Missing OPENROUTER_API_KEY. Set it in the sidebar or environment.")
         st.stop()
+    # Runs share pooled HTTP clients per key; when this session switches keys,
+    # retire the old key's client instead of waiting for it to go idle
+    previous = st.session_state.get("api_key")
+    if previous is not None and api_key_hash(previous) != api_key_hash(api_key):
+        LlmClientPool.shared().discard(previous)
+    st.session_state["api_key"] = api_key
+    return api_key
 
-    stored_path: Path | None = None
+
+if resume_button and resume_job_id:
+    if job_queue is not None:
+        submit_job(resume_job_id)
+    else:
+        api_key = _get_api_key()
+        try:
+            job = load_job(resume_job_id)
+        except (StorageError, ValidationError) as e:
+            st.error(str(e))
+            st.stop()
+        run_job(job.job_id, api_key, job.output_format)
+
+if discard_button and resume_job_id:
+    delete_job(resume_job_id)
+    if job_queue is not None:
+        job_queue.remove(resume_job_id)
+    st.rerun()
+
+if extract_button:
+    # Workers fall back to their own OPENROUTER_API_KEY
+    api_key = _get_api_key() if job_queue is None else ""
+
+    upload: StoredUpload | None = None
+    # Parsed once here and reused for validation and extraction
+    document: Document | None = None
     try:
         with st.spinner("Reading PDF..."):
             try:
-                stored_path = save_upload_to_storage(uploaded_file, storage_dir)
+                upload = save_upload_to_storage(uploaded_file, storage_dir)
             except StorageError as e:
                 st.error(str(e))
                 st.stop()
 
             try:
-                total_pages = get_total_pages(stored_path)
-            except PDFError as e:
-                st.error(str(e))
-                st.stop()
-
-            try:
+                document = Document(upload.path, document_id=upload.document_id)
                 page_offset, limit_pages = validate_page_range(
                     page_offset_input,
                     limit_pages_input,
-                    total_pages,
+                    document,
                 )
-            except ValidationError as e:
+            except (PDFError, ValidationError) as e:
                 st.error(str(e))
                 st.stop()
 
-        def progress_cb(progress: float, text: str) -> None:
-            progress_bar.progress(progress, text=text)
-
-        progress_bar = st.progress(0.0, text="Extracting page 1/1")
-        with st.spinner("Extracting..."):
             try:
-                output_rows, extracted_pages, effective_total = run_extraction(
-                    stored_path,
+                job_id = create_job(
+                    upload,
                     user_prompt,
                     page_offset=page_offset,
                     limit_pages=limit_pages,
                     output_format=output_format,
-                    api_key=api_key,
                     model=model_name,
-                    progress_callback=progress_cb,
+                    ocr_mode=ocr_mode,
+                    pack_tokens=int(pack_tokens) if pack_pages else None,
+                    preprocess=preprocess,
                 )
-            except ExtractionError as e:
+            except StorageError as e:
                 st.error(str(e))
                 st.stop()
+            # The job holds the upload's reference now; released when the job is deleted
+            upload = None
 
-        progress_bar.empty()
-
-        if not output_rows:
-            st.error("No text could be extracted from the PDF.")
-            st.stop()
-
-        output_text = serialize_rows(output_rows, output_format)
-        st.session_state["result"] = {
-            "rows": output_rows,
-            "text": output_text,
-            "extracted_pages": extracted_pages,
-            "effective_total": effective_total,
-            "output_format": output_format,
-        }
+        if job_queue is not None:
+            submit_job(job_id)
+        else:
+            run_job(job_id, api_key, output_format, document)
     finally:
-        remove_if_exists(stored_path)
+        if document is not None:
+            document.close()
+        release_upload(upload)
+
+if "active_job" in st.session_state:
+    job_status_panel(st.session_state["active_job"])
 
 # Show table and download when we have a result (this run or after download click)
 if "result" in st.session_state:
     result = st.session_state["result"]
     st.subheader("Result")
     st.caption(
-        f"Pages scanned: {result['extracted_pages']} of {result['effective_total']}"
+        " · ".join(
+            [
+                f"Pages scanned: {result['extracted_pages']} of {result['effective_total']}",
+                f"OCR used on {len(result['ocr_results'])} page(s)",
+                *result["cache_stats"],
+            ]
+        )
     )
-    # First row as header, rest as data; normalize column count (LLM may return uneven rows)
-    rows = result["rows"]
+    if result["ocr_results"]:
+        with st.expander("OCR details"):
+            st.dataframe(
+                pd.DataFrame(
+                    [
+                        {
+                            "page": page,
+                            "psm": ocr.psm,
+                            "confidence": round(ocr.confidence, 1),
+                            "rotation": ocr.rotation,
+                            "passes": ocr.attempts,
+                            "seconds": round(ocr.seconds, 2),
+                            "cached": ocr.cached,
+                        }
+                        for page, ocr in sorted(result["ocr_results"].items())
+                    ]
+                ),
+                use_container_width=True,
+            )
+    summary = result.get("telemetry")
+    if summary is not None and summary.stages:
+        with st.expander("Timing"):
+            hedges = (
+                f", {summary.llm_hedges} hedged ({summary.llm_hedges_won} won)"
+                if summary.llm_hedges
+                else ""
+            )
+            st.caption(
+                f"{summary.wall_seconds:.1f}s total · {summary.llm_requests} LLM request(s), "
+                f"{summary.llm_cached} cached, {summary.llm_retries} retried{hedges} · "
+                f"{summary.prompt_tokens} prompt + {summary.completion_tokens} completion tokens"
+                + (f" · {summary.tokens_saved} tokens saved by preprocessing" if summary.tokens_saved else "")
+            )
+            st.dataframe(
+                pd.DataFrame(
+                    [
+                        {
+                            "stage": stage,
+                            "count": s.count,
+                            "wall s": round(s.wall_seconds, 2),
+                            "cpu s": round(s.cpu_seconds, 2),
+                            "p50 s": round(s.p50, 3),
+                            "p95 s": round(s.p95, 3),
+                        }
+                        for stage, s in summary.stages.items()
+                    ]
+                ),
+                use_container_width=True,
+            )
+    rows: RowStore = result["rows"]
     if rows:
-        max_cols = max(len(r) for r in rows)
-        header = list(rows[0]) + [f"col_{i}" for i in range(len(rows[0]), max_cols)]
-        data = [(row + [""] * max_cols)[:max_cols] for row in rows[1:]]
-        df = pd.DataFrame(data, columns=header)
-        st.dataframe(df, use_container_width=True)
-    file_ext = (
-        "csv"
-        if result["output_format"] == OUTPUT_FORMAT_CSV
-        else "tsv"
-    )
-    mime_type = (
-        "text/csv"
-        if result["output_format"] == OUTPUT_FORMAT_CSV
-        else "text/tab-separated-values"
+        # Only one page of rows is read back and rendered at a time
+        data_rows = len(rows) - 1
+        start = 0
+        if data_rows > RESULT_PAGE_ROWS:
+            page = st.number_input(
+                f"Page of {RESULT_PAGE_ROWS} rows",
+                min_value=1,
+                max_value=(data_rows + RESULT_PAGE_ROWS - 1) // RESULT_PAGE_ROWS,
+                value=1,
+            )
+            start = (int(page) - 1) * RESULT_PAGE_ROWS
+            st.caption(
+                f"Rows {start + 1}-{min(start + RESULT_PAGE_ROWS, data_rows)} of {data_rows}"
+            )
+        st.dataframe(
+            rows_to_dataframe(
+                rows.slice(0, 1) + rows.slice(start + 1, start + 1 + RESULT_PAGE_ROWS), rows.width
+            ),
+            use_container_width=True,
+        )
+    file_ext = OUTPUT_FILE_EXTENSIONS[result["output_format"]]
+    mime_type = DOWNLOAD_MIME_TYPES[result["output_format"]]
+    # Parquet is compressed internally; Arrow files are meant to be memory-mapped
+    compress = result["output_format"] not in COLUMNAR_OUTPUT_FORMATS and st.checkbox(
+        "Compress download (gzip)", value=False
     )
     st.download_button(
         label="Download result",
-        data=result["text"],
-        file_name=f"extraction.{file_ext}",
-        mime=mime_type,
+        # Called on click, so reruns do not serialize the result
+        data=partial(result_download, result, compress),
+        file_name=f"extraction.{file_ext}.gz" if compress else f"extraction.{file_ext}",
+        mime="application/gzip" if compress else mime_type,
     )
@@ -0,0 +1 @@
+"""Offline benchmarks for the pdfharvest pipeline: ``python -m benchmarks.run``."""
@@ -0,0 +1,138 @@
+"""Synthetic PDF corpora: text-layer, scanned-image, mixed and very large documents."""
+
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+PAGE_WIDTH_PT = 612
+PAGE_HEIGHT_PT = 792
+RASTER_DPI = 150
+
+_FIRST = ("Andy", "Bill", "Carla", "Dana", "Eve", "Frank", "Gina", "Hal")
+_LAST = ("Sos", "Schmit", "Nguyen", "Okafor", "Rossi", "Kowalski", "Haddad", "Berg")
+_STREETS = ("Sills Road", "Taylor Hollow Road", "School Street", "Main Street", "Lake Ave")
+_CITIES = ("Yonkers, NY 11980", "Collins, NY 14034", "Orchard Park, NY 14127", "Albany, NY 12207")
+
+
+def contact_lines(rng: random.Random, records: int) -> list[str]:
+    """Directory-style contact records like the ones prompts.md targets."""
+    lines: list[str] = []
+    for _ in range(records):
+        first, last = rng.choice(_FIRST), rng.choice(_LAST)
+        lines += [
+            f"{last.upper()} {rng.choice(('SUPPLY', 'ELECTRIC', 'REBAR', 'ASPHALT'))}, INC.",
+            f"{rng.randint(1, 9999)} {rng.choice(_STREETS)}",
+            rng.choice(_CITIES),
+            f"p: (555) {rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+            f"{first} {last}, {rng.choice(('President', 'Owner', 'Estimator', 'Manager'))}",
+            f"{first.lower()}@{last.lower()}.com",
+            "",
+        ]
+    return lines
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path: Path, pages: int, *, records_per_page: int = 6, seed: int = 0) -> Path:
+    """Born-digital pages: a Helvetica text layer, no images."""
+    rng = random.Random(seed)
+    writer = PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    for _ in range(pages):
+        page = writer.add_blank_page(width=PAGE_WIDTH_PT, height=PAGE_HEIGHT_PT)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+        )
+        ops = ["BT /F1 10 Tf 12 TL 72 740 Td"]
+        ops += [f"({_escape(line)}) Tj T*" for line in contact_lines(rng, records_per_page)]
+        ops.append("ET")
+        content = DecodedStreamObject()
+        content.set_data("\n".join(ops).encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(content)
+    with path.open("wb") as f:
+        writer.write(f)
+    return path
+
+
+def _scan_image(rng: random.Random, records: int, dpi: int) -> Image.Image:
+    width, height = PAGE_WIDTH_PT * dpi // 72, PAGE_HEIGHT_PT * dpi // 72
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    font_size = max(dpi // 6, 10)
+    try:
+        font = ImageFont.load_default(size=font_size)
+    except TypeError:  # Pillow < 10.1: fixed-size bitmap font
+        font = None
+    y = dpi
+    for line in contact_lines(rng, records):
+        draw.text((dpi, y), line, fill=0, font=font)
+        y += int(font_size * 1.4)
+    # Scanner speckle, so the image does not compress to nothing
+    for _ in range(width * height // 2000):
+        draw.point((rng.randrange(width), rng.randrange(height)), fill=rng.randint(120, 200))
+    return image
+
+
+def write_raster_pdf(
+    path: Path, pages: int, *, records_per_page: int = 6, dpi: int = RASTER_DPI, seed: int = 0
+) -> Path:
+    """Scanned pages: one full-page grayscale image each, no text layer."""
+    rng = random.Random(seed)
+    images = [_scan_image(rng, records_per_page, dpi) for _ in range(pages)]
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=dpi)
+    return path
+
+
+def write_mixed_pdf(path: Path, pages: int, *, scanned_every: int = 3, seed: int = 0) -> Path:
+    """Text-layer pages with every `scanned_every`-th page a scan."""
+    scanned = max(pages // scanned_every, 1)
+    text_path = write_text_pdf(path.with_suffix(".text.pdf"), pages - scanned, seed=seed)
+    raster_path = write_raster_pdf(path.with_suffix(".scan.pdf"), scanned, seed=seed)
+    text_pages = iter(PdfReader(str(text_path)).pages)
+    scan_pages = iter(PdfReader(str(raster_path)).pages)
+    writer = PdfWriter()
+    for n in range(1, pages + 1):
+        page = next(scan_pages, None) if n % scanned_every == 0 else None
+        writer.add_page(page if page is not None else next(text_pages))
+    with path.open("wb") as f:
+        writer.write(f)
+    text_path.unlink()
+    raster_path.unlink()
+    return path
+
+
+def build_corpus(
+    out_dir: Path,
+    *,
+    text_pages: int = 20,
+    raster_pages: int = 4,
+    mixed_pages: int = 12,
+    large_pages: int = 2000,
+) -> dict[str, Path]:
+    """Write every corpus into out_dir; a size of 0 leaves that corpus out."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    corpus: dict[str, Path] = {}
+    if text_pages:
+        corpus["text"] = write_text_pdf(out_dir / "text.pdf", text_pages)
+    if raster_pages:
+        corpus["raster"] = write_raster_pdf(out_dir / "raster.pdf", raster_pages)
+    if mixed_pages:
+        corpus["mixed"] = write_mixed_pdf(out_dir / "mixed.pdf", mixed_pages)
+    if large_pages:
+        corpus["large"] = write_text_pdf(out_dir / "large.pdf", large_pages, records_per_page=3)
+    return corpus
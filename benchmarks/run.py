@@ -0,0 +1,311 @@
+"""
+Time each pipeline stage on synthetic corpora and write the results as JSON.
+
+Runs offline: the LLM is a stub with configurable latency, and OCR stages
+are skipped (and reported as such) when poppler or Tesseract is missing.
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --quick --compare bench.json --max-regression 1.25
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Sequence
+from unittest.mock import patch
+
+from PIL import Image
+from pypdf import PdfReader
+
+from benchmarks.corpus import build_corpus
+from pdfharvest.config import OCR_MODE_AUTO, OCR_MODE_NEVER, OUTPUT_FORMAT_CSV
+from pdfharvest.extraction import parse_rows, run_extraction, serialize_rows
+from pdfharvest.pdf_utils import (
+    Document,
+    extract_text_from_page,
+    get_total_pages,
+    needs_ocr,
+    ocr_image,
+    profile_page,
+    render_pages,
+)
+
+# Bump when the result layout changes
+RESULTS_SCHEMA = 1
+
+_PAGE_MARKER_RE = re.compile(r"\[Page (\d+)\]")
+
+
+class StubLLM:
+    """Stands in for ChatOpenAI: sleeps, then answers one CSV row per contact record."""
+
+    def __init__(self, latency: float, jitter: float = 0.0, seed: int = 0) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    def invoke(self, messages: Sequence[Any]) -> Any:
+        self.calls += 1
+        time.sleep(max(self.latency + self._rng.uniform(-self.jitter, self.jitter), 0.0))
+        human = messages[-1].content
+        lines = ["page_number,contact_email"] if "include_header: yes" in human else []
+        for block in _PAGE_MARKER_RE.split(human)[1:]:
+            if block.isdigit():
+                page = block
+                continue
+            lines += [f"{page},{word}" for word in block.split() if "@" in word]
+        return type("Reply", (), {"content": "\n".join(lines)})()
+
+
+class Timings:
+    """Wall-clock samples per stage name."""
+
+    def __init__(self) -> None:
+        self.samples: dict[str, list[float]] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples.setdefault(name, []).append(time.perf_counter() - started)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {name: summarize(samples) for name, samples in self.samples.items()}
+
+
+def summarize(samples: Sequence[float]) -> dict[str, float]:
+    """Count, total and millisecond percentiles of a list of durations in seconds."""
+    ordered = sorted(samples)
+
+    def pct(q: float) -> float:
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {
+        "count": len(ordered),
+        "total_s": round(sum(ordered), 6),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(pct(0.5), 3),
+        "p95_ms": round(pct(0.95), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def ocr_tools_available() -> tuple[bool, bool]:
+    """(poppler available, tesseract available)."""
+    return shutil.which("pdftoppm") is not None, shutil.which("tesseract") is not None
+
+
+def bench_document(
+    pdf_path: Path,
+    *,
+    repeat: int,
+    llm_latency: float,
+    max_concurrency: int,
+    render: bool,
+    tesseract: bool,
+) -> dict[str, Any]:
+    """Time every stage on one document; returns its result entry."""
+    timings = Timings()
+    for _ in range(repeat):
+        with timings.stage("get_total_pages"):
+            pages = get_total_pages(pdf_path)
+        with timings.stage("open_document"):
+            with Document(pdf_path) as document:
+                document.page_count
+
+    reader = PdfReader(str(pdf_path))
+    ocr_pages: list[int] = []
+    for idx in range(pages):
+        with timings.stage("extract_text_from_page"):
+            extract_text_from_page(reader, idx)
+        with timings.stage("profile_page"):
+            profile = profile_page(reader, idx)
+        if needs_ocr(profile, OCR_MODE_AUTO):
+            ocr_pages.append(idx + 1)
+
+    if render:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for page in ocr_pages:
+                with timings.stage("ocr_render"):
+                    rendered = render_pages(pdf_path, page, page, temp_dir)
+                if tesseract and page in rendered:
+                    with Image.open(rendered[page]) as image:
+                        with timings.stage("ocr_tesseract"):
+                            ocr_image(image)
+
+    llm = StubLLM(llm_latency)
+    ocr_mode = OCR_MODE_AUTO if render and tesseract else OCR_MODE_NEVER
+    with patch("pdfharvest.extraction._build_llm", return_value=llm):
+        with timings.stage("run_extraction"):
+            rows, _, _ = run_extraction(
+                pdf_path,
+                "Extract every contact email.",
+                output_format=OUTPUT_FORMAT_CSV,
+                api_key="stub",
+                model="stub",
+                max_concurrency=max_concurrency,
+                ocr_mode=ocr_mode,
+                ocr_workers=1,
+            )
+
+    output = serialize_rows(rows, OUTPUT_FORMAT_CSV)
+    for _ in range(repeat):
+        with timings.stage("parse_rows"):
+            parse_rows(output, ",")
+        with timings.stage("serialize_rows"):
+            serialize_rows(rows, OUTPUT_FORMAT_CSV)
+
+    total = timings.samples["run_extraction"][0]
+    return {
+        "pages": pages,
+        "bytes": pdf_path.stat().st_size,
+        "ocr_pages": len(ocr_pages),
+        "rows": max(len(rows) - 1, 0),
+        "llm_calls": llm.calls,
+        "ocr_mode": ocr_mode,
+        "pages_per_second": round(pages / total, 3) if total else None,
+        "stages": timings.summary(),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Build the corpora and benchmark each; returns the results document."""
+    has_poppler, has_tesseract = ocr_tools_available()
+    skipped = []
+    if not has_poppler:
+        skipped.append("ocr_render: pdftoppm (poppler) not found")
+    if not has_tesseract:
+        skipped.append("ocr_tesseract: tesseract not found")
+    sizes = {
+        "text_pages": args.text_pages,
+        "raster_pages": args.raster_pages,
+        "mixed_pages": args.mixed_pages,
+        "large_pages": args.large_pages,
+    }
+    corpora: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        started = time.perf_counter()
+        corpus = build_corpus(Path(corpus_dir), **sizes)
+        build_seconds = time.perf_counter() - started
+        for name, pdf_path in corpus.items():
+            print(f"{name}: benchmarking...", file=sys.stderr, flush=True)
+            corpora[name] = bench_document(
+                pdf_path,
+                repeat=args.repeat,
+                llm_latency=args.llm_latency,
+                max_concurrency=args.concurrency,
+                render=has_poppler,
+                tesseract=has_tesseract,
+            )
+    return {
+        "schema": RESULTS_SCHEMA,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            **sizes,
+            "repeat": args.repeat,
+            "llm_latency": args.llm_latency,
+            "concurrency": args.concurrency,
+        },
+        "corpus_build_seconds": round(build_seconds, 3),
+        "skipped": skipped,
+        "corpora": corpora,
+    }
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any]) -> list[tuple[str, float, float, float]]:
+    """(corpus/stage, baseline p50 ms, current p50 ms, ratio) for stages in both runs."""
+    rows = []
+    for name, corpus in current["corpora"].items():
+        base_stages = baseline.get("corpora", {}).get(name, {}).get("stages", {})
+        for stage, stats in corpus["stages"].items():
+            base = base_stages.get(stage)
+            if base is None or not base["p50_ms"]:
+                continue
+            rows.append(
+                (f"{name}/{stage}", base["p50_ms"], stats["p50_ms"], stats["p50_ms"] / base["p50_ms"])
+            )
+    return rows
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--text-pages", type=int, default=50)
+    parser.add_argument("--raster-pages", type=int, default=6)
+    parser.add_argument("--mixed-pages", type=int, default=30)
+    parser.add_argument("--large-pages", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions of per-document stages.")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Stub LLM seconds per call.")
+    parser.add_argument("--concurrency", type=int, default=4, help="LLM requests in flight.")
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Small corpora and no LLM latency, for a fast smoke run.",
+    )
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline results JSON.")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=None,
+        help="With --compare, exit 1 if any stage p50 grows by more than this factor.",
+    )
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.quick:
+        args.text_pages, args.raster_pages, args.mixed_pages, args.large_pages = 10, 2, 6, 200
+        args.repeat, args.llm_latency = 2, 0.0
+    # Read the baseline first: --output may point at the same file
+    baseline = json.loads(args.compare.read_text(encoding="utf-8")) if args.compare else None
+    results = run(args)
+    args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    print(f"Results written to {args.output}", file=sys.stderr)
+    for line in results["skipped"]:
+        print(f"skipped {line}", file=sys.stderr)
+    if baseline is None:
+        return 0
+    regressed = False
+    print(f"{'stage':40} {'base p50':>10} {'now p50':>10} {'ratio':>7}")
+    for stage, base, now, ratio in compare(baseline, results):
+        flag = args.max_regression is not None and ratio > args.max_regression
+        regressed |= flag
+        print(f"{stage:40} {base:10.3f} {now:10.3f} {ratio:7.2f}{'  REGRESSED' if flag else ''}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
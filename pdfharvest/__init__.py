@@ -12,7 +12,9 @@ from pdfharvest.exceptions import (
     ValidationError,
 )
 from pdfharvest.config import (
+    OUTPUT_FORMAT_ARROW,
     OUTPUT_FORMAT_CSV,
+    OUTPUT_FORMAT_PARQUET,
     OUTPUT_FORMAT_TSV,
     OUTPUT_FORMATS,
     get_storage_dir,
@@ -25,7 +27,9 @@ __all__ = [
     "StorageError",
     "ValidationError",
     "get_storage_dir",
+    "OUTPUT_FORMAT_ARROW",
     "OUTPUT_FORMAT_CSV",
+    "OUTPUT_FORMAT_PARQUET",
     "OUTPUT_FORMAT_TSV",
     "OUTPUT_FORMATS",
 ]
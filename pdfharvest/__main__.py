@@ -0,0 +1,7 @@
+"""Allow ``python -m pdfharvest``."""
+
+import sys
+
+from pdfharvest.cli import main
+
+sys.exit(main())
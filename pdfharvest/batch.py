@@ -0,0 +1,415 @@
+"""Headless batch extraction over many PDFs, parallel across documents."""
+
+from __future__ import annotations
+
+import csv
+import glob
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Sequence
+
+from pdfharvest.cache import PageTextCache, ResponseCache
+from pdfharvest.columnar import ColumnarWriter, require_columnar
+from pdfharvest.config import (
+    COLUMNAR_OUTPUT_FORMATS,
+    DEFAULT_BATCH_MAX_REQUESTS,
+    DEFAULT_OCR_MODE,
+    OUTPUT_FILE_EXTENSIONS,
+    OUTPUT_FORMAT_CSV,
+)
+from pdfharvest.exceptions import PDFHarvestError, StorageError, ValidationError
+from pdfharvest.extraction import run_extraction, write_rows
+from pdfharvest.hedging import HedgePolicy
+from pdfharvest.pdf_utils import Document
+from pdfharvest.row_store import RowStore
+from pdfharvest.scheduler import LlmScheduler
+from pdfharvest.telemetry import STAGE_LLM, STAGE_OCR, Telemetry
+from pdfharvest.validation import validate_page_range
+
+SUMMARY_FILE_NAME = "summary.csv"
+
+# Global LLM request semaphore, installed in each worker process by _init_worker
+_llm_slots: Any = None
+# Per-process LLM scheduler holding this process's share of the rate limits
+_scheduler: LlmScheduler | None = None
+
+
+@dataclass
+class DocumentResult:
+    """Outcome and timing of one document in a batch."""
+
+    pdf_path: Path
+    output_path: Path | None = None
+    pages: int = 0
+    extracted_pages: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+    llm_seconds: float = 0.0
+    ocr_seconds: float = 0.0
+    llm_requests: int = 0
+    llm_hedges: int = 0
+    llm_hedges_won: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tokens_saved: int = 0
+    error: str | None = None
+    skipped: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def find_pdfs(inputs: Sequence[str]) -> list[Path]:
+    """
+    Expand directories (their *.pdf files), glob patterns and file paths.
+
+    Returns:
+        Unique PDF paths in input order (sorted within each input).
+
+    Raises:
+        ValidationError: If an input matches no PDF.
+    """
+    found: dict[Path, None] = {}
+    for raw in inputs:
+        path = Path(raw)
+        if path.is_dir():
+            matches = sorted(p for p in path.iterdir() if p.suffix.lower() == ".pdf")
+        elif path.is_file():
+            matches = [path]
+        else:
+            matches = sorted(Path(p) for p in glob.glob(raw, recursive=True))
+            matches = [p for p in matches if p.is_file() and p.suffix.lower() == ".pdf"]
+        if not matches:
+            raise ValidationError(f"No PDF files found for {raw!r}.")
+        for match in matches:
+            found.setdefault(match.resolve(), None)
+    return list(found)
+
+
+def load_prompt(path: Path, name: str | None = None) -> str:
+    """
+    Read an extraction prompt from a file.
+
+    With a name, the file is read as a prompt collection like prompts.md (a
+    "# NAME" heading followed by a fenced block) and that prompt is returned.
+    Otherwise the whole file is the prompt (one surrounding code fence is
+    removed).
+
+    Raises:
+        ValidationError: If the file is unreadable, empty, or has no such prompt.
+    """
+    try:
+        text = path.read_text(encoding="utf-8")
+    except OSError as e:
+        raise ValidationError(f"Cannot read prompt file {path}: {e}") from e
+    if name is not None:
+        match = re.search(
+            rf"^#\s*{re.escape(name)}\s*\n```[^\n]*\n(.*?)\n```",
+            text,
+            re.MULTILINE | re.DOTALL | re.IGNORECASE,
+        )
+        if match is None:
+            raise ValidationError(f"Prompt {name!r} not found in {path}.")
+        text = match.group(1)
+    else:
+        fenced = re.fullmatch(r"\s*```[^\n]*\n(.*?)\n```\s*", text, re.DOTALL)
+        if fenced is not None:
+            text = fenced.group(1)
+    if not text.strip():
+        raise ValidationError(f"Prompt file {path} is empty.")
+    return text.strip()
+
+
+def _output_paths(
+    pdf_paths: Sequence[Path], output_dir: Path, output_format: str, compress: bool = False
+) -> list[Path]:
+    """One output file per document, named after it; repeated stems get a suffix."""
+    extension = OUTPUT_FILE_EXTENSIONS[output_format]
+    if compress and output_format not in COLUMNAR_OUTPUT_FORMATS:
+        extension += ".gz"
+    seen: dict[str, int] = {}
+    paths = []
+    for pdf_path in pdf_paths:
+        stem = pdf_path.stem
+        count = seen.get(stem, 0)
+        seen[stem] = count + 1
+        name = f"{stem}-{count + 1}" if count else stem
+        paths.append(output_dir / f"{name}.{extension}")
+    return paths
+
+
+def _init_worker(llm_slots: Any, max_requests: int, rate_share: float) -> None:
+    global _llm_slots, _scheduler
+    _llm_slots = llm_slots
+    _scheduler = LlmScheduler.from_env(max_requests, share=rate_share)
+
+
+def process_document(
+    pdf_path: Path,
+    output_path: Path,
+    user_prompt: str,
+    *,
+    page_offset_raw: str = "",
+    limit_pages_raw: str = "",
+    output_format: str = OUTPUT_FORMAT_CSV,
+    api_key: str,
+    model: str,
+    max_concurrency: int = DEFAULT_BATCH_MAX_REQUESTS,
+    ocr_mode: str = DEFAULT_OCR_MODE,
+    ocr_workers: int = 1,
+    use_cache: bool = True,
+    preprocess: bool = False,
+    hedge: HedgePolicy | None = None,
+    compress: bool = False,
+) -> DocumentResult:
+    """
+    Extract one document and write its rows to output_path (gzip-compressed
+    if compress). Parquet and Arrow files are written as pages complete;
+    CSV and TSV rows are held in a RowStore and written at the end.
+
+    Errors are returned in the result rather than raised, so one bad document
+    does not stop the batch. The output file is written only on success.
+    """
+    result = DocumentResult(pdf_path=pdf_path)
+    started = time.perf_counter()
+    telemetry = Telemetry.default()
+    try:
+        # Text rows spill to disk beyond PDFHARVEST_RESULT_MEMORY_MB
+        output_rows: RowStore | ColumnarWriter = (
+            ColumnarWriter(output_path, output_format)
+            if output_format in COLUMNAR_OUTPUT_FORMATS
+            else RowStore()
+        )
+        with Document(pdf_path) as document, output_rows:
+            page_offset, limit_pages = validate_page_range(
+                page_offset_raw, limit_pages_raw, document
+            )
+            page_cache: PageTextCache | None = None
+            response_cache: ResponseCache | None = None
+            if use_cache:
+                try:
+                    page_cache = PageTextCache.default()
+                    response_cache = ResponseCache.default()
+                except StorageError:
+                    pass
+            _, result.extracted_pages, result.pages = run_extraction(
+                document,
+                user_prompt,
+                page_offset=page_offset,
+                limit_pages=limit_pages,
+                output_format=output_format,
+                api_key=api_key,
+                model=model,
+                max_concurrency=max_concurrency,
+                ocr_mode=ocr_mode,
+                ocr_workers=ocr_workers,
+                page_cache=page_cache,
+                response_cache=response_cache,
+                llm_slots=_llm_slots,
+                on_event=telemetry,
+                scheduler=_scheduler,
+                hedge=hedge,
+                preprocess=preprocess,
+                output_rows=output_rows,
+            )
+            result.rows = max(len(output_rows) - 1, 0)
+            if isinstance(output_rows, RowStore):
+                write_rows(output_rows, output_format, output_path, compress=compress)
+        result.output_path = output_path
+    except PDFHarvestError as e:
+        result.error = str(e)
+    result.seconds = time.perf_counter() - started
+    summary = telemetry.finish()
+    if STAGE_LLM in summary.stages:
+        result.llm_seconds = summary.stages[STAGE_LLM].wall_seconds
+    if STAGE_OCR in summary.stages:
+        result.ocr_seconds = summary.stages[STAGE_OCR].wall_seconds
+    result.llm_requests = summary.llm_requests
+    result.llm_hedges = summary.llm_hedges
+    result.llm_hedges_won = summary.llm_hedges_won
+    result.prompt_tokens = summary.prompt_tokens
+    result.completion_tokens = summary.completion_tokens
+    result.tokens_saved = summary.tokens_saved
+    return result
+
+
+def write_summary(results: Sequence[DocumentResult], path: Path) -> None:
+    """
+    Write one CSV line per document with its status, counts and timing.
+
+    Raises:
+        StorageError: If the file cannot be written.
+    """
+    try:
+        with path.open("w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(
+                [
+                    "document",
+                    "output",
+                    "status",
+                    "pages",
+                    "pages_with_rows",
+                    "rows",
+                    "seconds",
+                    "llm_seconds",
+                    "ocr_seconds",
+                    "llm_requests",
+                    "llm_hedges",
+                    "llm_hedges_won",
+                    "prompt_tokens",
+                    "completion_tokens",
+                    "tokens_saved",
+                    "error",
+                ]
+            )
+            for r in results:
+                status = "skipped" if r.skipped else "ok" if r.ok else "failed"
+                writer.writerow(
+                    [
+                        str(r.pdf_path),
+                        str(r.output_path or ""),
+                        status,
+                        r.pages,
+                        r.extracted_pages,
+                        r.rows,
+                        f"{r.seconds:.2f}",
+                        f"{r.llm_seconds:.2f}",
+                        f"{r.ocr_seconds:.2f}",
+                        r.llm_requests,
+                        r.llm_hedges,
+                        r.llm_hedges_won,
+                        r.prompt_tokens,
+                        r.completion_tokens,
+                        r.tokens_saved,
+                        r.error or "",
+                    ]
+                )
+    except OSError as e:
+        raise StorageError(f"Failed to write {path}: {e}") from e
+
+
+def run_batch(
+    pdf_paths: Sequence[Path],
+    user_prompt: str,
+    output_dir: Path,
+    *,
+    page_offset_raw: str = "",
+    limit_pages_raw: str = "",
+    output_format: str = OUTPUT_FORMAT_CSV,
+    api_key: str,
+    model: str,
+    processes: int | None = None,
+    max_requests: int = DEFAULT_BATCH_MAX_REQUESTS,
+    ocr_mode: str = DEFAULT_OCR_MODE,
+    use_cache: bool = True,
+    preprocess: bool = False,
+    hedge: HedgePolicy | None = None,
+    compress: bool = False,
+    skip_existing: bool = False,
+    on_result: Callable[[DocumentResult], None] | None = None,
+) -> list[DocumentResult]:
+    """
+    Extract every PDF into output_dir, several documents at a time.
+
+    Documents run in a process pool (OCR and PDF parsing are CPU-bound);
+    each document may keep up to max_requests LLM requests in flight, but
+    one semaphore shared by all processes caps the total at max_requests.
+    Client-side rate limits (PDFHARVEST_LLM_REQUESTS_PER_MINUTE and
+    PDFHARVEST_LLM_TOKENS_PER_MINUTE) are split evenly between processes.
+    A summary.csv with per-document timings is written at the end.
+
+    Args:
+        page_offset_raw, limit_pages_raw: As for validate_page_range, applied
+            to each document.
+        processes: Worker processes (default: CPU count, at most one per PDF).
+        preprocess: Strip boilerplate and compact whitespace (see
+            extraction.iter_extraction).
+        hedge: Optional hedging policy for straggling LLM requests, applied
+            per document (see extraction.iter_extraction).
+        compress: Write gzip-compressed CSV/TSV outputs (``.csv.gz``/``.tsv.gz``;
+            Parquet is compressed internally).
+        skip_existing: Leave documents whose output file already exists.
+        on_result: Called with each DocumentResult as it completes.
+
+    Returns:
+        One DocumentResult per input, in input order.
+
+    Raises:
+        ValidationError: If output_format is columnar and pyarrow is missing.
+        StorageError: If output_dir cannot be created.
+    """
+    require_columnar(output_format)
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        raise StorageError(f"Failed to create {output_dir}: {e}") from e
+    output_paths = _output_paths(pdf_paths, output_dir, output_format, compress)
+    results: list[DocumentResult | None] = [None] * len(pdf_paths)
+    todo = []
+    for i, (pdf_path, output_path) in enumerate(zip(pdf_paths, output_paths)):
+        if skip_existing and output_path.exists():
+            results[i] = DocumentResult(pdf_path, output_path=output_path, skipped=True)
+            if on_result:
+                on_result(results[i])
+        else:
+            todo.append(i)
+
+    if todo:
+        max_requests = max(1, max_requests)
+        processes = max(1, min(processes or os.cpu_count() or 1, len(todo)))
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=context,
+            initializer=_init_worker,
+            # The scheduler leaves room for a hedge next to every request
+            initargs=(
+                context.BoundedSemaphore(max_requests),
+                max_requests * (2 if hedge is not None else 1),
+                1 / processes,
+            ),
+        ) as pool:
+            futures = {
+                pool.submit(
+                    process_document,
+                    pdf_paths[i],
+                    output_paths[i],
+                    user_prompt,
+                    page_offset_raw=page_offset_raw,
+                    limit_pages_raw=limit_pages_raw,
+                    output_format=output_format,
+                    api_key=api_key,
+                    model=model,
+                    max_concurrency=max_requests,
+                    ocr_mode=ocr_mode,
+                    use_cache=use_cache,
+                    preprocess=preprocess,
+                    hedge=hedge,
+                    compress=compress,
+                ): i
+                for i in todo
+            }
+            try:
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        results[i] = future.result()
+                    except Exception as e:
+                        # Unexpected error, or the worker process died (e.g. out of memory)
+                        results[i] = DocumentResult(pdf_paths[i], error=f"{type(e).__name__}: {e}")
+                    if on_result:
+                        on_result(results[i])
+            except BaseException:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    final = [r for r in results if r is not None]
+    write_summary(final, output_dir / SUMMARY_FILE_NAME)
+    return final
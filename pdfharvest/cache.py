@@ -0,0 +1,263 @@
+"""Persistent, size-bounded caches shared across runs and Streamlit sessions."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Sequence
+
+from langchain_core.messages import BaseMessage
+
+from pdfharvest.config import (
+    get_cache_dir,
+    get_page_cache_max_bytes,
+    get_response_cache_max_bytes,
+    get_response_cache_ttl,
+)
+from pdfharvest.exceptions import StorageError
+from pdfharvest.pdf_utils import OcrResult
+
+# Bump when the cached page text format or the text selection logic changes
+PAGE_CACHE_VERSION = 1
+# Bump when the prompt/response handling changes in a way the key misses
+RESPONSE_CACHE_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+class DiskCache:
+    """
+    SQLite-backed key/value store with least-recently-used eviction.
+
+    Values are JSON-serializable objects. The database runs in WAL mode with
+    a busy timeout, so several threads and processes (e.g. concurrent
+    Streamlit sessions) can share one file. When the stored values exceed
+    max_bytes, the least recently read entries are evicted; entries older
+    than ttl seconds (if set) are treated as misses and removed.
+    """
+
+    def __init__(self, path: Path, *, max_bytes: int, ttl: float | None = None) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+            finally:
+                conn.close()
+        except (OSError, sqlite3.Error) as e:
+            raise StorageError(f"Failed to open cache {path}: {e}") from e
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for key, or None on a miss or read error."""
+        try:
+            conn = self._connect()
+            try:
+                now = time.time()
+                row = conn.execute(
+                    "SELECT value, created FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    row = None
+                if row is not None:
+                    conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            finally:
+                conn.close()
+            value = json.loads(row[0]) if row is not None else None
+        except (sqlite3.Error, ValueError):
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value under key, then evict old entries if over quota. Errors are ignored."""
+        payload = json.dumps(value, separators=(",", ":"))
+        now = time.time()
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload.encode("utf-8")), now, now),
+                )
+                self._evict(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Delete expired entries, then least recently used ones until under max_bytes."""
+        if self.ttl is not None:
+            conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% of the quota so every insert does not trigger a sweep
+        excess = total - int(self.max_bytes * 0.9)
+        doomed: list[str] = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if excess <= 0:
+                break
+            doomed.append(key)
+            excess -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in doomed])
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of get() calls that were hits (0.0 when nothing was looked up)."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self) -> None:
+        """Remove every entry and reset the hit/miss counters."""
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM entries")
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+class PageTextCache(DiskCache):
+    """
+    Cache of final page text keyed by document content, page and OCR settings.
+
+    Entries hold the text _iter_page_text would yield and, for OCR'd pages,
+    the OcrResult details, so a re-run with a different prompt skips both
+    vector extraction and OCR.
+    """
+
+    @classmethod
+    def default(cls) -> PageTextCache:
+        """Open the page cache under get_cache_dir() with the configured quota."""
+        return cls(get_cache_dir() / "pages.sqlite3", max_bytes=get_page_cache_max_bytes())
+
+    @staticmethod
+    def page_key(document_id: str, page_index: int, dpi: int, ocr_mode: str) -> str:
+        """Return the cache key for one page of a document."""
+        raw = f"{PAGE_CACHE_VERSION}:{document_id}:{page_index}:{dpi}:{ocr_mode}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_page(
+        self, document_id: str, page_index: int, dpi: int, ocr_mode: str
+    ) -> tuple[str, OcrResult | None] | None:
+        """Return cached (page_text, ocr_result) for a page, or None on a miss."""
+        value = self.get(self.page_key(document_id, page_index, dpi, ocr_mode))
+        if not isinstance(value, dict) or not isinstance(value.get("text"), str):
+            return None
+        ocr = value.get("ocr")
+        try:
+            ocr_result = OcrResult(**{**ocr, "cached": True}) if ocr else None
+        except TypeError:
+            return None
+        return value["text"], ocr_result
+
+    def put_page(
+        self,
+        document_id: str,
+        page_index: int,
+        dpi: int,
+        ocr_mode: str,
+        text: str,
+        ocr_result: OcrResult | None,
+    ) -> None:
+        """Store a page's final text and OCR details."""
+        ocr = asdict(ocr_result) if ocr_result is not None else None
+        if ocr is not None:
+            ocr.pop("cached", None)
+        self.set(
+            self.page_key(document_id, page_index, dpi, ocr_mode),
+            {"text": text, "ocr": ocr},
+        )
+
+
+class ResponseCache(DiskCache):
+    """
+    Cache of raw LLM outputs keyed on the model and the exact formatted messages.
+
+    The messages already carry the prompt, page text, output format and
+    include_header flag, so any change to those is a different key. With
+    bypass set, lookups are skipped (and counted in bypassed) but fresh
+    responses are still stored, which refreshes the cache.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        max_bytes: int,
+        ttl: float | None = None,
+        bypass: bool = False,
+    ) -> None:
+        super().__init__(path, max_bytes=max_bytes, ttl=ttl)
+        self.bypass = bypass
+        self.bypassed = 0
+
+    @classmethod
+    def default(cls, *, bypass: bool = False) -> ResponseCache:
+        """Open the response cache under get_cache_dir() with the configured quota and TTL."""
+        return cls(
+            get_cache_dir() / "responses.sqlite3",
+            max_bytes=get_response_cache_max_bytes(),
+            ttl=get_response_cache_ttl(),
+            bypass=bypass,
+        )
+
+    @staticmethod
+    def response_key(model: str, messages: Sequence[BaseMessage]) -> str:
+        """Return the cache key for a model and its formatted messages."""
+        payload = json.dumps(
+            [RESPONSE_CACHE_VERSION, model, [[m.type, m.content] for m in messages]],
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_response(self, model: str, messages: Sequence[BaseMessage]) -> str | None:
+        """Return the cached output for these messages, or None."""
+        if self.bypass:
+            with self._lock:
+                self.bypassed += 1
+            return None
+        value = self.get(self.response_key(model, messages))
+        return value if isinstance(value, str) else None
+
+    def put_response(self, model: str, messages: Sequence[BaseMessage], output: str) -> None:
+        """Store the raw output returned for these messages."""
+        self.set(self.response_key(model, messages), output)
@@ -0,0 +1,199 @@
+"""Command-line entry points: ``python -m pdfharvest <command>``."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+from pathlib import Path
+from typing import Sequence
+
+from pdfharvest.batch import DocumentResult, SUMMARY_FILE_NAME, find_pdfs, load_prompt, run_batch
+from pdfharvest.config import (
+    DEFAULT_BATCH_MAX_REQUESTS,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_OCR_MODE,
+    DEFAULT_OPENROUTER_MODEL,
+    DEFAULT_WORKER_POLL_SECONDS,
+    ENV_OPENROUTER_API_KEY,
+    ENV_OPENROUTER_MODEL,
+    MAX_CONCURRENCY_LIMIT,
+    OCR_MODES,
+    OUTPUT_FORMAT_CSV,
+    OUTPUT_FORMATS,
+)
+from pdfharvest.exceptions import PDFHarvestError
+from pdfharvest.hedging import HedgePolicy
+from pdfharvest.job_queue import JobQueue
+from pdfharvest.worker import run_worker
+
+
+def _worker(args: argparse.Namespace) -> int:
+    stop = threading.Event()
+    # Stop claiming new jobs. If the process is killed mid-job, the job is
+    # requeued once its lease lapses and resumes from its journal.
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    run_worker(
+        JobQueue.default(),
+        max_concurrency=min(args.concurrency, MAX_CONCURRENCY_LIMIT),
+        ocr_workers=args.ocr_workers,
+        poll_interval=args.poll,
+        max_jobs=args.max_jobs,
+        stop=stop,
+    )
+    return 0
+
+
+def _run(args: argparse.Namespace) -> int:
+    api_key = os.getenv(ENV_OPENROUTER_API_KEY, "")
+    if not api_key:
+        print(f"Missing {ENV_OPENROUTER_API_KEY} in the environment.", file=sys.stderr)
+        return 2
+    pdf_paths = find_pdfs(args.inputs)
+    user_prompt = load_prompt(args.prompt_file, args.prompt_name)
+
+    def report(result: DocumentResult) -> None:
+        if result.skipped:
+            status = "skipped (output exists)"
+        elif result.ok:
+            status = f"{result.rows} row(s) from {result.extracted_pages}/{result.pages} page(s)"
+        else:
+            status = f"FAILED: {result.error}"
+        print(f"{result.pdf_path.name}: {status} [{result.seconds:.1f}s]", flush=True)
+
+    results = run_batch(
+        pdf_paths,
+        user_prompt,
+        args.output_dir,
+        page_offset_raw=args.page_offset,
+        limit_pages_raw=args.limit_pages,
+        output_format=args.format,
+        api_key=api_key,
+        model=args.model,
+        processes=args.processes,
+        max_requests=args.max_requests,
+        ocr_mode=args.ocr_mode,
+        use_cache=not args.no_cache,
+        preprocess=args.preprocess,
+        hedge=HedgePolicy(fallback_model=args.hedge_model) if args.hedge or args.hedge_model else None,
+        compress=args.gzip,
+        skip_existing=args.skip_existing,
+        on_result=report,
+    )
+    failed = sum(not r.ok for r in results)
+    print(
+        f"{len(results) - failed}/{len(results)} document(s) done, {failed} failed; "
+        f"summary: {args.output_dir / SUMMARY_FILE_NAME}"
+    )
+    return 1 if failed else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pdfharvest",
+        description="Extract structured data from PDFs using an LLM and optional OCR.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    worker = commands.add_parser("worker", help="Run queued extraction jobs.")
+    worker.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="LLM requests in flight per job.",
+    )
+    worker.add_argument(
+        "--ocr-workers",
+        type=int,
+        default=None,
+        help="OCR processes per job (default: PDFHARVEST_OCR_WORKERS).",
+    )
+    worker.add_argument(
+        "--poll",
+        type=float,
+        default=DEFAULT_WORKER_POLL_SECONDS,
+        help="Seconds between queue polls when idle.",
+    )
+    worker.add_argument("--max-jobs", type=int, default=None, help="Exit after this many jobs.")
+    worker.set_defaults(handler=_worker)
+
+    run = commands.add_parser(
+        "run",
+        help="Extract a directory or glob of PDFs into one CSV/TSV per document.",
+    )
+    run.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns.")
+    run.add_argument("--prompt-file", type=Path, required=True, help="Extraction prompt file.")
+    run.add_argument(
+        "--prompt-name",
+        default=None,
+        help="Pick the '# NAME' prompt from a collection file such as prompts.md.",
+    )
+    run.add_argument("--output-dir", type=Path, required=True, help="Where results are written.")
+    run.add_argument("--page-offset", default="", help="Pages to skip in each document.")
+    run.add_argument("--limit-pages", default="", help="Max pages per document (default: all).")
+    run.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default=OUTPUT_FORMAT_CSV,
+        help="Output file format (Parquet and Arrow need the pyarrow package).",
+    )
+    run.add_argument(
+        "--model",
+        default=os.getenv(ENV_OPENROUTER_MODEL, DEFAULT_OPENROUTER_MODEL),
+    )
+    run.add_argument("--ocr-mode", choices=OCR_MODES, default=DEFAULT_OCR_MODE)
+    run.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Documents processed in parallel (default: CPU count).",
+    )
+    run.add_argument(
+        "--max-requests",
+        type=int,
+        default=DEFAULT_BATCH_MAX_REQUESTS,
+        help="LLM requests in flight across all documents.",
+    )
+    run.add_argument("--no-cache", action="store_true", help="Skip page and response caches.")
+    run.add_argument(
+        "--preprocess",
+        action="store_true",
+        help="Strip repeated headers/footers and page numbers and compact whitespace before sending text.",
+    )
+    run.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Duplicate LLM requests that run much longer than the rest of the document's.",
+    )
+    run.add_argument(
+        "--hedge-model",
+        default=None,
+        help="Model to send duplicate requests to (implies --hedge; default: --model).",
+    )
+    run.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Write gzip-compressed CSV/TSV outputs (.csv.gz/.tsv.gz).",
+    )
+    run.add_argument(
+        "--skip-existing",
+        action="store_true",
+        help="Leave documents whose output file already exists.",
+    )
+    run.set_defaults(handler=_run)
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Parse arguments and run the selected command; returns the exit code."""
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        return args.handler(args)
+    except PDFHarvestError as e:
+        logging.getLogger("pdfharvest").error("%s", e)
+        return 1
@@ -0,0 +1,200 @@
+"""Parquet and Arrow IPC result files, written a batch of rows at a time (optional pyarrow)."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Iterable
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = None  # type: ignore[assignment]
+    pq = None  # type: ignore[assignment]
+
+from pdfharvest.config import (
+    COLUMNAR_BATCH_ROWS,
+    COLUMNAR_OUTPUT_FORMATS,
+    OUTPUT_FORMAT_PARQUET,
+)
+from pdfharvest.exceptions import StorageError, ValidationError
+
+
+def columnar_available() -> bool:
+    """True if pyarrow is installed, so Parquet and Arrow output can be written."""
+    return pa is not None
+
+
+def require_columnar(output_format: str) -> None:
+    """
+    Check that output_format can be written here.
+
+    Raises:
+        ValidationError: If output_format is columnar and pyarrow is missing.
+    """
+    if output_format in COLUMNAR_OUTPUT_FORMATS and not columnar_available():
+        raise ValidationError(
+            f"{output_format} output needs the pyarrow package (pip install pyarrow)."
+        )
+
+
+def column_names(header: list[str], width: int = 0) -> list[str]:
+    """
+    Schema column names from the header row, padded to width with col_N.
+
+    Blank names become col_N and repeated names get a _2, _3... suffix, since
+    readers of both formats expect unique names.
+    """
+    names = list(header) + [""] * max(0, width - len(header))
+    seen: dict[str, int] = {}
+    unique = []
+    for i, name in enumerate(names):
+        name = name.strip() or f"col_{i}"
+        count = seen.get(name, 0) + 1
+        seen[name] = count
+        unique.append(name if count == 1 else f"{name}_{count}")
+    return unique
+
+
+class ColumnarWriter:
+    """
+    Row sink writing a Parquet or Arrow IPC file as rows arrive.
+
+    Used like a list of rows (append/extend, e.g. as output_rows for
+    collect_page_results): the first row is the header and becomes the
+    schema, one string column per cell, padded to width (pass the result's
+    width, e.g. RowStore.width, when it is known up front). Shorter rows are
+    padded with empty strings; cells beyond the schema are joined onto the
+    last column with commas, which restores a cell the model split on an
+    unquoted comma. Rows are buffered and written batch_rows at a time (one
+    Parquet row group or Arrow record batch each).
+
+    The file is written next to path and renamed into place by close();
+    leaving the with block on an error discards it.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        output_format: str = OUTPUT_FORMAT_PARQUET,
+        *,
+        width: int = 0,
+        batch_rows: int = COLUMNAR_BATCH_ROWS,
+    ) -> None:
+        if output_format not in COLUMNAR_OUTPUT_FORMATS:
+            raise ValidationError(
+                f"Columnar format must be one of: {', '.join(COLUMNAR_OUTPUT_FORMATS)}."
+            )
+        require_columnar(output_format)
+        self.path = path
+        self.output_format = output_format
+        self.width = width
+        self.batch_rows = max(1, batch_rows)
+        self._partial = path.with_name(f".{path.name}.part")
+        self._schema: Any = None
+        self._writer: Any = None
+        self._buffer: list[list[str]] = []
+        # Rows received, header included
+        self._rows = 0
+
+    def __enter__(self) -> ColumnarWriter:
+        return self
+
+    def __exit__(self, exc_type: object, *exc: object) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def append(self, row: list[str]) -> None:
+        """Add a row; the first one is the header."""
+        self._rows += 1
+        if self._schema is None:
+            names = column_names(row, self.width)
+            self._schema = pa.schema([(name, pa.string()) for name in names])
+            self._open()
+            return
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_rows:
+            self._flush()
+
+    def extend(self, rows: Iterable[list[str]]) -> None:
+        """Add rows in order."""
+        for row in rows:
+            self.append(row)
+
+    def _open(self) -> None:
+        try:
+            if self.output_format == OUTPUT_FORMAT_PARQUET:
+                self._writer = pq.ParquetWriter(
+                    str(self._partial), self._schema, compression="zstd"
+                )
+            else:
+                self._writer = pa.ipc.new_file(str(self._partial), self._schema)
+        except (OSError, pa.ArrowException) as e:
+            raise StorageError(f"Failed to write {self.path}: {e}") from e
+
+    def _normalize(self, row: list[str]) -> list[str]:
+        width = len(self._schema)
+        if len(row) > width:
+            return row[: width - 1] + [",".join(row[width - 1 :])]
+        return row + [""] * (width - len(row))
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        rows = [self._normalize(row) for row in self._buffer]
+        self._buffer = []
+        columns = [pa.array(list(cells), type=pa.string()) for cells in zip(*rows)]
+        batch = pa.RecordBatch.from_arrays(columns, schema=self._schema)
+        try:
+            if self.output_format == OUTPUT_FORMAT_PARQUET:
+                self._writer.write_batch(batch)
+            else:
+                self._writer.write(batch)
+        except (OSError, pa.ArrowException) as e:
+            raise StorageError(f"Failed to write {self.path}: {e}") from e
+
+    def close(self) -> None:
+        """Write the remaining rows and move the finished file to path."""
+        if self._schema is None:
+            # No header: an empty table
+            self._schema = pa.schema([])
+            self._open()
+        self._flush()
+        try:
+            self._writer.close()
+            self._partial.replace(self.path)
+        except (OSError, pa.ArrowException) as e:
+            self._partial.unlink(missing_ok=True)
+            raise StorageError(f"Failed to write {self.path}: {e}") from e
+
+    def discard(self) -> None:
+        """Abandon the file without touching path."""
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except (OSError, pa.ArrowException):
+                pass
+        self._partial.unlink(missing_ok=True)
+
+
+def write_columnar(
+    rows: Iterable[list[str]],
+    output_format: str,
+    path: Path,
+    *,
+    width: int = 0,
+) -> None:
+    """
+    Write rows (header first) to path as Parquet or Arrow IPC; see ColumnarWriter.
+
+    Raises:
+        ValidationError: If the format is not columnar or pyarrow is missing.
+        StorageError: If the file cannot be written.
+    """
+    with ColumnarWriter(path, output_format, width=width) as writer:
+        writer.extend(rows)
@@ -2,14 +2,35 @@
 
 import os
 from pathlib import Path
-from typing import Final
+from typing import Callable, Final
 
 # Environment variable names
 ENV_OPENROUTER_API_KEY: Final[str] = "OPENROUTER_API_KEY"
 ENV_OPENROUTER_MODEL: Final[str] = "OPENROUTER_MODEL"
 ENV_OPENROUTER_REFERER: Final[str] = "OPENROUTER_REFERER"
 ENV_OPENROUTER_TITLE: Final[str] = "OPENROUTER_TITLE"
+ENV_OPENROUTER_BASE_URL: Final[str] = "OPENROUTER_BASE_URL"
 ENV_PDFHARVEST_STORAGE_DIR: Final[str] = "PDFHARVEST_STORAGE_DIR"
+ENV_PDFHARVEST_OCR_WORKERS: Final[str] = "PDFHARVEST_OCR_WORKERS"
+ENV_PDFHARVEST_OCR_TIMEOUT: Final[str] = "PDFHARVEST_OCR_TIMEOUT"
+ENV_PDFHARVEST_OCR_SHUTDOWN_TIMEOUT: Final[str] = "PDFHARVEST_OCR_SHUTDOWN_TIMEOUT"
+ENV_PDFHARVEST_CACHE_DIR: Final[str] = "PDFHARVEST_CACHE_DIR"
+ENV_PDFHARVEST_PAGE_CACHE_MB: Final[str] = "PDFHARVEST_PAGE_CACHE_MB"
+ENV_PDFHARVEST_RESPONSE_CACHE_MB: Final[str] = "PDFHARVEST_RESPONSE_CACHE_MB"
+ENV_PDFHARVEST_RESPONSE_CACHE_TTL_HOURS: Final[str] = "PDFHARVEST_RESPONSE_CACHE_TTL_HOURS"
+ENV_PDFHARVEST_JOBS_DIR: Final[str] = "PDFHARVEST_JOBS_DIR"
+ENV_PDFHARVEST_RESULTS_DIR: Final[str] = "PDFHARVEST_RESULTS_DIR"
+ENV_PDFHARVEST_RESULT_MEMORY_MB: Final[str] = "PDFHARVEST_RESULT_MEMORY_MB"
+ENV_PDFHARVEST_USE_WORKERS: Final[str] = "PDFHARVEST_USE_WORKERS"
+ENV_PDFHARVEST_JOB_LEASE: Final[str] = "PDFHARVEST_JOB_LEASE_SECONDS"
+ENV_PDFHARVEST_TELEMETRY_JSONL: Final[str] = "PDFHARVEST_TELEMETRY_JSONL"
+ENV_PDFHARVEST_PROMETHEUS_TEXTFILE: Final[str] = "PDFHARVEST_PROMETHEUS_TEXTFILE"
+ENV_PDFHARVEST_LLM_RPM: Final[str] = "PDFHARVEST_LLM_REQUESTS_PER_MINUTE"
+ENV_PDFHARVEST_LLM_TPM: Final[str] = "PDFHARVEST_LLM_TOKENS_PER_MINUTE"
+ENV_PDFHARVEST_LLM_MAX_CONNECTIONS: Final[str] = "PDFHARVEST_LLM_MAX_CONNECTIONS"
+ENV_PDFHARVEST_LLM_TIMEOUT: Final[str] = "PDFHARVEST_LLM_TIMEOUT"
+ENV_PDFHARVEST_HEDGE: Final[str] = "PDFHARVEST_HEDGE"
+ENV_PDFHARVEST_HEDGE_MODEL: Final[str] = "PDFHARVEST_HEDGE_MODEL"
 
 # Defaults
 DEFAULT_OPENROUTER_MODEL: Final[str] = "google/gemini-2.5-flash"
@@ -19,12 +40,155 @@ OPENROUTER_BASE_URL: Final[str] = "https://openrouter.ai/api/v1"
 # Output formats
 OUTPUT_FORMAT_CSV: Final[str] = "CSV"
 OUTPUT_FORMAT_TSV: Final[str] = "TSV"
-OUTPUT_FORMATS: Final[tuple[str, ...]] = (OUTPUT_FORMAT_TSV, OUTPUT_FORMAT_CSV)
+# Columnar formats need the optional pyarrow package; the model is asked for CSV
+OUTPUT_FORMAT_PARQUET: Final[str] = "Parquet"
+OUTPUT_FORMAT_ARROW: Final[str] = "Arrow"
+TEXT_OUTPUT_FORMATS: Final[tuple[str, ...]] = (OUTPUT_FORMAT_TSV, OUTPUT_FORMAT_CSV)
+COLUMNAR_OUTPUT_FORMATS: Final[tuple[str, ...]] = (OUTPUT_FORMAT_PARQUET, OUTPUT_FORMAT_ARROW)
+OUTPUT_FORMATS: Final[tuple[str, ...]] = TEXT_OUTPUT_FORMATS + COLUMNAR_OUTPUT_FORMATS
+OUTPUT_FILE_EXTENSIONS: Final[dict[str, str]] = {
+    OUTPUT_FORMAT_CSV: "csv",
+    OUTPUT_FORMAT_TSV: "tsv",
+    OUTPUT_FORMAT_PARQUET: "parquet",
+    OUTPUT_FORMAT_ARROW: "arrow",
+}
+# Rows per Parquet row group / Arrow record batch
+COLUMNAR_BATCH_ROWS: Final[int] = 10_000
 
 # I/O
 DEFAULT_CHUNK_SIZE: Final[int] = 4 * 1024 * 1024  # 4 MiB
 DEFAULT_OCR_DPI: Final[int] = 200
 
+# OCR modes: "auto" classifies each page, "always"/"never" force the choice
+OCR_MODE_AUTO: Final[str] = "auto"
+OCR_MODE_ALWAYS: Final[str] = "always"
+OCR_MODE_NEVER: Final[str] = "never"
+OCR_MODES: Final[tuple[str, ...]] = (OCR_MODE_AUTO, OCR_MODE_ALWAYS, OCR_MODE_NEVER)
+DEFAULT_OCR_MODE: Final[str] = OCR_MODE_AUTO
+
+# Page classifier thresholds (OCR_MODE_AUTO)
+OCR_MIN_VECTOR_CHARS: Final[int] = 50
+OCR_MAX_GARBAGE_RATIO: Final[float] = 0.2
+OCR_IMAGE_COVERAGE_THRESHOLD: Final[float] = 0.5
+OCR_MIN_CHAR_DENSITY: Final[float] = 5.0  # characters per square inch
+
+# Tesseract strategy: page segmentation modes tried in escalation order, and
+# the mean word confidence (0-100) that stops escalation
+OCR_PSM_ESCALATION: Final[tuple[int, ...]] = (6, 3, 11, 1)
+OCR_SPARSE_PSM: Final[int] = 11  # used first when orientation detection finds no text
+OCR_MIN_CONFIDENCE: Final[float] = 60.0
+
+# Pages rasterized per poppler invocation; also bounds rendered images on disk
+OCR_RENDER_BATCH_PAGES: Final[int] = 8
+
+# OCR process pool (1 worker = OCR inline, no pool)
+DEFAULT_OCR_WORKERS: Final[int] = 1
+DEFAULT_OCR_TASK_TIMEOUT: Final[float] = 300.0  # seconds per page
+DEFAULT_OCR_SHUTDOWN_TIMEOUT: Final[float] = 10.0  # seconds to wait for running pages
+
+# Caches
+DEFAULT_PAGE_CACHE_MB: Final[int] = 512
+DEFAULT_RESPONSE_CACHE_MB: Final[int] = 256
+DEFAULT_RESPONSE_CACHE_TTL_HOURS: Final[float] = 7 * 24.0
+
+# Result rows kept in memory per result before the rest spill to disk
+DEFAULT_RESULT_MEMORY_MB: Final[int] = 16
+# Rows read back from a spilled result per query
+RESULT_READ_BATCH_ROWS: Final[int] = 1000
+
+# LLM dispatch
+DEFAULT_MAX_CONCURRENCY: Final[int] = 1
+# Retries of a failed LLM request (rate limit, timeout, connection, 5xx)
+DEFAULT_LLM_MAX_RETRIES: Final[int] = 4
+LLM_RETRY_BASE_DELAY: Final[float] = 0.5  # seconds, doubled per retry (jittered)
+LLM_RETRY_MAX_DELAY: Final[float] = 30.0  # cap on backoff and Retry-After
+# Adaptive concurrency (AIMD): the request limit grows by one per round of
+# successful requests and is multiplied by LLM_AIMD_DECREASE on a 429, or
+# when smoothed latency exceeds LLM_LATENCY_BACKOFF_FACTOR x the best seen
+LLM_AIMD_DECREASE: Final[float] = 0.5
+LLM_LATENCY_BACKOFF_FACTOR: Final[float] = 3.0
+
+# Shared LLM HTTP clients (see llm_clients.LlmClientPool)
+DEFAULT_LLM_MAX_CONNECTIONS: Final[int] = 64  # per client (API key)
+DEFAULT_LLM_TIMEOUT: Final[float] = 300.0  # seconds to wait for a response
+LLM_CONNECT_TIMEOUT: Final[float] = 10.0
+LLM_KEEPALIVE_SECONDS: Final[float] = 60.0  # idle pooled connections are closed after this
+LLM_CLIENT_IDLE_SECONDS: Final[float] = 900.0  # unused clients (e.g. rotated keys) likewise
+LLM_CLIENT_POOL_MAX_CLIENTS: Final[int] = 16
+
+# Hedged LLM requests (opt-in, see hedging.HedgePolicy): a request still
+# running after the HEDGE_PERCENTILE latency of the run so far (and at least
+# HEDGE_MIN_DELAY) is duplicated, for at most HEDGE_MAX_EXTRA_FRACTION extra
+# requests, once HEDGE_MIN_SAMPLES requests have completed
+HEDGE_PERCENTILE: Final[float] = 0.95
+HEDGE_MIN_SAMPLES: Final[int] = 8
+HEDGE_MAX_EXTRA_FRACTION: Final[float] = 0.1
+HEDGE_MIN_DELAY: Final[float] = 2.0
+MAX_CONCURRENCY_LIMIT: Final[int] = 32
+# Page-text token budget when packing several pages into one request
+DEFAULT_PACK_TOKENS: Final[int] = 2000
+# Pages whose text may be acquired (rendered, OCR'd) ahead of LLM dispatch;
+# at least twice the LLM concurrency is used
+DEFAULT_PREFETCH_PAGES: Final[int] = 16
+
+# Page text preprocessing (opt-in): a line among the first/last
+# BOILERPLATE_EDGE_LINES non-blank lines of a page is boilerplate once it has
+# appeared on at least BOILERPLATE_MIN_PAGES pages and this share of pages seen
+BOILERPLATE_EDGE_LINES: Final[int] = 3
+BOILERPLATE_MIN_PAGES: Final[int] = 3
+BOILERPLATE_MIN_RATIO: Final[float] = 0.5
+# Pages held back at the start of a run to learn repeated lines from
+BOILERPLATE_SAMPLE_PAGES: Final[int] = 8
+
+# Background job queue
+# A running job whose worker has not sent a heartbeat for this long is requeued
+DEFAULT_JOB_LEASE_SECONDS: Final[float] = 120.0
+# Requeues after a worker died mid-job before the job is marked failed
+MAX_JOB_ATTEMPTS: Final[int] = 3
+DEFAULT_WORKER_POLL_SECONDS: Final[float] = 2.0
+
+# Batch CLI: LLM requests in flight across all documents and processes
+DEFAULT_BATCH_MAX_REQUESTS: Final[int] = 8
+
+
+def _env_number(name: str, default: float, cast: Callable[[str], float]) -> float:
+    """Read a positive number from the environment, falling back on bad values."""
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+def get_openrouter_base_url() -> str:
+    """Return the OpenAI-compatible API base URL (default: OpenRouter)."""
+    return os.getenv(ENV_OPENROUTER_BASE_URL, "").strip() or OPENROUTER_BASE_URL
+
+
+def get_llm_requests_per_minute() -> float | None:
+    """Return the client-side LLM request rate limit, or None for no limit."""
+    value = _env_number(ENV_PDFHARVEST_LLM_RPM, 0.0, float)
+    return float(value) if value > 0 else None
+
+
+def get_llm_tokens_per_minute() -> float | None:
+    """Return the client-side LLM token rate limit (prompt + completion), or None."""
+    value = _env_number(ENV_PDFHARVEST_LLM_TPM, 0.0, float)
+    return float(value) if value > 0 else None
+
+
+def get_llm_max_connections() -> int:
+    """Return the connection limit of each shared LLM HTTP client."""
+    return int(_env_number(ENV_PDFHARVEST_LLM_MAX_CONNECTIONS, DEFAULT_LLM_MAX_CONNECTIONS, int))
+
+
+def get_llm_timeout() -> float:
+    """Return seconds to wait for an LLM response before the request times out."""
+    return float(_env_number(ENV_PDFHARVEST_LLM_TIMEOUT, DEFAULT_LLM_TIMEOUT, float))
+
 
 def get_storage_dir() -> Path:
     """Return the configured storage directory for uploaded PDFs."""
@@ -32,3 +196,103 @@ def get_storage_dir() -> Path:
     if raw:
         return Path(raw)
     return Path.cwd() / "data"
+
+
+def get_cache_dir() -> Path:
+    """Return the directory for persistent caches (default: <storage dir>/cache)."""
+    raw = os.getenv(ENV_PDFHARVEST_CACHE_DIR)
+    if raw:
+        return Path(raw)
+    return get_storage_dir() / "cache"
+
+
+def get_jobs_dir() -> Path:
+    """Return the directory for resumable extraction jobs (default: <storage dir>/jobs)."""
+    raw = os.getenv(ENV_PDFHARVEST_JOBS_DIR)
+    if raw:
+        return Path(raw)
+    return get_storage_dir() / "jobs"
+
+
+def get_results_dir() -> Path:
+    """Return the directory result rows spill to (default: <storage dir>/results)."""
+    raw = os.getenv(ENV_PDFHARVEST_RESULTS_DIR)
+    if raw:
+        return Path(raw)
+    return get_storage_dir() / "results"
+
+
+def get_result_memory_bytes() -> int:
+    """Return the memory budget for one result's rows before they spill to disk."""
+    mb = _env_number(ENV_PDFHARVEST_RESULT_MEMORY_MB, DEFAULT_RESULT_MEMORY_MB, int)
+    return int(mb) * 1024 * 1024
+
+
+def get_page_cache_max_bytes() -> int:
+    """Return the page text cache size quota in bytes."""
+    return int(_env_number(ENV_PDFHARVEST_PAGE_CACHE_MB, DEFAULT_PAGE_CACHE_MB, int)) * 1024 * 1024
+
+
+def get_response_cache_max_bytes() -> int:
+    """Return the LLM response cache size quota in bytes."""
+    mb = _env_number(ENV_PDFHARVEST_RESPONSE_CACHE_MB, DEFAULT_RESPONSE_CACHE_MB, int)
+    return int(mb) * 1024 * 1024
+
+
+def get_response_cache_ttl() -> float:
+    """Return how long cached LLM responses stay valid, in seconds."""
+    hours = _env_number(
+        ENV_PDFHARVEST_RESPONSE_CACHE_TTL_HOURS, DEFAULT_RESPONSE_CACHE_TTL_HOURS, float
+    )
+    return float(hours) * 3600.0
+
+
+def get_ocr_workers() -> int:
+    """Return the OCR worker process count ("auto" = one per CPU)."""
+    if os.getenv(ENV_PDFHARVEST_OCR_WORKERS, "").strip().lower() == "auto":
+        return os.cpu_count() or 1
+    return int(_env_number(ENV_PDFHARVEST_OCR_WORKERS, DEFAULT_OCR_WORKERS, int))
+
+
+def get_ocr_task_timeout() -> float:
+    """Return the per-page OCR timeout in seconds."""
+    return float(_env_number(ENV_PDFHARVEST_OCR_TIMEOUT, DEFAULT_OCR_TASK_TIMEOUT, float))
+
+
+def get_ocr_shutdown_timeout() -> float:
+    """Return how long OCR shutdown waits for running pages before killing workers."""
+    return float(
+        _env_number(ENV_PDFHARVEST_OCR_SHUTDOWN_TIMEOUT, DEFAULT_OCR_SHUTDOWN_TIMEOUT, float)
+    )
+
+
+def get_use_workers() -> bool:
+    """Return True if the UI should queue jobs for background workers instead of running them."""
+    return os.getenv(ENV_PDFHARVEST_USE_WORKERS, "").strip().lower() in ("1", "true", "yes")
+
+
+def get_hedge_enabled() -> bool:
+    """Return True if background workers should hedge slow LLM requests."""
+    return os.getenv(ENV_PDFHARVEST_HEDGE, "").strip().lower() in ("1", "true", "yes")
+
+
+def get_hedge_model() -> str | None:
+    """Return the model hedge requests are sent to, or None for the job's model."""
+    return os.getenv(ENV_PDFHARVEST_HEDGE_MODEL, "").strip() or None
+
+
+def get_job_lease() -> float:
+    """Return seconds without a worker heartbeat before a running job is requeued."""
+    return float(_env_number(ENV_PDFHARVEST_JOB_LEASE, DEFAULT_JOB_LEASE_SECONDS, float))
+
+
+def get_telemetry_jsonl_path() -> Path | None:
+    """Return the file telemetry events are appended to, or None if disabled."""
+    raw = os.getenv(ENV_PDFHARVEST_TELEMETRY_JSONL, "").strip()
+    return Path(raw) if raw else None
+
+
+def get_prometheus_textfile_path() -> Path | None:
+    """Return the Prometheus textfile written after each run, or None if disabled."""
+    raw = os.getenv(ENV_PDFHARVEST_PROMETHEUS_TEXTFILE, "").strip()
+    return Path(raw) if raw else None
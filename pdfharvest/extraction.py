@@ -1,26 +1,89 @@
 """LLM-based extraction and CSV/TSV parsing."""
 
 import csv
+import gzip
 import io
 import os
+import queue
 import re
 import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import (
+    AbstractContextManager,
+    ExitStack,
+    closing,
+    contextmanager,
+    nullcontext,
+)
+from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Callable, Iterator
+from typing import IO, Any, Callable, Iterable, Iterator, Protocol, TypeVar
 
+import httpx
+from langchain_core.messages import AIMessageChunk
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
-from pypdf import PdfReader
 
 from pdfharvest.config import (
+    BOILERPLATE_SAMPLE_PAGES,
+    DEFAULT_CHUNK_SIZE,
     ENV_OPENROUTER_REFERER,
     ENV_OPENROUTER_TITLE,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_OCR_MODE,
     DEFAULT_OPENROUTER_TITLE,
-    OPENROUTER_BASE_URL,
+    DEFAULT_PREFETCH_PAGES,
+    OCR_MODES,
+    OCR_RENDER_BATCH_PAGES,
+    COLUMNAR_OUTPUT_FORMATS,
     OUTPUT_FORMAT_CSV,
+    get_ocr_workers,
+    get_openrouter_base_url,
+)
+from pdfharvest.exceptions import ExtractionError, StorageError, ValidationError
+from pdfharvest.hedging import HedgePolicy, Hedger
+from pdfharvest.llm_clients import LlmClientPool
+from pdfharvest.ocr import OcrExecutor
+from pdfharvest.cache import PageTextCache, ResponseCache
+from pdfharvest.pdf_utils import (
+    OCR_DPI_RASTER,
+    Document,
+    OcrResult,
+    OcrStrategy,
+    needs_ocr,
+    ocr_image_file,
+    render_pages,
 )
-from pdfharvest.exceptions import ExtractionError
-from pdfharvest.pdf_utils import extract_text_from_page, ocr_page
+from pdfharvest.preprocess import PagePreprocessor
+from pdfharvest.scheduler import LlmScheduler
+from pdfharvest.telemetry import (
+    STAGE_LLM,
+    STAGE_OCR,
+    STAGE_PAGE_CACHE,
+    STAGE_PARSE,
+    STAGE_PREPROCESS,
+    STAGE_PROFILE,
+    STAGE_RENDER,
+    EventHook,
+    StageEvent,
+    timed_stage,
+)
+
+_T = TypeVar("_T")
+
+# Streamed-row hook: (page number, header if known, that page's rows so far)
+RowsHook = Callable[[int, list[str] | None, list[list[str]]], None]
+
+
+class RowSink(Protocol):
+    """Destination for merged result rows, e.g. a RowStore or columnar.ColumnarWriter."""
+
+    def append(self, row: list[str]) -> None: ...
+
+    def extend(self, rows: Iterable[list[str]]) -> None: ...
 
 # Regex to strip optional markdown code fences around CSV/TSV
 _CODE_FENCE_RE = re.compile(r"```(?:csv|tsv)?\s*([\s\S]*?)\s*```", re.IGNORECASE)
@@ -65,16 +128,130 @@ def parse_rows(text: str, delimiter: str) -> list[list[str]]:
     return rows
 
 
+class RowStreamParser:
+    """
+    Incremental parse_rows for text that arrives in chunks (a streamed reply).
+
+    feed() returns the rows a chunk completes. A row is complete once its
+    line ends outside a quoted cell, so quoted cells spanning lines (and
+    chunks) are held until they close. A line starting with ``` at a row
+    boundary opens the fenced block and the next one closes it; text after
+    the closing fence is ignored. Unlike parse_rows, text before an opening
+    fence that follows other text is kept: it has been returned by then.
+    """
+
+    def __init__(self, delimiter: str) -> None:
+        self.delimiter = delimiter
+        # Text after the last newline seen
+        self._partial = ""
+        # Lines of a row still inside a quoted cell
+        self._record: list[str] = []
+        self._in_fence = False
+        self._done = False
+
+    def feed(self, chunk: str) -> list[list[str]]:
+        """Add a chunk of text; return the rows it completes."""
+        text = self._partial + chunk
+        cut = text.rfind("\n") + 1
+        self._partial = text[cut:]
+        return self._lines([line + "\n" for line in text[:cut].split("\n")[:-1]])
+
+    def close(self) -> list[list[str]]:
+        """End of text: return the remaining rows (an unclosed quoted cell ends here)."""
+        lines = [self._partial] if self._partial else []
+        self._partial = ""
+        rows = self._lines(lines)
+        if self._record:
+            rows.extend(self._rows(final=True))
+        return rows
+
+    def _lines(self, lines: list[str]) -> list[list[str]]:
+        rows: list[list[str]] = []
+        for line in lines:
+            if self._done:
+                break
+            if not self._record:
+                if line.strip().startswith("```"):
+                    self._done = self._in_fence
+                    self._in_fence = True
+                    continue
+                if self._in_fence and "```" in line:
+                    line = line[: line.index("```")] + "\n"
+                    self._done = True
+            self._record.append(line)
+            rows.extend(self._rows(final=False))
+        return rows
+
+    def _rows(self, final: bool) -> list[list[str]]:
+        """Parse the held lines; keep those of a row whose quoted cell is still open."""
+        lines = self._record
+        consumed = 0
+        starved = False
+
+        def source() -> Iterator[str]:
+            nonlocal consumed, starved
+            while consumed < len(lines):
+                consumed += 1
+                yield lines[consumed - 1]
+            starved = True
+
+        rows: list[list[str]] = []
+        start = 0
+        for row in csv.reader(source(), delimiter=self.delimiter):
+            # The reader only runs out of lines mid-row inside a quoted cell
+            if starved and not final:
+                break
+            start = consumed
+            if row and any((cell or "").strip() for cell in row):
+                rows.append([(cell or "").strip() for cell in row])
+        self._record = lines[start:]
+        return rows
+
+
+class _PageRowSplitter:
+    """Files one request's rows under its pages, one row at a time (see _split_page_rows)."""
+
+    def __init__(self, page_numbers: list[int], header: list[str] | None) -> None:
+        self.requested = set(page_numbers)
+        self.current = page_numbers[0]
+        self.header = header
+        # Header discovered in this request's rows
+        self.new_header: list[str] | None = None
+        self.by_page: dict[int, list[list[str]]] = {}
+
+    def add(self, row: list[str]) -> int | None:
+        """File row; return its page, or None if it was a header row (or empty)."""
+        if not row:
+            return None
+        known_header = self.header or self.new_header
+        if known_header is None and row[0].strip().lower() == "page_number":
+            self.new_header = row
+            return None
+        if known_header and row == known_header:
+            return None
+        try:
+            named = int(row[0].strip())
+        except ValueError:
+            named = None
+        if named in self.requested:
+            self.current = named
+        # Ensure first column (page_number) is the actual PDF page number
+        self.by_page.setdefault(self.current, []).append([str(self.current)] + row[1:])
+        return self.current
+
+
 def _get_delimiter(output_format: str) -> str:
     """Return delimiter for the given output format."""
     return "," if output_format == OUTPUT_FORMAT_CSV else "\t"
 
 
-def _build_llm(
-    api_key: str,
-    model: str,
-) -> ChatOpenAI:
-    """Build ChatOpenAI client for OpenRouter with optional headers."""
+def _text_format(output_format: str) -> str:
+    """Format the model is asked for: CSV when the output file is columnar."""
+    return OUTPUT_FORMAT_CSV if output_format in COLUMNAR_OUTPUT_FORMATS else output_format
+
+
+def _openrouter_headers() -> dict[str, str]:
+    """Optional OpenRouter attribution headers from the environment."""
     referer = os.getenv(ENV_OPENROUTER_REFERER, "").strip()
     title = os.getenv(ENV_OPENROUTER_TITLE, DEFAULT_OPENROUTER_TITLE).strip()
     headers: dict[str, str] = {}
@@ -82,12 +259,32 @@ def _build_llm(
         headers["HTTP-Referer"] = referer
     if title:
         headers["X-Title"] = title
+    return headers
+
+
+def _build_llm(
+    api_key: str,
+    model: str,
+    *,
+    http_client: httpx.Client | None = None,
+) -> ChatOpenAI:
+    """
+    Build ChatOpenAI client for OpenRouter (or OPENROUTER_BASE_URL) with optional headers.
+
+    http_client, if given, is a shared keep-alive client (see
+    llm_clients.LlmClientPool) whose timeouts apply; the model object itself
+    is cheap and built per run.
+    """
+    headers = _openrouter_headers()
     return ChatOpenAI(
         api_key=api_key,
-        base_url=OPENROUTER_BASE_URL,
+        base_url=get_openrouter_base_url(),
         model=model,
         temperature=0,
         default_headers=headers or None,
+        http_client=http_client,
+        # Retries happen in the LlmScheduler, where they are paced and counted
+        max_retries=0,
     )
 
 
@@ -101,6 +298,7 @@ def _build_prompt() -> ChatPromptTemplate:
                 "Use only the provided PDF page content. "
                 "Return results in {output_format} format. "
                 "Include a column named page_number as the first column. "
+                "Set page_number to the N of the [Page N] marker the data was found under. "
                 "If include_header is 'yes', include a header row. "
                 "If include_header is 'no', do not include a header row. "
                 "Use a consistent column order and field format on every page. "
@@ -116,59 +314,524 @@ def _build_prompt() -> ChatPromptTemplate:
     )
 
 
+def _select_page_text(vector_text: str, ocr_text: str) -> str:
+    """Choose between vector and OCR text for a page that was OCR'd."""
+    # Prefer vector if substantial, unless OCR found significantly more
+    if vector_text and len(vector_text) > 50:
+        if ocr_text and len(ocr_text) > len(vector_text) * 1.5:
+            return ocr_text
+        return vector_text
+    if ocr_text:
+        return ocr_text
+    # Only vector text (even if short), or both empty - still yield so the
+    # LLM can note the page exists
+    return vector_text
+
+
+@dataclass
+class _PendingPage:
+    """A classified page waiting to be yielded by _iter_page_text."""
+
+    one_based: int
+    text: str
+    needs_ocr: bool
+    from_cache: bool = False
+    ocr_result: OcrResult | None = None
+
+
 def _iter_page_text(
-    pdf_path: Path,
-    reader: PdfReader,
+    document: Document,
     page_offset: int,
     limit_pages: int | None,
     temp_dir: str,
-) -> Iterator[tuple[int, str]]:
+    ocr_mode: str = DEFAULT_OCR_MODE,
+    ocr_executor: OcrExecutor | None = None,
+    page_cache: PageTextCache | None = None,
+    document_id: str | None = None,
+    on_event: EventHook | None = None,
+) -> Iterator[tuple[int, str, OcrResult | None]]:
     """
-    Yield (one_based_page_number, page_text) for each page in range.
-    
-    Handles both vector (text-based) and raster (image-based) pages:
+    Yield (one_based_page_number, page_text, ocr_result) for each page in range.
+
+    ocr_result is None for pages that were not OCR'd.
+
+    Each page is classified from its vector text layer before any rendering
+    (see needs_ocr); only pages that need it are rasterized and OCR'd:
     - Vector pages: Extract native text directly
     - Raster pages: Use OCR to extract text from rendered images
-    - Mixed pages: Prefer vector text, fall back to OCR if vector is empty
+    - Mixed pages: Prefer vector text, fall back to OCR if it finds much more
+
+    Consecutive pages that need OCR are rendered together, up to
+    OCR_RENDER_BATCH_PAGES per poppler invocation. Classification runs at most
+    one batch (or two pages per OCR worker) ahead of the consumer, which keeps
+    rendered images and memory bounded; pages are always yielded in order.
+    One OcrStrategy is shared by the whole range, so the rotation and
+    segmentation mode that worked on earlier pages are tried first.
+
+    With a page_cache and document_id, cached pages skip text extraction and
+    OCR entirely, and freshly processed pages are written back.
+
+    on_event receives page_cache, profile, render and ocr StageEvents.
     """
-    total = len(reader.pages)
+    total = document.page_count
     start = page_offset
     end = total if limit_pages is None else min(start + limit_pages, total)
+    lookahead = OCR_RENDER_BATCH_PAGES
+    if ocr_executor:
+        lookahead = max(lookahead, 2 * ocr_executor.workers)
+    use_cache = page_cache is not None and document_id is not None
+    pending: deque[_PendingPage] = deque()
+    # Consecutive OCR pages waiting to be rendered together
+    batch: list[int] = []
+    # one_based -> OCR result, or future of it when an executor is used
+    ocr_results: dict[int, Future[OcrResult | None] | OcrResult] = {}
+    strategy = OcrStrategy()
+
+    def flush() -> None:
+        if not batch:
+            return
+        with timed_stage(on_event, STAGE_RENDER, batch, dpi=OCR_DPI_RASTER) as attrs:
+            rendered = render_pages(document.path, batch[0], batch[-1], temp_dir)
+            attrs["rendered"] = len(rendered)
+        for page_number in batch:
+            image_path = rendered.get(page_number)
+            if image_path is None:
+                ocr_results[page_number] = OcrResult(text="")
+                continue
+            if ocr_executor:
+                future = ocr_executor.submit(image_path, *strategy.plan())
+                ocr_results[page_number] = future
+                continue
+            result = ocr_image_file(image_path, *strategy.plan())
+            strategy.record(result)
+            ocr_results[page_number] = result
+        batch.clear()
+
+    def ready() -> bool:
+        page = pending[0]
+        if not page.needs_ocr or len(pending) > lookahead:
+            return True
+        if page.one_based not in ocr_results:
+            return False
+        result = ocr_results[page.one_based]
+        return not isinstance(result, Future) or result.done()
+
+    def finish() -> tuple[int, str, OcrResult | None]:
+        page = pending.popleft()
+        if page.needs_ocr:
+            if page.one_based not in ocr_results:
+                flush()
+            result = ocr_results.pop(page.one_based)
+            if isinstance(result, Future):
+                assert ocr_executor is not None
+                result = ocr_executor.result(result) or OcrResult(text="")
+                strategy.record(result)
+            page.text = (_select_page_text(page.text, result.text) or "").strip()
+            page.ocr_result = result
+            if on_event is not None and result.attempts:
+                # OCR ran inline or in a worker process; report its own timings
+                on_event(
+                    StageEvent(
+                        stage=STAGE_OCR,
+                        pages=(page.one_based,),
+                        wall_seconds=result.seconds,
+                        cpu_seconds=result.cpu_seconds,
+                        attrs={
+                            "dpi": OCR_DPI_RASTER,
+                            "width": result.width,
+                            "height": result.height,
+                            "psm": result.psm,
+                            "rotation": result.rotation,
+                            "confidence": round(result.confidence, 1),
+                            "passes": result.attempts,
+                        },
+                    )
+                )
+        # Pages whose render or OCR failed (no passes ran) are not cached, so
+        # a later run retries them
+        failed = page.ocr_result is not None and page.ocr_result.attempts == 0
+        if use_cache and not page.from_cache and not failed:
+            assert page_cache is not None and document_id is not None
+            page_cache.put_page(
+                document_id,
+                page.one_based - 1,
+                OCR_DPI_RASTER,
+                ocr_mode,
+                page.text,
+                page.ocr_result,
+            )
+        return page.one_based, page.text, page.ocr_result
+
     for idx in range(start, end):
         one_based = idx + 1
-        # Try vector text extraction first (fast, accurate for text-based PDFs)
-        vector_text = extract_text_from_page(reader, idx)
-        
-        # Always try OCR for raster pages, and also for pages with minimal vector text
-        # (vector extraction might miss content in complex layouts or scanned pages)
-        ocr_text = ocr_page(pdf_path, one_based, temp_dir)
-        
-        # Combine both sources: prefer vector if substantial, otherwise use OCR
-        # If both exist, combine them (vector might have structure, OCR might have more content)
-        if vector_text and len(vector_text) > 50:
-            # Vector text is substantial - use it, but append OCR if it adds content
-            if ocr_text and len(ocr_text) > len(vector_text) * 1.5:
-                # OCR found significantly more - use OCR as primary
-                page_text = ocr_text
-            else:
-                page_text = vector_text
-        elif ocr_text:
-            # OCR found content - use it
-            page_text = ocr_text
-        elif vector_text:
-            # Only vector text (even if short) - use it
-            page_text = vector_text
+        cached = None
+        if use_cache:
+            assert page_cache is not None and document_id is not None
+            with timed_stage(on_event, STAGE_PAGE_CACHE, [one_based]) as attrs:
+                cached = page_cache.get_page(document_id, idx, OCR_DPI_RASTER, ocr_mode)
+                attrs["hit"] = cached is not None
+        if cached is not None:
+            text, cached_ocr = cached
+            pending.append(_PendingPage(one_based, text, False, True, cached_ocr))
+            flush()
         else:
-            # Both empty - still yield with empty text so LLM can note the page exists
-            page_text = ""
-        
-        page_text = (page_text or "").strip()
-        # Yield all pages, even if empty (LLM can handle empty pages)
-        yield one_based, page_text
+            with timed_stage(on_event, STAGE_PROFILE, [one_based]) as attrs:
+                profile = document.profile(idx)
+                ocr = needs_ocr(profile, ocr_mode)
+                attrs.update(
+                    chars=len(profile.text),
+                    image_coverage=round(profile.image_coverage, 3),
+                    needs_ocr=ocr,
+                )
+            if ocr:
+                batch.append(one_based)
+            if not ocr or len(batch) >= OCR_RENDER_BATCH_PAGES:
+                # A vector page ends the contiguous run; render what we have
+                flush()
+            pending.append(_PendingPage(one_based, profile.text, ocr))
+        while pending and ready():
+            yield finish()
+    flush()
+    while pending:
+        yield finish()
 
 
-def run_extraction(
-    pdf_path: Path,
+def _preprocess_page_texts(
+    page_texts: Iterator[tuple[int, str, OcrResult | None]],
+    on_event: EventHook | None = None,
+    sample_pages: int = BOILERPLATE_SAMPLE_PAGES,
+) -> Iterator[tuple[int, str, OcrResult | None]]:
+    """
+    Wrap _iter_page_text, stripping boilerplate lines and compacting whitespace.
+
+    The first sample_pages pages are held back so lines repeated across them
+    are recognized on those pages too; after that pages stream through, and
+    every page still counts toward detection. on_event receives a preprocess
+    StageEvent per page with the lines, characters and estimated tokens removed.
+    """
+    preprocessor = PagePreprocessor()
+    held: deque[tuple[int, str, OcrResult | None]] = deque()
+
+    def clean(item: tuple[int, str, OcrResult | None]) -> tuple[int, str, OcrResult | None]:
+        one_based, text, ocr_result = item
+        with timed_stage(on_event, STAGE_PREPROCESS, [one_based]) as attrs:
+            cleaned = preprocessor.apply(text)
+            attrs.update(
+                lines_removed=cleaned.lines_removed,
+                chars_removed=cleaned.chars_removed,
+                tokens_saved=_estimate_tokens(text) - _estimate_tokens(cleaned.text),
+            )
+        return one_based, cleaned.text, ocr_result
+
+    for item in page_texts:
+        preprocessor.observe(item[1])
+        held.append(item)
+        if preprocessor.pages_seen >= sample_pages:
+            while held:
+                yield clean(held.popleft())
+    while held:
+        yield clean(held.popleft())
+
+
+@contextmanager
+def _prefetched(items: Iterator[_T], depth: int) -> Iterator[Iterator[_T]]:
+    """
+    Run an iterator in a background thread, at most depth items ahead of the consumer.
+
+    The bounded queue is the backpressure: the producer blocks once depth
+    items are waiting. Exceptions from the producer are re-raised to the
+    consumer. On exit the producer is told to stop and joined; it finishes
+    the step it is in (e.g. one page's OCR) first, and the iterator is closed
+    in its own thread.
+    """
+    done = object()
+    ready: queue.Queue[tuple[Any, BaseException | None]] = queue.Queue(maxsize=max(depth, 1))
+    stop = threading.Event()
+
+    def put(item: Any, error: BaseException | None = None) -> bool:
+        while not stop.is_set():
+            try:
+                ready.put((item, error), timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(done, e)
+            return
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+        put(done)
+
+    def consume() -> Iterator[_T]:
+        while True:
+            item, error = ready.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+
+    producer = threading.Thread(target=produce, name="pdfharvest-page-text", daemon=True)
+    producer.start()
+    try:
+        yield consume()
+    finally:
+        stop.set()
+        producer.join()
+
+
+def _page_context(one_based: int, page_text: str) -> str:
+    """Return the LLM context block for one page, noting pages without text."""
+    if not page_text:
+        return (
+            f"[Page {one_based}]\n[This page appears to be empty or contains only "
+            "images/graphics with no extractable text.]"
+        )
+    return f"[Page {one_based}]\n{page_text}"
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+@dataclass
+class _LlmReply:
+    """Raw LLM output for one request plus what it cost."""
+
+    output: str
+    cached: bool = False
+    retries: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # A duplicate request was fired, and its reply was the one used
+    hedged: bool = False
+    hedge_won: bool = False
+
+
+def _reply_text(result: object) -> str:
+    """Text content of an LLM reply."""
+    content = getattr(result, "content", None)
+    return content if isinstance(content, str) else str(result)
+
+
+def _stream_reply(
+    llm: ChatOpenAI,
+    messages: list[Any],
+    splitter: _PageRowSplitter,
+    delimiter: str,
+    emit: Callable[[int, list[list[str]]], None],
+    cancel: threading.Event | None = None,
+) -> Any:
+    """
+    Consume llm.stream(messages), passing each page's rows so far to emit as rows complete.
+
+    Stops reading (closing the response) once cancel is set. Returns the
+    merged reply message, with token usage when the API reports it.
+    """
+    parser = RowStreamParser(delimiter)
+    message: Any = None
+
+    def publish(rows: list[list[str]]) -> None:
+        pages = {page for row in rows if (page := splitter.add(row)) is not None}
+        for page in sorted(pages):
+            emit(page, list(splitter.by_page[page]))
+
+    with closing(llm.stream(messages, stream_usage=True)) as chunks:
+        for chunk in chunks:
+            message = chunk if message is None else message + chunk
+            content = getattr(chunk, "content", "")
+            publish(parser.feed(content if isinstance(content, str) else ""))
+            if cancel is not None and cancel.is_set():
+                return message
+    publish(parser.close())
+    return message if message is not None else AIMessageChunk(content="")
+
+
+def _token_usage(result: object) -> tuple[int, int]:
+    """(prompt_tokens, completion_tokens) reported with an LLM reply, or zeros."""
+    usage = getattr(result, "usage_metadata", None)
+    if isinstance(usage, dict):
+        return int(usage.get("input_tokens") or 0), int(usage.get("output_tokens") or 0)
+    metadata = getattr(result, "response_metadata", None)
+    usage = metadata.get("token_usage") if isinstance(metadata, dict) else None
+    if isinstance(usage, dict):
+        return int(usage.get("prompt_tokens") or 0), int(usage.get("completion_tokens") or 0)
+    return 0, 0
+
+
+def _invoke_pages(
+    llm: ChatOpenAI,
+    prompt: ChatPromptTemplate,
+    user_prompt: str,
+    pages: list[tuple[int, str]],
+    include_header: str,
+    output_format: str,
+    *,
+    model: str = "",
+    response_cache: ResponseCache | None = None,
+    llm_slots: AbstractContextManager[Any] | None = None,
+    scheduler: LlmScheduler | None = None,
+    hedger: Hedger | None = None,
+    hedge_llm: ChatOpenAI | None = None,
+    hedge_model: str = "",
+    header: list[str] | None = None,
+    on_rows: RowsHook | None = None,
+) -> _LlmReply:
+    """
+    Send one or more consecutive pages to the LLM and return its raw text output.
+
+    Each page is delimited by its [Page N] marker. With a response_cache, an
+    identical earlier request (same model and formatted messages) is
+    answered from the cache without an API call. llm_slots, if given, is
+    held only around the API call itself. The call runs through scheduler
+    (a fresh LlmScheduler if None), which applies rate limits and retries
+    rate limits, timeouts, connection errors and 5xx responses. With a
+    hedger, a request that straggles is duplicated to hedge_llm (model
+    hedge_model; default: llm) and the first non-empty reply is used.
+
+    With on_rows, the reply is streamed and on_rows(page, header, rows) is
+    called with a page's rows so far (header: the known or newly found
+    header) each time rows of it complete. A retried attempt starts its
+    pages over, and only the first attempt to stream rows reports them, so
+    the parsed reply remains the authoritative result.
+
+    Raises:
+        ExtractionError: If the LLM call fails.
+    """
+    messages = prompt.format_messages(
+        question=user_prompt,
+        context="\n\n".join(_page_context(n, text) for n, text in pages),
+        include_header=include_header,
+        output_format=output_format,
+    )
+    if response_cache is not None:
+        cached = response_cache.get_response(model, messages)
+        if cached is not None:
+            return _LlmReply(cached, cached=True)
+    if scheduler is None:
+        scheduler = LlmScheduler()
+    retries = 0
+
+    def count_retry(error: Exception, delay: float) -> None:
+        nonlocal retries
+        retries += 1
+
+    # Prompt plus a completion of similar size, corrected once usage is known
+    estimated = 2 * sum(_estimate_tokens(str(m.content)) for m in messages)
+
+    delimiter = _get_delimiter(output_format)
+    page_numbers = [n for n, _ in pages]
+    # The attempt (primary or hedge) whose rows are reported
+    streaming: list[object] = []
+    streaming_lock = threading.Lock()
+
+    def attempt(target: ChatOpenAI, cancel: threading.Event | None = None) -> Any:
+        owner = object()
+
+        def emit(page: int, rows: list[list[str]]) -> None:
+            with streaming_lock:
+                if not streaming:
+                    streaming.append(owner)
+                if streaming[0] is not owner:
+                    return
+            on_rows(page, header or splitter.new_header, rows)
+
+        def call() -> Any:
+            nonlocal splitter
+            with llm_slots or nullcontext():
+                if on_rows is None:
+                    return target.invoke(messages)
+                splitter = _PageRowSplitter(page_numbers, header)
+                return _stream_reply(target, messages, splitter, delimiter, emit, cancel)
+
+        splitter = _PageRowSplitter(page_numbers, header)
+
+        return scheduler.run(call, tokens=estimated, on_retry=count_retry, cancel=cancel)
+
+    hedged = hedge_won = False
+    try:
+        if hedger is None:
+            result = attempt(llm)
+        else:
+            outcome = hedger.run(
+                lambda cancel: attempt(llm, cancel),
+                lambda cancel: attempt(hedge_llm or llm, cancel),
+                valid=lambda reply: bool(_reply_text(reply).strip()),
+            )
+            result, hedged, hedge_won = outcome.result, outcome.hedged, outcome.hedge_won
+    except Exception as e:
+        raise ExtractionError(f"LLM invocation failed: {e}") from e
+    output = _reply_text(result)
+    if response_cache is not None:
+        response_cache.put_response(hedge_model if hedge_won and hedge_model else model, messages, output)
+    prompt_tokens, completion_tokens = _token_usage(result)
+    scheduler.record_tokens(estimated, prompt_tokens + completion_tokens)
+    return _LlmReply(
+        output, False, retries, prompt_tokens, completion_tokens, hedged=hedged, hedge_won=hedge_won
+    )
+
+
+def _split_page_rows(
+    page_output: str,
+    delimiter: str,
+    page_numbers: list[int],
+    header: list[str] | None,
+) -> tuple[list[str] | None, dict[int, list[list[str]]]]:
+    """
+    Parse one request's output into (header discovered in it, data rows by page).
+
+    The header is only returned when none was known yet; repeated headers are
+    dropped. Each data row is attributed to the page named in its first
+    column when that page was part of the request, otherwise to the page of
+    the row before it (the first page for leading rows), and its first column
+    is forced to that actual PDF page number.
+    """
+    if not page_output:
+        return None, {}
+    splitter = _PageRowSplitter(page_numbers, header)
+    for row in parse_rows(page_output, delimiter):
+        splitter.add(row)
+    return splitter.new_header, splitter.by_page
+
+
+@dataclass
+class PageResult:
+    """Extraction output and timings for one page, as yielded by iter_extraction."""
+
+    page_number: int
+    rows: list[list[str]]
+    # Header row, set only on the page whose request discovered it
+    header: list[str] | None = None
+    ocr_result: OcrResult | None = None
+    # Wall time LLM dispatch waited for the page text (cache, extraction,
+    # render, OCR); near zero while text acquisition keeps ahead
+    text_seconds: float = 0.0
+    # Wall time of the LLM request that carried this page (shared by packed pages)
+    llm_seconds: float = 0.0
+
+    @property
+    def ocr_used(self) -> bool:
+        """True if the page text came from OCR (now or from the page cache)."""
+        return self.ocr_result is not None
+
+
+def _open_document(pdf: Path | Document) -> AbstractContextManager[Document]:
+    """Context for a Document: an open one is left open, a path is opened and closed."""
+    return nullcontext(pdf) if isinstance(pdf, Document) else Document(pdf)
+
+
+def iter_extraction(
+    pdf_path: Path | Document,
     user_prompt: str,
     *,
     page_offset: int = 0,
@@ -177,112 +840,470 @@ def run_extraction(
     api_key: str,
     model: str,
     progress_callback: Callable[[float, str], None] | None = None,
-) -> tuple[list[list[str]], int, int]:
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ocr_mode: str = DEFAULT_OCR_MODE,
+    ocr_workers: int | None = None,
+    page_cache: PageTextCache | None = None,
+    document_id: str | None = None,
+    response_cache: ResponseCache | None = None,
+    pack_tokens: int | None = None,
+    header: list[str] | None = None,
+    llm_slots: AbstractContextManager[Any] | None = None,
+    on_event: EventHook | None = None,
+    preprocess: bool = False,
+    prefetch_pages: int | None = None,
+    scheduler: LlmScheduler | None = None,
+    llm_clients: LlmClientPool | None = None,
+    hedge: HedgePolicy | None = None,
+    on_rows: RowsHook | None = None,
+) -> Iterator[PageResult]:
     """
-    Run full extraction over the PDF and return merged rows and counts.
+    Run extraction over the PDF, yielding each page's result as it completes.
+
+    Extraction is a pipeline of three stages running at the same time: page
+    text acquisition (profiling, cache lookups and rendering, one background
+    thread), OCR (``ocr_workers`` processes, or inline in that thread) and
+    LLM requests (``max_concurrency`` threads). Bounded queues between them
+    (``prefetch_pages`` texts, a render batch of OCR pages, ``max_concurrency``
+    requests) keep memory flat on large documents.
+
+    Requests are sent one at a time until a header row has been discovered;
+    after that up to ``max_concurrency`` requests are kept in flight at once.
+    With ``pack_tokens``, consecutive pages are packed into one request until
+    their estimated text tokens would exceed the budget, and the rows are
+    split back out by page_number. Pages (and progress) are always yielded in
+    page order; closing the generator early cancels outstanding requests.
 
     Args:
-        pdf_path: Path to the stored PDF.
+        pdf_path: Path to the stored PDF, or an open Document to reuse (it
+            is left open); a path is opened as a Document for this run.
         user_prompt: User's extraction request.
         page_offset: Zero-based index of first page to process.
         limit_pages: Max pages to process (None = all after offset).
-        output_format: 'CSV' or 'TSV'.
+        output_format: One of OUTPUT_FORMATS; for Parquet and Arrow the
+            model is asked for CSV (write the rows with columnar).
         api_key: OpenRouter API key.
         model: Model name.
         progress_callback: Optional (progress_0_to_1, message) callback.
+        max_concurrency: Max concurrent LLM requests (1 = strictly serial).
+        ocr_mode: 'auto' (OCR only pages that need it), 'always' or 'never'.
+        ocr_workers: OCR worker processes (None = PDFHARVEST_OCR_WORKERS;
+            1 = OCR inline without a process pool).
+        page_cache: Optional page text cache consulted before text extraction
+            and OCR; its hits/misses counters report cache use.
+        document_id: Content hash of the PDF used as the cache key (taken
+            from the Document, hashing it once, when a page_cache is given
+            and this is None).
+        response_cache: Optional LLM response cache; repeated page requests
+            are answered from it without an API call.
+        pack_tokens: Approximate page-text token budget per request (None or
+            0 = one page per request). A page larger than the budget is sent
+            on its own.
+        header: Header row already discovered (e.g. by an earlier run of the
+            same job); skips header discovery, so no page reports a header.
+        llm_slots: Optional shared semaphore (threading or multiprocessing)
+            held around each API call, capping requests across documents.
+        on_event: Optional hook receiving a StageEvent (wall and CPU time
+            plus details) for every page_cache, profile, render, ocr, llm and
+            parse stage; pass a telemetry.Telemetry to get a run summary.
+        preprocess: Strip page numbers and header/footer lines repeated
+            across pages, and compact whitespace, before text is sent (see
+            preprocess.PagePreprocessor). The first few pages are held back
+            until repeated lines can be recognized.
+        prefetch_pages: Page texts acquired ahead of LLM dispatch (None =
+            DEFAULT_PREFETCH_PAGES, or twice max_concurrency if larger; 0 =
+            no background thread, text is acquired between requests).
+        scheduler: LlmScheduler applying rate limits, retries and adaptive
+            concurrency to every API call; share one across runs to share
+            its limits (None = a new one for this run from
+            LlmScheduler.from_env).
+        llm_clients: Pool whose keep-alive HTTP client (per API key) the
+            run's requests use (None = LlmClientPool.shared(), reused by
+            every run in the process).
+        hedge: Opt-in hedging of straggling requests (see hedging.Hedger):
+            a request still running past the policy's latency percentile of
+            this run is duplicated, optionally to hedge.fallback_model, and
+            the first non-empty reply wins. None = no hedging.
+        on_rows: Optional hook that streams replies: it is called from the
+            request threads as on_rows(page_number, header, rows_so_far)
+            whenever rows of a page complete, before its request finishes.
+            The rows are a preview; the yielded PageResult (parsed from the
+            whole reply) is final. Cached replies are not reported.
 
-    Returns:
-        (output_rows, extracted_pages_count, effective_total_pages).
+    Yields:
+        PageResult for every page in range, in page order.
 
     Raises:
-        ExtractionError: If PDF is unreadable or extraction fails critically.
+        ValidationError: If ocr_mode is not one of OCR_MODES.
+        PDFError: If the PDF cannot be opened or parsed.
+        ExtractionError: If extraction fails critically.
     """
-    reader = PdfReader(str(pdf_path))
-    total_pages = len(reader.pages)
-    remaining = total_pages - page_offset
-    effective_total = min(remaining, limit_pages) if limit_pages else remaining
-    if effective_total <= 0:
-        return [], 0, effective_total
+    if ocr_mode not in OCR_MODES:
+        raise ValidationError(f"OCR mode must be one of: {', '.join(OCR_MODES)}.")
+    with _open_document(pdf_path) as document:
+        total_pages = document.page_count
+        remaining = total_pages - page_offset
+        effective_total = min(remaining, limit_pages) if limit_pages else remaining
+        if effective_total <= 0:
+            return
 
-    llm = _build_llm(api_key, model)
-    prompt = _build_prompt()
-    delimiter = _get_delimiter(output_format)
-    output_rows: list[list[str]] = []
-    header: list[str] | None = None
-    extracted_pages = 0
-    processed = 0
+        prompt = _build_prompt()
+        output_format = _text_format(output_format)
+        delimiter = _get_delimiter(output_format)
+        max_concurrency = max(1, max_concurrency)
+        if scheduler is None:
+            # Room for a hedge next to every request when hedging
+            scheduler = LlmScheduler.from_env(max_concurrency * (2 if hedge is not None else 1))
+        if ocr_workers is None:
+            ocr_workers = get_ocr_workers()
+        if page_cache is not None and document_id is None:
+            document_id = document.document_id
+        processed = 0
+        pending: deque[tuple[list[PageResult], Future[tuple[str, float]]]] = deque()
+        # Consecutive pages waiting to be packed into one request
+        pack: list[tuple[PageResult, str]] = []
+        pack_used = 0
 
-    with tempfile.TemporaryDirectory(dir=str(pdf_path.parent)) as temp_dir:
-        for one_based, page_text in _iter_page_text(
-            pdf_path, reader, page_offset, limit_pages, temp_dir
-        ):
-            processed += 1
-            if progress_callback:
-                progress_callback(
-                    processed / max(effective_total, 1),
-                    f"Extracting page {processed}/{effective_total}",
+        def invoke(pages: list[tuple[int, str]], include_header: str) -> tuple[str, float]:
+            started = time.perf_counter()
+            page_numbers = [n for n, _ in pages]
+            with timed_stage(
+                on_event, STAGE_LLM, page_numbers, include_header=include_header == "yes"
+            ) as attrs:
+                reply = _invoke_pages(
+                    llm,
+                    prompt,
+                    user_prompt,
+                    pages,
+                    include_header,
+                    output_format,
+                    model=model,
+                    response_cache=response_cache,
+                    llm_slots=llm_slots,
+                    scheduler=scheduler,
+                    hedger=hedger,
+                    hedge_llm=hedge_llm,
+                    hedge_model=hedge_model or "",
+                    header=header,
+                    on_rows=on_rows,
+                )
+                attrs.update(
+                    hedged=reply.hedged,
+                    hedge_won=reply.hedge_won,
+                    cached=reply.cached,
+                    retries=reply.retries,
+                    prompt_tokens=reply.prompt_tokens,
+                    completion_tokens=reply.completion_tokens,
                 )
-            include_header = "yes" if header is None else "no"
-            # If page appears empty, give LLM context about it
-            if not page_text:
-                context = f"[Page {one_based}]\n[This page appears to be empty or contains only images/graphics with no extractable text.]"
-            else:
-                context = f"[Page {one_based}]\n{page_text}"
-            messages = prompt.format_messages(
-                question=user_prompt,
-                context=context,
-                include_header=include_header,
-                output_format=output_format,
+            return reply.output, time.perf_counter() - started
+
+        def collect(results: list[PageResult], output: str, seconds: float) -> list[PageResult]:
+            nonlocal header, processed
+            page_numbers = [r.page_number for r in results]
+            with timed_stage(on_event, STAGE_PARSE, page_numbers) as attrs:
+                new_header, by_page = _split_page_rows(output, delimiter, page_numbers, header)
+                attrs["rows"] = sum(len(rows) for rows in by_page.values())
+            if new_header is not None:
+                header = new_header
+                results[0].header = new_header
+            for result in results:
+                processed += 1
+                if progress_callback:
+                    progress_callback(
+                        processed / max(effective_total, 1),
+                        f"Extracting page {processed}/{effective_total}",
+                    )
+                result.rows = by_page.get(result.page_number, [])
+                result.llm_seconds = seconds
+            return results
+
+        def drain(keep: int) -> list[PageResult]:
+            done: list[PageResult] = []
+            while len(pending) > keep:
+                results, future = pending.popleft()
+                done.extend(collect(results, *future.result()))
+            return done
+
+        def dispatch() -> list[PageResult]:
+            nonlocal pack_used
+            if not pack:
+                return []
+            results = [r for r, _ in pack]
+            pages = [(r.page_number, text) for r, text in pack]
+            pack.clear()
+            pack_used = 0
+            if header is None or max_concurrency == 1:
+                # Header discovery is serial: the first request that yields a
+                # header row decides the columns for every later request.
+                include_header = "yes" if header is None else "no"
+                return collect(results, *invoke(pages, include_header))
+            pending.append((results, executor.submit(invoke, pages, "no")))
+            return drain(max_concurrency - 1)
+
+        if llm_clients is None:
+            llm_clients = LlmClientPool.shared()
+        with (
+            # Outermost: the client is released after in-flight requests end
+            llm_clients.lease(
+                api_key, get_openrouter_base_url(), _openrouter_headers()
+            ) as http_client,
+            # Outlives the request threads that wait on its attempts
+            (
+                Hedger(hedge, max_workers=max_concurrency) if hedge is not None else nullcontext()
+            ) as hedger,
+            tempfile.TemporaryDirectory(dir=str(document.path.parent)) as temp_dir,
+            ThreadPoolExecutor(max_workers=max_concurrency) as executor,
+            OcrExecutor(ocr_workers) if ocr_workers > 1 else nullcontext() as ocr_executor,
+            # Innermost: the text thread is stopped before OCR workers shut down
+            ExitStack() as stack,
+        ):
+            llm = _build_llm(api_key, model, http_client=http_client)
+            hedge_model = hedge.fallback_model if hedge is not None else None
+            hedge_llm = (
+                _build_llm(api_key, hedge_model, http_client=http_client) if hedge_model else None
             )
             try:
-                result = llm.invoke(messages)
-            except Exception as e:
-                raise ExtractionError(f"LLM invocation failed: {e}") from e
-            page_output = getattr(result, "content", None) or str(result)
-            if not page_output:
-                continue
-            rows = parse_rows(page_output, delimiter)
-            if not rows:
-                continue
-            page_has_data = False
-            for row in rows:
-                if not row:
-                    continue
-                if header is None and row[0].strip().lower() == "page_number":
-                    header = row
-                    output_rows.append(header)
-                    continue
-                if header and row == header:
-                    continue
-                # Ensure first column (page_number) is the actual PDF page number
-                data_row = [str(one_based)] + row[1:]
-                output_rows.append(data_row)
-                page_has_data = True
-            if page_has_data:
-                extracted_pages += 1
-
-    return output_rows, extracted_pages, effective_total
+                page_texts = _iter_page_text(
+                    document,
+                    page_offset,
+                    limit_pages,
+                    temp_dir,
+                    ocr_mode,
+                    ocr_executor,
+                    page_cache,
+                    document_id,
+                    on_event,
+                )
+                if preprocess:
+                    page_texts = _preprocess_page_texts(page_texts, on_event)
+                if prefetch_pages is None:
+                    prefetch_pages = max(DEFAULT_PREFETCH_PAGES, 2 * max_concurrency)
+                if prefetch_pages > 0:
+                    page_texts = stack.enter_context(_prefetched(page_texts, prefetch_pages))
+                while True:
+                    started = time.perf_counter()
+                    item = next(page_texts, None)
+                    if item is None:
+                        break
+                    one_based, page_text, ocr_result = item
+                    result = PageResult(
+                        page_number=one_based,
+                        rows=[],
+                        ocr_result=ocr_result,
+                        text_seconds=time.perf_counter() - started,
+                    )
+                    tokens = _estimate_tokens(_page_context(one_based, page_text))
+                    if pack and (not pack_tokens or pack_used + tokens > pack_tokens):
+                        yield from dispatch()
+                    pack.append((result, page_text))
+                    pack_used += tokens
+                    if not pack_tokens or pack_used >= pack_tokens:
+                        yield from dispatch()
+                yield from dispatch()
+                yield from drain(0)
+            finally:
+                for _, future in pending:
+                    future.cancel()
 
 
-def serialize_rows(rows: list[list[str]], output_format: str) -> str:
+def run_extraction(
+    pdf_path: Path | Document,
+    user_prompt: str,
+    *,
+    page_offset: int = 0,
+    limit_pages: int | None = None,
+    output_format: str = OUTPUT_FORMAT_CSV,
+    api_key: str,
+    model: str,
+    progress_callback: Callable[[float, str], None] | None = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ocr_mode: str = DEFAULT_OCR_MODE,
+    ocr_results: dict[int, OcrResult] | None = None,
+    ocr_workers: int | None = None,
+    page_cache: PageTextCache | None = None,
+    document_id: str | None = None,
+    response_cache: ResponseCache | None = None,
+    pack_tokens: int | None = None,
+    llm_slots: AbstractContextManager[Any] | None = None,
+    on_event: EventHook | None = None,
+    preprocess: bool = False,
+    prefetch_pages: int | None = None,
+    scheduler: LlmScheduler | None = None,
+    llm_clients: LlmClientPool | None = None,
+    hedge: HedgePolicy | None = None,
+    on_rows: RowsHook | None = None,
+    output_rows: RowSink | None = None,
+) -> tuple[list[list[str]] | RowSink, int, int]:
     """
-    Serialize rows to CSV or TSV string.
+    Run full extraction over the PDF and return merged rows and counts.
+
+    Thin wrapper over iter_extraction that collects every page's rows, with
+    the header row first once discovered. See iter_extraction for the
+    remaining arguments.
 
     Args:
-        rows: List of row lists.
-        output_format: 'CSV' or 'TSV'.
+        pdf_path: Path to the stored PDF, or an open Document.
+        user_prompt: User's extraction request.
+        ocr_results: Optional dict; filled with one-based page number ->
+            OcrResult (text, chosen PSM, confidence, OCR seconds) for every
+            OCR'd page.
+        on_event: Optional StageEvent hook; pass a telemetry.Telemetry and
+            call its summary() afterwards for totals and percentiles.
+        output_rows: Optional RowSink the rows are appended to, returned
+            in place of a list: a RowStore, so a large result spills to
+            disk, or a columnar.ColumnarWriter, so rows are written to a
+            Parquet/Arrow file as pages complete.
 
     Returns:
-        Final text (no trailing newline).
+        (output_rows, extracted_pages_count, effective_total_pages).
+
+    Raises:
+        ValidationError: If ocr_mode is not one of OCR_MODES.
+        ExtractionError: If PDF is unreadable or extraction fails critically.
+    """
+    return collect_page_results(
+        iter_extraction(
+            pdf_path,
+            user_prompt,
+            page_offset=page_offset,
+            limit_pages=limit_pages,
+            output_format=output_format,
+            api_key=api_key,
+            model=model,
+            progress_callback=progress_callback,
+            max_concurrency=max_concurrency,
+            ocr_mode=ocr_mode,
+            ocr_workers=ocr_workers,
+            page_cache=page_cache,
+            document_id=document_id,
+            response_cache=response_cache,
+            pack_tokens=pack_tokens,
+            llm_slots=llm_slots,
+            on_event=on_event,
+            preprocess=preprocess,
+            prefetch_pages=prefetch_pages,
+            scheduler=scheduler,
+            llm_clients=llm_clients,
+            hedge=hedge,
+            on_rows=on_rows,
+        ),
+        ocr_results,
+        output_rows,
+    )
+
+
+def collect_page_results(
+    results: Iterable[PageResult],
+    ocr_results: dict[int, OcrResult] | None = None,
+    output_rows: RowSink | None = None,
+) -> tuple[list[list[str]] | RowSink, int, int]:
+    """
+    Merge PageResults into (output_rows, extracted_pages_count, pages_count).
+
+    The header row is placed where it was discovered (normally first).
+
+    Args:
+        results: PageResults in page order, e.g. from iter_extraction.
+        ocr_results: Optional dict filled with page number -> OcrResult.
+        output_rows: Optional RowSink (e.g. RowStore) to append the rows to
+            (default: a new list).
+    """
+    rows: list[list[str]] | RowSink = [] if output_rows is None else output_rows
+    extracted_pages = 0
+    pages = 0
+    for result in results:
+        pages += 1
+        if result.header is not None:
+            rows.append(result.header)
+        rows.extend(result.rows)
+        if result.rows:
+            extracted_pages += 1
+        if result.ocr_result is not None and ocr_results is not None:
+            ocr_results[result.page_number] = result.ocr_result
+    return rows, extracted_pages, pages
+
+
+def iter_serialized(
+    rows: Iterable[list[str]],
+    output_format: str,
+    *,
+    chunk_chars: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[str]:
+    """
+    Serialize rows to CSV or TSV text incrementally, in chunks of about chunk_chars.
+
+    The chunks joined are the text serialize_rows returns (rows separated by
+    newlines, none after the last), but only one chunk is held at a time.
+
+    Args:
+        rows: Row lists, e.g. a list or a RowStore (read in batches).
+        output_format: 'CSV' or 'TSV'.
     """
-    delimiter = _get_delimiter(output_format)
     buffer = io.StringIO()
     writer = csv.writer(
         buffer,
-        delimiter=delimiter,
+        delimiter=_get_delimiter(output_format),
         quoting=csv.QUOTE_MINIMAL,
         lineterminator="\n",
     )
+    # Each flush holds back its final newline, written only if more rows follow
+    lead = ""
     for row in rows:
         writer.writerow(row)
-    return buffer.getvalue().rstrip("\n")
+        if buffer.tell() >= chunk_chars:
+            yield lead + buffer.getvalue()[:-1]
+            lead = "\n"
+            buffer.seek(0)
+            buffer.truncate()
+    text = buffer.getvalue()
+    if text:
+        yield lead + text[:-1]
+
+
+def serialize_rows(rows: Iterable[list[str]], output_format: str) -> str:
+    """
+    Serialize rows to CSV or TSV string.
+
+    Prefer iter_serialized or write_rows for large results.
+
+    Args:
+        rows: Row lists, e.g. a list or a RowStore (read in batches).
+        output_format: 'CSV' or 'TSV'.
+
+    Returns:
+        Final text (no trailing newline).
+    """
+    return "".join(iter_serialized(rows, output_format))
+
+
+def write_rows(
+    rows: Iterable[list[str]],
+    output_format: str,
+    path: Path,
+    *,
+    compress: bool = False,
+) -> None:
+    """
+    Stream rows to path as CSV or TSV (UTF-8), gzip-compressed if compress.
+
+    The text is that of serialize_rows. It is written to a temporary file
+    next to path and renamed into place, so path never holds a partial
+    result.
+
+    Raises:
+        StorageError: If the file cannot be written.
+    """
+    partial = path.with_name(f".{path.name}.part")
+    try:
+        if compress:
+            stream: IO[str] = gzip.open(partial, "wt", encoding="utf-8", newline="")
+        else:
+            stream = partial.open("w", encoding="utf-8", newline="")
+        with stream:
+            for chunk in iter_serialized(rows, output_format):
+                stream.write(chunk)
+        partial.replace(path)
+    except OSError as e:
+        raise StorageError(f"Failed to write {path}: {e}") from e
+    finally:
+        partial.unlink(missing_ok=True)
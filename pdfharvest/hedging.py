@@ -0,0 +1,161 @@
+"""Hedged LLM requests: duplicate a straggling request and keep the first good reply."""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Generic, TypeVar
+
+from pdfharvest.config import (
+    HEDGE_MAX_EXTRA_FRACTION,
+    HEDGE_MIN_DELAY,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
+    get_hedge_enabled,
+    get_hedge_model,
+)
+
+_T = TypeVar("_T")
+
+# An attempt receives an event that is set once the other attempt has won
+Attempt = Callable[[threading.Event], _T]
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    """When to fire a duplicate LLM request, and where to send it."""
+
+    # Hedge once a request has run longer than this latency percentile of the run
+    percentile: float = HEDGE_PERCENTILE
+    # Completed requests needed before the percentile is trusted
+    min_samples: int = HEDGE_MIN_SAMPLES
+    # Extra requests allowed, as a fraction of the run's requests
+    max_extra_fraction: float = HEDGE_MAX_EXTRA_FRACTION
+    # Never hedge a request younger than this (seconds)
+    min_delay: float = HEDGE_MIN_DELAY
+    # Model for the duplicate request (None = the run's model)
+    fallback_model: str | None = None
+
+    @classmethod
+    def from_env(cls) -> HedgePolicy | None:
+        """Policy from PDFHARVEST_HEDGE / PDFHARVEST_HEDGE_MODEL, or None if disabled."""
+        if not get_hedge_enabled():
+            return None
+        return cls(fallback_model=get_hedge_model())
+
+
+@dataclass(frozen=True)
+class HedgeOutcome(Generic[_T]):
+    """Winning result of a hedged request."""
+
+    result: _T
+    hedged: bool = False
+    # True if the duplicate request's result was used
+    hedge_won: bool = False
+
+
+class Hedger:
+    """
+    Per-run hedging state: observed latencies, extra-request budget, counters.
+
+    run() sends the primary attempt and, if it is still running after the
+    policy's latency percentile of the run so far, a hedge attempt. The
+    first attempt to return a valid result wins; the other is cancelled
+    through its event (an attempt not yet sent is never sent; one already on
+    the wire is left to finish and its result dropped).
+    """
+
+    def __init__(self, policy: HedgePolicy, *, max_workers: int) -> None:
+        self.policy = policy
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(2, 2 * max_workers), thread_name_prefix="pdfharvest-hedge"
+        )
+        self._lock = threading.Lock()
+        self._latencies: list[float] = []
+        self.requests = 0
+        self.fired = 0
+        self.won = 0
+
+    def __enter__(self) -> Hedger:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop the attempt threads; losing attempts still on the wire are abandoned."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def threshold(self) -> float | None:
+        """Seconds after which a request is hedged, or None while too few have completed."""
+        with self._lock:
+            n = len(self._latencies)
+            if n < max(1, self.policy.min_samples):
+                return None
+            index = min(n - 1, max(0, math.ceil(self.policy.percentile * n) - 1))
+            return max(self._latencies[index], self.policy.min_delay)
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self.fired + 1 > self.policy.max_extra_fraction * self.requests:
+                return False
+            self.fired += 1
+            return True
+
+    def run(
+        self,
+        primary: Attempt[_T],
+        hedge: Attempt[_T],
+        valid: Callable[[_T], bool] = lambda result: True,
+    ) -> HedgeOutcome[_T]:
+        """
+        Run primary, hedged with hedge when it straggles; return the first valid result.
+
+        If no attempt returns a valid result, the primary's result (or its
+        error, else the hedge's error) is used.
+        """
+        with self._lock:
+            self.requests += 1
+        delay = self.threshold()
+        started = time.perf_counter()
+        cancels = {True: threading.Event(), False: threading.Event()}
+        futures: dict[Future[_T], bool] = {self._executor.submit(primary, cancels[False]): False}
+        if delay is not None:
+            done, _ = wait(futures, timeout=delay)
+            if not done and self._take_budget():
+                futures[self._executor.submit(hedge, cancels[True])] = True
+
+        winner: Future[_T] | None = None
+        pending = set(futures)
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # The primary wins a tie
+            for future in sorted(done, key=futures.__getitem__):
+                if future.exception() is None and valid(future.result()):
+                    winner = future
+                    break
+        for future, is_hedge in futures.items():
+            if future is not winner:
+                cancels[is_hedge].set()
+                future.cancel()
+
+        hedged = len(futures) > 1
+        if winner is None:
+            # Both done (pending is empty): fall back to the primary's outcome
+            by_role = {is_hedge: future for future, is_hedge in futures.items()}
+            first = by_role[False]
+            if first.exception() is not None and hedged and by_role[True].exception() is None:
+                first = by_role[True]
+            hedge_won = first is not by_role[False]
+            with self._lock:
+                self.won += hedge_won
+            return HedgeOutcome(first.result(), hedged, hedge_won)
+        hedge_won = futures[winner]
+        with self._lock:
+            bisect.insort(self._latencies, time.perf_counter() - started)
+            self.won += hedge_won
+        return HedgeOutcome(winner.result(), hedged, hedge_won)
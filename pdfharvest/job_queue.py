@@ -0,0 +1,200 @@
+"""SQLite-backed queue of extraction jobs shared by the UI and background workers."""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from pdfharvest.config import MAX_JOB_ATTEMPTS, get_job_lease, get_jobs_dir
+from pdfharvest.exceptions import StorageError
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    api_key TEXT,
+    submitted REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    heartbeat REAL,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, submitted);
+"""
+
+
+@dataclass(frozen=True)
+class QueuedJob:
+    """Queue state of one job; the job's settings and pages live in its journal."""
+
+    job_id: str
+    status: str
+    submitted: float
+    started: float | None = None
+    finished: float | None = None
+    worker: str | None = None
+    attempts: int = 0
+    error: str | None = None
+
+
+class JobQueue:
+    """
+    Job queue in one SQLite file (WAL mode), safe across processes and containers.
+
+    Jobs are claimed oldest first inside an immediate transaction, so two
+    workers never take the same job. A running job whose worker stops sending
+    heartbeats for `lease` seconds is requeued; because the job journal keeps
+    completed pages, the next worker resumes rather than starts over. An API
+    key submitted with a job is kept only until the job leaves the queue.
+    """
+
+    def __init__(self, path: Path, *, lease: float | None = None) -> None:
+        self.path = path
+        self.lease = lease if lease is not None else get_job_lease()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+            finally:
+                conn.close()
+        except (OSError, sqlite3.Error) as e:
+            raise StorageError(f"Failed to open job queue {path}: {e}") from e
+
+    @classmethod
+    def default(cls) -> JobQueue:
+        """Queue at <jobs dir>/queue.sqlite3."""
+        return cls(get_jobs_dir() / "queue.sqlite3")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> None:
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(sql, params)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            raise StorageError(f"Job queue {self.path} failed: {e}") from e
+
+    def submit(self, job_id: str, *, api_key: str | None = None) -> None:
+        """Queue a job (again, if it already exists, e.g. to retry a failed one)."""
+        self._execute(
+            "INSERT OR REPLACE INTO jobs (job_id, status, api_key, submitted, attempts) "
+            "VALUES (?, ?, ?, ?, 0)",
+            (job_id, JOB_QUEUED, api_key, time.time()),
+        )
+
+    def claim(self, worker_id: str) -> tuple[str, str | None] | None:
+        """
+        Take the oldest queued job for worker_id.
+
+        Returns:
+            (job_id, api_key or None), or None if nothing is queued.
+        """
+        now = time.time()
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._expire_leases(conn, now)
+                    row = conn.execute(
+                        "SELECT job_id, api_key FROM jobs WHERE status = ? "
+                        "ORDER BY submitted LIMIT 1",
+                        (JOB_QUEUED,),
+                    ).fetchone()
+                    if row is not None:
+                        conn.execute(
+                            "UPDATE jobs SET status = ?, started = ?, heartbeat = ?, "
+                            "worker = ?, attempts = attempts + 1 WHERE job_id = ?",
+                            (JOB_RUNNING, now, now, worker_id, row[0]),
+                        )
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            raise StorageError(f"Job queue {self.path} failed: {e}") from e
+        return (row[0], row[1]) if row is not None else None
+
+    def _expire_leases(self, conn: sqlite3.Connection, now: float) -> None:
+        """Requeue running jobs whose worker went silent; fail them after MAX_JOB_ATTEMPTS."""
+        stale = now - self.lease
+        conn.execute(
+            "UPDATE jobs SET status = ?, finished = ?, api_key = NULL, "
+            "error = 'Worker stopped responding.' "
+            "WHERE status = ? AND heartbeat < ? AND attempts >= ?",
+            (JOB_FAILED, now, JOB_RUNNING, stale, MAX_JOB_ATTEMPTS),
+        )
+        conn.execute(
+            "UPDATE jobs SET status = ?, worker = NULL WHERE status = ? AND heartbeat < ?",
+            (JOB_QUEUED, JOB_RUNNING, stale),
+        )
+
+    def heartbeat(self, job_id: str, worker_id: str) -> None:
+        """Extend worker_id's lease on a running job."""
+        self._execute(
+            "UPDATE jobs SET heartbeat = ? WHERE job_id = ? AND worker = ? AND status = ?",
+            (time.time(), job_id, worker_id, JOB_RUNNING),
+        )
+
+    def complete(self, job_id: str) -> None:
+        """Mark a job done and forget its API key."""
+        self._execute(
+            "UPDATE jobs SET status = ?, finished = ?, api_key = NULL, error = NULL "
+            "WHERE job_id = ?",
+            (JOB_DONE, time.time(), job_id),
+        )
+
+    def fail(self, job_id: str, error: str) -> None:
+        """Mark a job failed with an error message and forget its API key."""
+        self._execute(
+            "UPDATE jobs SET status = ?, finished = ?, api_key = NULL, error = ? "
+            "WHERE job_id = ?",
+            (JOB_FAILED, time.time(), error, job_id),
+        )
+
+    def remove(self, job_id: str) -> None:
+        """Drop a job from the queue (its journal is not touched)."""
+        self._execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def get(self, job_id: str) -> QueuedJob | None:
+        """Return a job's queue state, or None if it was never submitted."""
+        return next(self._select("WHERE job_id = ?", (job_id,)), None)
+
+    def jobs(self) -> list[QueuedJob]:
+        """Return every job in the queue, oldest first."""
+        return list(self._select("ORDER BY submitted"))
+
+    def _select(self, where: str, params: tuple = ()) -> Iterator[QueuedJob]:
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT job_id, status, submitted, started, finished, worker, attempts, error "
+                    f"FROM jobs {where}",
+                    params,
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            raise StorageError(f"Job queue {self.path} failed: {e}") from e
+        return (QueuedJob(*row) for row in rows)
@@ -0,0 +1,401 @@
+"""Resumable extraction jobs backed by an append-only per-page journal."""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from pdfharvest.cache import PageTextCache, ResponseCache
+from pdfharvest.config import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_OCR_MODE,
+    OUTPUT_FORMAT_CSV,
+    get_jobs_dir,
+)
+from pdfharvest.exceptions import StorageError, ValidationError
+from pdfharvest.extraction import (
+    PageResult,
+    RowsHook,
+    collect_page_results,
+    iter_extraction,
+)
+from pdfharvest.hedging import HedgePolicy
+from pdfharvest.pdf_utils import Document, OcrResult
+from pdfharvest.scheduler import LlmScheduler
+from pdfharvest.storage import StoredUpload, release_upload
+from pdfharvest.telemetry import EventHook
+
+# Bump when the journal record layout changes incompatibly
+JOURNAL_VERSION = 1
+
+DOCUMENT_FILE_NAME = "document.pdf"
+JOURNAL_FILE_NAME = "journal.jsonl"
+
+_JOB_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+@dataclass
+class JobState:
+    """A job's parameters and the pages its journal has recorded so far."""
+
+    job_id: str
+    job_dir: Path
+    user_prompt: str
+    page_offset: int
+    limit_pages: int | None
+    output_format: str
+    model: str
+    ocr_mode: str
+    pack_tokens: int | None
+    created: float
+    preprocess: bool = False
+    # Stored upload the job references instead of its own copy of the PDF
+    upload: StoredUpload | None = None
+    # Completed pages in page order (rows, header and OCR details only)
+    pages: list[PageResult] = field(default_factory=list)
+    finished: bool = False
+
+    @property
+    def pdf_path(self) -> Path:
+        if self.upload is not None:
+            return self.upload.path
+        return self.job_dir / DOCUMENT_FILE_NAME
+
+    @property
+    def document_id(self) -> str | None:
+        """Content hash of the PDF, if known without reading it."""
+        return self.upload.document_id if self.upload is not None else None
+
+    @property
+    def journal_path(self) -> Path:
+        return self.job_dir / JOURNAL_FILE_NAME
+
+    @property
+    def header(self) -> list[str] | None:
+        """Header row discovered by an earlier run, if any."""
+        for page in self.pages:
+            if page.header is not None:
+                return page.header
+        return None
+
+
+def _job_dir(job_id: str, jobs_dir: Path | None) -> Path:
+    if not _JOB_ID_RE.fullmatch(job_id):
+        raise ValidationError(f"Invalid job id: {job_id!r}")
+    return (jobs_dir or get_jobs_dir()) / job_id
+
+
+def _append_record(journal: Any, record: dict[str, Any]) -> None:
+    """Append one JSON line and force it to disk before the caller moves on."""
+    journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+    journal.flush()
+    os.fsync(journal.fileno())
+
+
+def create_job(
+    pdf: Path | StoredUpload,
+    user_prompt: str,
+    *,
+    page_offset: int = 0,
+    limit_pages: int | None = None,
+    output_format: str = OUTPUT_FORMAT_CSV,
+    model: str,
+    ocr_mode: str = DEFAULT_OCR_MODE,
+    pack_tokens: int | None = None,
+    preprocess: bool = False,
+    jobs_dir: Path | None = None,
+) -> str:
+    """
+    Create a job directory for the PDF and start its journal.
+
+    Only settings that change the output are journaled; the API key and
+    runtime tuning (concurrency, caches, OCR workers) are passed on each run.
+
+    Args:
+        pdf: A StoredUpload, which the job references in place (its
+            reference passes to the job and is released by delete_job), or
+            a plain PDF path, which is moved into the job directory. Either
+            way the caller no longer owns it.
+        jobs_dir: Parent directory for jobs (default: get_jobs_dir()).
+
+    Returns:
+        The new job id.
+
+    Raises:
+        StorageError: If the job directory or journal cannot be written.
+    """
+    job_id = uuid.uuid4().hex
+    job_dir = _job_dir(job_id, jobs_dir)
+    try:
+        job_dir.mkdir(parents=True)
+        if isinstance(pdf, StoredUpload):
+            upload: dict[str, str] | None = {
+                "path": str(pdf.path.resolve()),
+                "document_id": pdf.document_id,
+                "ref": pdf.ref,
+            }
+        else:
+            upload = None
+            shutil.move(str(pdf), str(job_dir / DOCUMENT_FILE_NAME))
+        with (job_dir / JOURNAL_FILE_NAME).open("a", encoding="utf-8") as journal:
+            _append_record(
+                journal,
+                {
+                    "type": "job",
+                    "version": JOURNAL_VERSION,
+                    "user_prompt": user_prompt,
+                    "page_offset": page_offset,
+                    "limit_pages": limit_pages,
+                    "output_format": output_format,
+                    "model": model,
+                    "ocr_mode": ocr_mode,
+                    "pack_tokens": pack_tokens,
+                    "preprocess": preprocess,
+                    "upload": upload,
+                    "created": time.time(),
+                },
+            )
+    except OSError as e:
+        raise StorageError(f"Failed to create job in {job_dir}: {e}") from e
+    return job_id
+
+
+def load_job(job_id: str, *, jobs_dir: Path | None = None) -> JobState:
+    """
+    Read a job's journal.
+
+    A torn last line (the process died mid-write) is dropped from the file,
+    so the next append starts on a clean line.
+
+    Raises:
+        ValidationError: If job_id is malformed.
+        StorageError: If the job does not exist or its journal is unreadable.
+    """
+    job_dir = _job_dir(job_id, jobs_dir)
+    journal_path = job_dir / JOURNAL_FILE_NAME
+    try:
+        data = journal_path.read_bytes()
+        complete = data[: data.rfind(b"\n") + 1]
+        if len(complete) != len(data):
+            with journal_path.open("r+b") as f:
+                f.truncate(len(complete))
+    except OSError as e:
+        raise StorageError(f"Failed to read job {job_id}: {e}") from e
+
+    records = []
+    for line in complete.decode("utf-8").splitlines():
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    if not records or records[0].get("type") != "job":
+        raise StorageError(f"Job {job_id} has no job record.")
+    if records[0].get("version") != JOURNAL_VERSION:
+        raise StorageError(f"Job {job_id} was written by an incompatible version.")
+
+    job = records[0]
+    state = JobState(
+        job_id=job_id,
+        job_dir=job_dir,
+        user_prompt=job["user_prompt"],
+        page_offset=job["page_offset"],
+        limit_pages=job["limit_pages"],
+        output_format=job["output_format"],
+        model=job["model"],
+        ocr_mode=job["ocr_mode"],
+        pack_tokens=job["pack_tokens"],
+        created=job["created"],
+        preprocess=job.get("preprocess", False),
+    )
+    if job.get("upload"):
+        upload = job["upload"]
+        state.upload = StoredUpload(Path(upload["path"]), upload["document_id"], upload["ref"])
+    for record in records[1:]:
+        if record.get("type") == "page":
+            ocr = record.get("ocr")
+            state.pages.append(
+                PageResult(
+                    page_number=record["page"],
+                    rows=record["rows"],
+                    header=record.get("header"),
+                    ocr_result=OcrResult(**ocr) if ocr else None,
+                )
+            )
+        elif record.get("type") == "done":
+            state.finished = True
+    return state
+
+
+def list_jobs(*, jobs_dir: Path | None = None) -> list[JobState]:
+    """Return all readable jobs, oldest first."""
+    root = jobs_dir or get_jobs_dir()
+    if not root.is_dir():
+        return []
+    jobs = []
+    for job_dir in root.iterdir():
+        if not _JOB_ID_RE.fullmatch(job_dir.name):
+            continue
+        try:
+            jobs.append(load_job(job_dir.name, jobs_dir=root))
+        except StorageError:
+            continue
+    return sorted(jobs, key=lambda job: job.created)
+
+
+def delete_job(job_id: str, *, jobs_dir: Path | None = None) -> None:
+    """Remove a job's directory and release its PDF. Ignore errors."""
+    try:
+        release_upload(load_job(job_id, jobs_dir=jobs_dir).upload)
+    except StorageError:
+        pass
+    shutil.rmtree(_job_dir(job_id, jobs_dir), ignore_errors=True)
+
+
+def iter_job(
+    job_id: str,
+    *,
+    api_key: str,
+    jobs_dir: Path | None = None,
+    progress_callback: Callable[[float, str], None] | None = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ocr_workers: int | None = None,
+    page_cache: PageTextCache | None = None,
+    response_cache: ResponseCache | None = None,
+    on_event: EventHook | None = None,
+    document: Document | None = None,
+    scheduler: LlmScheduler | None = None,
+    hedge: HedgePolicy | None = None,
+    on_rows: RowsHook | None = None,
+) -> Iterator[PageResult]:
+    """
+    Run a job from its first unfinished page, journaling each page as it completes.
+
+    Pages already in the journal are yielded first (without timings), so the
+    caller always sees the whole job. Each new page is on disk before it is
+    yielded; if the run dies, the next call picks up after the last one.
+
+    The job's PDF is opened once as a Document for counting and extraction;
+    pass document to reuse one the caller already has open (left open).
+    scheduler (shared rate limits), hedge (hedging of slow requests) and
+    on_rows (rows streamed before their page completes) are passed to
+    iter_extraction.
+
+    Raises:
+        ValidationError, StorageError: As load_job.
+        PDFError, ExtractionError: As iter_extraction.
+    """
+    state = load_job(job_id, jobs_dir=jobs_dir)
+    opened = (
+        nullcontext(document)
+        if document is not None
+        else Document(state.pdf_path, document_id=state.document_id)
+    )
+    with opened as document:
+        remaining = document.page_count - state.page_offset
+        total = min(remaining, state.limit_pages) if state.limit_pages else remaining
+        total = max(total, 0)
+        done = 0
+
+        def report() -> None:
+            if progress_callback:
+                progress_callback(done / max(total, 1), f"Extracting page {done}/{total}")
+
+        for page in state.pages:
+            done += 1
+            report()
+            yield page
+        if state.finished:
+            return
+
+        resumed = len(state.pages)
+        limit_pages = state.limit_pages - resumed if state.limit_pages else None
+        try:
+            journal = state.journal_path.open("a", encoding="utf-8")
+        except OSError as e:
+            raise StorageError(f"Failed to open journal for job {job_id}: {e}") from e
+        with journal:
+            if limit_pages is None or limit_pages > 0:
+                for page in iter_extraction(
+                    document,
+                    state.user_prompt,
+                    page_offset=state.page_offset + resumed,
+                    limit_pages=limit_pages,
+                    output_format=state.output_format,
+                    api_key=api_key,
+                    model=state.model,
+                    max_concurrency=max_concurrency,
+                    ocr_mode=state.ocr_mode,
+                    ocr_workers=ocr_workers,
+                    page_cache=page_cache,
+                    document_id=state.document_id,
+                    response_cache=response_cache,
+                    pack_tokens=state.pack_tokens,
+                    header=state.header,
+                    on_event=on_event,
+                    preprocess=state.preprocess,
+                    scheduler=scheduler,
+                    hedge=hedge,
+                    on_rows=on_rows,
+                ):
+                    ocr = asdict(page.ocr_result) if page.ocr_result is not None else None
+                    _append_record(
+                        journal,
+                        {
+                            "type": "page",
+                            "page": page.page_number,
+                            "rows": page.rows,
+                            "header": page.header,
+                            "ocr": ocr,
+                        },
+                    )
+                    done += 1
+                    report()
+                    yield page
+            _append_record(journal, {"type": "done"})
+
+
+def resume_extraction(
+    job_id: str,
+    *,
+    api_key: str,
+    jobs_dir: Path | None = None,
+    progress_callback: Callable[[float, str], None] | None = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ocr_workers: int | None = None,
+    page_cache: PageTextCache | None = None,
+    response_cache: ResponseCache | None = None,
+    ocr_results: dict[int, OcrResult] | None = None,
+    on_event: EventHook | None = None,
+    scheduler: LlmScheduler | None = None,
+    hedge: HedgePolicy | None = None,
+) -> tuple[list[list[str]], int, int]:
+    """
+    Run or continue a job to completion; same return value as run_extraction.
+
+    Pages recorded in the journal are not re-extracted, OCR'd or sent to the
+    LLM again. The job directory is kept; call delete_job when done with it.
+    """
+    return collect_page_results(
+        iter_job(
+            job_id,
+            api_key=api_key,
+            jobs_dir=jobs_dir,
+            progress_callback=progress_callback,
+            max_concurrency=max_concurrency,
+            ocr_workers=ocr_workers,
+            page_cache=page_cache,
+            response_cache=response_cache,
+            on_event=on_event,
+            scheduler=scheduler,
+            hedge=hedge,
+        ),
+        ocr_results,
+    )
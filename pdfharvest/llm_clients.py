@@ -0,0 +1,175 @@
+"""Process-wide pool of keep-alive HTTP clients for LLM API requests."""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, Mapping
+
+import httpx
+
+from pdfharvest.config import (
+    LLM_CLIENT_IDLE_SECONDS,
+    LLM_CLIENT_POOL_MAX_CLIENTS,
+    LLM_CONNECT_TIMEOUT,
+    LLM_KEEPALIVE_SECONDS,
+    get_llm_max_connections,
+    get_llm_timeout,
+)
+
+# (API key hash, base URL, sorted extra headers)
+ClientKey = tuple[str, str, tuple[tuple[str, str], ...]]
+
+
+def api_key_hash(api_key: str) -> str:
+    """Identify an API key without keeping it in memory as a dict key."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class _Entry:
+    client: httpx.Client
+    leases: int = 0
+    last_used: float = 0.0
+    # Removed from the pool; closed once its last lease ends
+    retired: bool = False
+
+
+class LlmClientPool:
+    """
+    Share keep-alive httpx clients between extraction runs and sessions.
+
+    One client (and so one connection pool and TLS session cache) is kept per
+    API key, base URL and header set. Runs lease a client for their duration;
+    a client is only closed when no run holds it: when it has been unused for
+    idle_seconds, when more than max_clients are pooled (least recently used
+    first), or when discard() is called for its key (e.g. after rotation).
+    """
+
+    _shared: LlmClientPool | None = None
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        *,
+        max_connections: int | None = None,
+        keepalive_expiry: float = LLM_KEEPALIVE_SECONDS,
+        timeout: float | None = None,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        max_clients: int = LLM_CLIENT_POOL_MAX_CLIENTS,
+        idle_seconds: float = LLM_CLIENT_IDLE_SECONDS,
+        clock: Callable[[], float] | None = None,
+    ) -> None:
+        self.max_connections = max(1, max_connections or get_llm_max_connections())
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout if timeout is not None else get_llm_timeout()
+        self.connect_timeout = connect_timeout
+        self.max_clients = max(1, max_clients)
+        self.idle_seconds = idle_seconds
+        self._clock = clock or time.monotonic
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[ClientKey, _Entry] = OrderedDict()
+        # Clients created vs. leases served by an existing client
+        self.created = 0
+        self.reused = 0
+
+    @classmethod
+    def shared(cls) -> LlmClientPool:
+        """The process-wide pool, created on first use from the environment."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _new_client(self) -> httpx.Client:
+        return httpx.Client(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+        )
+
+    def _retire(self, key: ClientKey) -> httpx.Client | None:
+        """Drop key from the pool; return its client if it can be closed now."""
+        entry = self._entries.pop(key)
+        entry.retired = True
+        return entry.client if entry.leases == 0 else None
+
+    def _evict(self) -> list[httpx.Client]:
+        """Retire idle and surplus unleased clients; return those to close."""
+        now = self._clock()
+        keys = [
+            key
+            for key, entry in self._entries.items()
+            if entry.leases == 0 and now - entry.last_used >= self.idle_seconds
+        ]
+        surplus = len(self._entries) - len(keys) - self.max_clients
+        for key, entry in self._entries.items():
+            if surplus <= 0:
+                break
+            if entry.leases == 0 and key not in keys:
+                keys.append(key)
+                surplus -= 1
+        return [client for key in keys if (client := self._retire(key)) is not None]
+
+    @contextmanager
+    def lease(
+        self,
+        api_key: str,
+        base_url: str,
+        headers: Mapping[str, str] | None = None,
+    ) -> Iterator[httpx.Client]:
+        """
+        Hold the shared client for api_key, base_url and headers while in the block.
+
+        The client is thread-safe; every request of a run can use it at once.
+        """
+        key: ClientKey = (api_key_hash(api_key), base_url, tuple(sorted((headers or {}).items())))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(self._new_client())
+                self._entries[key] = entry
+                self.created += 1
+            else:
+                self.reused += 1
+            self._entries.move_to_end(key)
+            entry.leases += 1
+            to_close = self._evict()
+        for client in to_close:
+            client.close()
+        try:
+            yield entry.client
+        finally:
+            with self._lock:
+                entry.leases -= 1
+                entry.last_used = self._clock()
+                close = entry.retired and entry.leases == 0
+            if close:
+                entry.client.close()
+
+    def discard(self, api_key: str | None = None) -> None:
+        """
+        Retire the clients of api_key (all clients if None), e.g. after key rotation.
+
+        Clients still leased are closed when their last run ends.
+        """
+        with self._lock:
+            keys = [
+                key
+                for key in self._entries
+                if api_key is None or key[0] == api_key_hash(api_key)
+            ]
+            to_close = [client for key in keys if (client := self._retire(key)) is not None]
+        for client in to_close:
+            client.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,150 @@
+"""Process-pool executor for running page OCR in parallel."""
+
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from pdfharvest.config import (
+    get_ocr_shutdown_timeout,
+    get_ocr_task_timeout,
+    get_ocr_workers,
+)
+from pdfharvest.pdf_utils import ocr_image_file
+
+OcrTask = Callable[..., Any]
+
+
+def _run_task(task: OcrTask, *args: Any) -> Any:
+    """Worker entry point: never let a bad page raise out of the worker."""
+    try:
+        return task(*args)
+    except Exception:
+        return None
+
+
+class OcrExecutor:
+    """
+    OCR rendered pages in a pool of worker processes.
+
+    By default each task is ocr_image_file on a PNG produced by render_pages,
+    returning an OcrResult; any picklable task can be used instead.
+
+    Futures are consumed through result(), which turns per-page failures
+    (timeouts, exceptions, crashed workers) into None so one malformed page
+    cannot abort the whole job. If a worker dies, the pool is
+    rebuilt and the pages that were in flight are resubmitted once.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        *,
+        task_timeout: float | None = None,
+        shutdown_timeout: float | None = None,
+        task: OcrTask = ocr_image_file,
+    ) -> None:
+        self.workers = max(1, workers if workers is not None else get_ocr_workers())
+        self.task_timeout = task_timeout if task_timeout is not None else get_ocr_task_timeout()
+        self.shutdown_timeout = (
+            shutdown_timeout if shutdown_timeout is not None else get_ocr_shutdown_timeout()
+        )
+        self._task = task
+        self._pool: ProcessPoolExecutor | None = None
+        # future -> (task args, resubmitted already)
+        self._args: dict[Future[Any], tuple[tuple[Any, ...], bool]] = {}
+        # futures lost to a crashed pool -> their resubmitted replacements
+        self._replacements: dict[Future[Any], Future[Any]] = {}
+
+    def __enter__(self) -> OcrExecutor:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.shutdown()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a multi-threaded Streamlit process is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def _submit(self, args: tuple[Any, ...], retried: bool) -> Future[Any]:
+        future = self._get_pool().submit(_run_task, self._task, *args)
+        self._args[future] = (args, retried)
+        return future
+
+    def submit(self, *args: Any) -> Future[Any]:
+        """Queue one OCR task (e.g. a rendered page's image path) and return its future."""
+        return self._submit(args, False)
+
+    def _restart(self) -> None:
+        """Replace a broken pool and resubmit every page that was still in flight."""
+        old = self._pool
+        self._pool = None
+        if old is not None:
+            old.shutdown(wait=False, cancel_futures=True)
+        for future, (args, retried) in list(self._args.items()):
+            if future.done() and future.exception() is None:
+                continue
+            del self._args[future]
+            if retried:
+                # Second crash while this page was in flight: give up on it
+                replacement: Future[Any] = Future()
+                replacement.set_result(None)
+            else:
+                replacement = self._submit(args, True)
+            self._replacements[future] = replacement
+
+    def result(self, future: Future[Any]) -> Any:
+        """
+        Wait for a page's OCR result.
+
+        Returns:
+            The task's result, or None if the page timed out, failed or
+            crashed its worker.
+        """
+        try:
+            while True:
+                try:
+                    return future.result(timeout=self.task_timeout)
+                except BrokenProcessPool:
+                    if future not in self._replacements:
+                        self._restart()
+                    replacement = self._replacements.pop(future, None)
+                    if replacement is None:
+                        return None
+                    self._args.pop(future, None)
+                    future = replacement
+        except (FutureTimeoutError, CancelledError):
+            future.cancel()
+            return None
+        except Exception:
+            return None
+        finally:
+            self._args.pop(future, None)
+
+    def shutdown(self) -> None:
+        """
+        Cancel queued pages and stop the workers.
+
+        Pages already running get up to shutdown_timeout seconds to finish;
+        workers still alive after that are terminated.
+        """
+        pool = self._pool
+        self._pool = None
+        self._args.clear()
+        self._replacements.clear()
+        if pool is None:
+            return
+        processes = list(getattr(pool, "_processes", {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.join(self.shutdown_timeout)
+            if process.is_alive():
+                process.terminate()
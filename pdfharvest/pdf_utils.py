@@ -1,24 +1,43 @@
 """PDF reading and OCR utilities."""
 
+import hashlib
+import mmap
+import time
+import unicodedata
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
 from pdf2image import convert_from_path
+from PIL import Image
 import pytesseract
-from pypdf import PdfReader
+from pypdf import PageObject, PdfReader
 
-from pdfharvest.config import DEFAULT_OCR_DPI
+from pdfharvest.config import (
+    DEFAULT_OCR_DPI,
+    OCR_IMAGE_COVERAGE_THRESHOLD,
+    OCR_MAX_GARBAGE_RATIO,
+    OCR_MIN_CHAR_DENSITY,
+    OCR_MIN_CONFIDENCE,
+    OCR_MIN_VECTOR_CHARS,
+    OCR_MODE_ALWAYS,
+    OCR_MODE_NEVER,
+    OCR_PSM_ESCALATION,
+    OCR_SPARSE_PSM,
+)
 
 # Higher DPI for better OCR quality on raster/scanned pages
 OCR_DPI_RASTER: int = 300  # Higher quality for scanned documents
 from pdfharvest.exceptions import PDFError
+from pdfharvest.telemetry import cpu_time
 
 
-def get_total_pages(pdf_path: Path) -> int:
+def get_total_pages(pdf_path: "Path | Document") -> int:
     """
     Return the number of pages in the PDF.
 
     Args:
-        pdf_path: Path to the PDF file.
+        pdf_path: Path to the PDF file, or an open Document (no re-parse).
 
     Returns:
         Page count (>= 0).
@@ -26,6 +45,8 @@ def get_total_pages(pdf_path: Path) -> int:
     Raises:
         PDFError: If the file cannot be read as a PDF.
     """
+    if isinstance(pdf_path, Document):
+        return pdf_path.page_count
     try:
         reader = PdfReader(str(pdf_path))
         return len(reader.pages)
@@ -52,6 +73,478 @@ def extract_text_from_page(reader: PdfReader, page_index: int) -> str:
         return ""
 
 
+@dataclass(frozen=True)
+class PageProfile:
+    """Cheap, render-free signals describing a page's vector text layer."""
+
+    text: str
+    image_coverage: float
+    char_density: float
+    garbage_ratio: float
+
+
+# Unicode categories that indicate a broken text layer (bad font encodings
+# often decode to control, private-use or unassigned code points).
+_GARBAGE_CATEGORIES = frozenset({"Cc", "Co", "Cn", "Cs"})
+
+
+def _garbage_ratio(text: str) -> float:
+    """Return the share of non-whitespace characters that look like garbage."""
+    chars = [c for c in text if not c.isspace()]
+    if not chars:
+        return 0.0
+    bad = sum(
+        1 for c in chars if c == "\ufffd" or unicodedata.category(c) in _GARBAGE_CATEGORIES
+    )
+    return bad / len(chars)
+
+
+def _image_xobject_names(resources: Any, depth: int = 0) -> set[str]:
+    """Collect image XObject names from page resources, including nested forms."""
+    names: set[str] = set()
+    if resources is None or depth > 4:
+        return names
+    try:
+        xobjects = resources.get_object().get("/XObject")
+        if xobjects is None:
+            return names
+        for name, ref in xobjects.get_object().items():
+            obj = ref.get_object()
+            subtype = obj.get("/Subtype")
+            if subtype == "/Image":
+                names.add(str(name))
+            elif subtype == "/Form":
+                names |= _image_xobject_names(obj.get("/Resources"), depth + 1)
+    except Exception:
+        pass
+    return names
+
+
+def _page_area_sq_in(page: PageObject) -> float:
+    """Return the page's media box area in square inches."""
+    box = page.mediabox
+    return abs(float(box.width) * float(box.height)) / (72.0 * 72.0)
+
+
+def profile_page(reader: PdfReader, page_index: int) -> PageProfile:
+    """
+    Extract a page's vector text and measure how much of it is covered by images.
+
+    Image coverage is computed from the transformation matrix in effect at each
+    image ``Do`` operator, collected during the same content-stream pass as text
+    extraction, so nothing is rendered.
+
+    Args:
+        reader: Open PdfReader instance.
+        page_index: Zero-based page index.
+
+    Returns:
+        PageProfile for the page (empty text and zero coverage on failure).
+    """
+    try:
+        page = reader.pages[page_index]
+    except Exception:
+        return PageProfile(text="", image_coverage=0.0, char_density=0.0, garbage_ratio=0.0)
+    image_names = _image_xobject_names(page.get("/Resources"))
+    image_area = 0.0
+
+    def visit(operator: bytes, operands: list[Any], cm: list[float], tm: list[float]) -> None:
+        nonlocal image_area
+        if operator == b"Do" and operands and str(operands[0]) in image_names:
+            # Images are drawn into the unit square mapped by the CTM
+            image_area += abs(cm[0] * cm[3] - cm[1] * cm[2])
+
+    try:
+        text = (page.extract_text(visitor_operand_before=visit) or "").strip()
+    except Exception:
+        text = ""
+    try:
+        area = _page_area_sq_in(page)
+    except Exception:
+        area = 0.0
+    if area <= 0:
+        return PageProfile(
+            text=text, image_coverage=0.0, char_density=0.0, garbage_ratio=_garbage_ratio(text)
+        )
+    coverage = min(image_area / (72.0 * 72.0) / area, 1.0)
+    return PageProfile(
+        text=text,
+        image_coverage=coverage,
+        char_density=len(text) / area,
+        garbage_ratio=_garbage_ratio(text),
+    )
+
+
+@dataclass(frozen=True)
+class PageInfo:
+    """Per-page metadata kept by a Document once the page has been profiled."""
+
+    text_length: int
+    image_coverage: float
+    char_density: float
+    garbage_ratio: float
+
+
+class Document:
+    """
+    A PDF opened once: memory-mapped, parsed by one PdfReader, pages loaded lazily.
+
+    Share one Document between page counting, validation and extraction
+    instead of passing the path around, so the cross-reference table is
+    parsed once and file contents are paged in by the OS on demand rather
+    than read into memory. Page objects are only loaded when a page is
+    accessed. The page count, each profiled page's metadata (PageInfo) and
+    the content hash are cached.
+
+    Use as a context manager, or call close(); pages cannot be read after
+    closing. Not thread-safe: use it from one thread at a time. Rendering
+    still goes through poppler, which opens the file by path.
+    """
+
+    def __init__(self, path: Path, *, document_id: str | None = None) -> None:
+        """
+        Args:
+            path: PDF file.
+            document_id: Content hash, if already known (e.g. from storage).
+
+        Raises:
+            PDFError: If the file cannot be opened or parsed as a PDF.
+        """
+        self.path = path
+        self._document_id = document_id
+        self._page_count: int | None = None
+        self._info: dict[int, PageInfo] = {}
+        try:
+            self._file = path.open("rb")
+        except OSError as e:
+            raise PDFError(f"Failed to read PDF: {e}") from e
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.reader = PdfReader(self._mmap)
+        except Exception as e:
+            self.close()
+            raise PDFError(f"Failed to read PDF: {e}") from e
+
+    def __enter__(self) -> "Document":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmap and close the file. Safe to call more than once."""
+        mapped = getattr(self, "_mmap", None)
+        if mapped is not None:
+            mapped.close()
+        self._file.close()
+
+    @property
+    def page_count(self) -> int:
+        """Number of pages (the page tree is walked once)."""
+        if self._page_count is None:
+            try:
+                self._page_count = len(self.reader.pages)
+            except Exception as e:
+                raise PDFError(f"Failed to read PDF: {e}") from e
+        return self._page_count
+
+    @property
+    def document_id(self) -> str:
+        """Hex SHA-256 of the file, hashed from the mapping on first use."""
+        if self._document_id is None:
+            self._document_id = hashlib.sha256(self._mmap).hexdigest()
+        return self._document_id
+
+    def page(self, page_index: int) -> PageObject:
+        """Load one page object (zero-based)."""
+        return self.reader.pages[page_index]
+
+    def profile(self, page_index: int) -> PageProfile:
+        """profile_page for one page; its metadata is kept as page_info."""
+        profile = profile_page(self.reader, page_index)
+        self._info[page_index] = PageInfo(
+            text_length=len(profile.text),
+            image_coverage=profile.image_coverage,
+            char_density=profile.char_density,
+            garbage_ratio=profile.garbage_ratio,
+        )
+        return profile
+
+    def page_info(self, page_index: int) -> PageInfo:
+        """Cached metadata for a page, profiling it first if needed."""
+        if page_index not in self._info:
+            self.profile(page_index)
+        return self._info[page_index]
+
+
+def needs_ocr(profile: PageProfile, ocr_mode: str) -> bool:
+    """
+    Decide whether a page should be rendered and OCR'd.
+
+    In auto mode OCR is used when the vector text is too short, looks like a
+    broken encoding, or when the page is mostly image with little text on it
+    (a scan without a text layer, or with only a caption).
+
+    Args:
+        profile: Result of profile_page.
+        ocr_mode: One of the OCR_MODE_* constants.
+
+    Returns:
+        True if the page should be OCR'd.
+    """
+    if ocr_mode == OCR_MODE_ALWAYS:
+        return True
+    if ocr_mode == OCR_MODE_NEVER:
+        return False
+    if len(profile.text) < OCR_MIN_VECTOR_CHARS:
+        return True
+    if profile.garbage_ratio > OCR_MAX_GARBAGE_RATIO:
+        return True
+    return (
+        profile.image_coverage >= OCR_IMAGE_COVERAGE_THRESHOLD
+        and profile.char_density < OCR_MIN_CHAR_DENSITY
+    )
+
+
+def render_pages(
+    pdf_path: Path,
+    first_page: int,
+    last_page: int,
+    temp_dir: str,
+    dpi: int | None = None,
+) -> dict[int, Path]:
+    """
+    Rasterize a contiguous page range to PNG files with one poppler invocation.
+
+    Args:
+        pdf_path: Path to the PDF file.
+        first_page: One-based first page of the range.
+        last_page: One-based last page of the range (inclusive).
+        temp_dir: Directory the PNG files are written to.
+        dpi: Resolution for rendering. If None, uses OCR_DPI_RASTER.
+
+    Returns:
+        Mapping of one-based page number to rendered PNG path. Empty if
+        rendering fails; pages poppler could not render are missing.
+    """
+    if dpi is None:
+        dpi = OCR_DPI_RASTER
+    try:
+        paths = convert_from_path(
+            str(pdf_path),
+            first_page=first_page,
+            last_page=last_page,
+            dpi=dpi,
+            fmt="png",
+            output_folder=temp_dir,
+            paths_only=True,
+        )
+    except Exception:
+        return {}
+    rendered: dict[int, Path] = {}
+    for raw in paths:
+        path = Path(raw)
+        # pdf2image names files "<prefix>-<zero padded page number>.png"
+        try:
+            rendered[int(path.stem.rsplit("-", 1)[-1])] = path
+        except ValueError:
+            continue
+    return rendered
+
+
+@dataclass(frozen=True)
+class OcrResult:
+    """Text and strategy details for one OCR'd page."""
+
+    text: str
+    psm: int | None = None
+    confidence: float = 0.0  # mean word confidence, 0-100
+    rotation: int = 0  # degrees the page was rotated before OCR
+    seconds: float = 0.0
+    attempts: int = 0  # Tesseract recognition passes run
+    cached: bool = False  # served from the page cache rather than OCR'd now
+    cpu_seconds: float = 0.0  # including the Tesseract processes
+    width: int = 0  # rendered image size in pixels
+    height: int = 0
+
+
+def detect_orientation(image: Any) -> int | None:
+    """
+    Run Tesseract orientation/script detection on a page image.
+
+    Returns:
+        Clockwise rotation in degrees that makes the page upright, or None
+        if OSD fails (typically too little text on the page).
+    """
+    try:
+        osd = pytesseract.image_to_osd(image, output_type=pytesseract.Output.DICT)
+        return int(osd.get("rotate", 0)) % 360
+    except Exception:
+        return None
+
+
+def _recognize(image: Any, psm: int) -> tuple[str, float]:
+    """Run one Tesseract pass and return (text, mean word confidence)."""
+    data = pytesseract.image_to_data(
+        image, config=f"--psm {psm}", output_type=pytesseract.Output.DICT
+    )
+    lines: list[str] = []
+    words: list[str] = []
+    confidences: list[float] = []
+    current: tuple[int, int, int] | None = None
+    for i, word in enumerate(data.get("text", [])):
+        word = (word or "").strip()
+        if not word:
+            continue
+        try:
+            conf = float(data["conf"][i])
+        except (KeyError, IndexError, TypeError, ValueError):
+            conf = -1.0
+        if conf >= 0:
+            confidences.append(conf)
+        line = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        if line != current and words:
+            lines.append(" ".join(words))
+            words = []
+        current = line
+        words.append(word)
+    if words:
+        lines.append(" ".join(words))
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return "\n".join(lines), confidence
+
+
+def ocr_image(
+    image: Any,
+    *,
+    psm: int | None = None,
+    rotation: int | None = None,
+    min_confidence: float = OCR_MIN_CONFIDENCE,
+) -> OcrResult:
+    """
+    OCR a rendered page image with a single confidence-checked Tesseract pass.
+
+    Orientation detection runs when no rotation is given (or when a known
+    rotation gives a low-confidence result). The first pass uses psm, or a
+    mode chosen from the OSD result; other modes in OCR_PSM_ESCALATION are
+    only tried while the mean word confidence stays below min_confidence.
+    The highest-confidence pass wins.
+
+    Args:
+        image: PIL image of the page.
+        psm: Segmentation mode to try first (e.g. remembered from earlier pages).
+        rotation: Known document rotation in degrees; None runs OSD on this page.
+        min_confidence: Mean word confidence (0-100) that stops escalation.
+
+    Returns:
+        OcrResult; empty text if OCR fails or yields nothing.
+    """
+    started = time.perf_counter()
+    cpu_started = cpu_time()
+    attempts = 0
+    detected = rotation is None
+    if rotation is None:
+        rotation = detect_orientation(image)
+        if psm is None and rotation is None:
+            psm = OCR_SPARSE_PSM
+    rotation = rotation or 0
+    best = OcrResult(text="", rotation=rotation)
+
+    def run(page: Any, modes: list[int], page_rotation: int) -> None:
+        nonlocal best, attempts
+        for mode in modes:
+            try:
+                attempts += 1
+                text, confidence = _recognize(page, mode)
+            except Exception:
+                continue
+            text = text.strip()
+            if text and (
+                not best.text
+                or confidence > best.confidence
+                or (confidence == best.confidence and len(text) > len(best.text))
+            ):
+                best = OcrResult(
+                    text=text, psm=mode, confidence=confidence, rotation=page_rotation
+                )
+            if best.text and best.confidence >= min_confidence:
+                return
+
+    first = psm if psm is not None else OCR_PSM_ESCALATION[0]
+    modes = [first] + [m for m in OCR_PSM_ESCALATION if m != first]
+    run(image.rotate(-rotation, expand=True) if rotation else image, modes, rotation)
+    if best.confidence < min_confidence and not detected:
+        # The document-level rotation may not hold for this page
+        page_rotation = detect_orientation(image)
+        if page_rotation is not None and page_rotation != rotation:
+            run(image.rotate(-page_rotation, expand=True), [best.psm or first], page_rotation)
+    return OcrResult(
+        text=best.text,
+        psm=best.psm,
+        confidence=best.confidence,
+        rotation=best.rotation,
+        seconds=time.perf_counter() - started,
+        attempts=attempts,
+        cpu_seconds=cpu_time() - cpu_started,
+        width=image.width,
+        height=image.height,
+    )
+
+
+class OcrStrategy:
+    """
+    Per-document OCR state: the detected rotation and the winning PSM.
+
+    plan() gives the (psm, rotation) hints for the next page; record() feeds
+    back each page's result so later pages start with the mode that worked.
+    """
+
+    def __init__(self, min_confidence: float = OCR_MIN_CONFIDENCE) -> None:
+        self.min_confidence = min_confidence
+        self.psm: int | None = None
+        self.rotation: int | None = None
+
+    def plan(self) -> tuple[int | None, int | None]:
+        """Return (psm, rotation) to pass to ocr_image for the next page."""
+        return self.psm, self.rotation
+
+    def record(self, result: OcrResult) -> None:
+        """Remember a page's winning strategy if it was confident enough."""
+        if not result.text or result.confidence < self.min_confidence:
+            return
+        self.psm = result.psm
+        if self.rotation is None:
+            self.rotation = result.rotation
+
+
+def ocr_image_file(
+    image_path: Path,
+    psm: int | None = None,
+    rotation: int | None = None,
+) -> OcrResult:
+    """
+    OCR a rendered page image file, then delete it.
+
+    Args:
+        image_path: PNG written by render_pages.
+        psm: Segmentation mode to try first (see ocr_image).
+        rotation: Known document rotation, or None to detect it.
+
+    Returns:
+        OcrResult; empty text if the file cannot be read or OCR fails.
+    """
+    try:
+        with Image.open(image_path) as image:
+            return ocr_image(image, psm=psm, rotation=rotation)
+    except Exception:
+        return OcrResult(text="")
+    finally:
+        try:
+            image_path.unlink()
+        except OSError:
+            pass
+
+
 def ocr_page(
     pdf_path: Path,
     page_number: int,
@@ -61,6 +554,9 @@ def ocr_page(
     """
     Run Tesseract OCR on a single PDF page (raster or mixed content).
 
+    Renders just this page; use render_pages and ocr_image_file to OCR
+    several pages from one poppler invocation.
+
     Args:
         pdf_path: Path to the PDF file.
         page_number: One-based page number (as in pypdf enumeration).
@@ -87,34 +583,7 @@ def ocr_page(
         return ""
     image = images[0]
     try:
-        # Try multiple OCR strategies for better coverage
-        # PSM 6 = Assume uniform block of text (good for most pages)
-        # PSM 11 = Sparse text (fallback for complex layouts)
-        # PSM 3 = Fully automatic page segmentation (most flexible)
-        # PSM 1 = Automatic page segmentation with OSD (orientation detection)
-        
-        strategies = [
-            ("--psm 6", "uniform text"),
-            ("--psm 3", "auto segmentation"),
-            ("--psm 11", "sparse text"),
-            ("--psm 1", "auto with OSD"),
-        ]
-        
-        best_text = ""
-        for config, _desc in strategies:
-            try:
-                text = pytesseract.image_to_string(image, config=config) or ""
-                text = text.strip()
-                # Prefer longer results (more content detected)
-                if len(text) > len(best_text):
-                    best_text = text
-                # If we got substantial text, use it
-                if len(text) > 100:
-                    return text
-            except Exception:
-                continue
-        
-        return best_text
+        return ocr_image(image).text
     except Exception:
         return ""
     finally:
@@ -0,0 +1,115 @@
+"""Opt-in page text preprocessing that trims tokens before text is sent to the LLM."""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from pdfharvest.config import (
+    BOILERPLATE_EDGE_LINES,
+    BOILERPLATE_MIN_PAGES,
+    BOILERPLATE_MIN_RATIO,
+)
+
+# A line that is only a page number: "7", "- 7 -", "Page 7", "Page 7 of 500", "7/500"
+_PAGE_NUMBER_RE = re.compile(
+    r"(?:page\s*)?[-–—]?\s*\d{1,5}\s*[-–—]?(?:\s*(?:of|/)\s*\d{1,5})?", re.IGNORECASE
+)
+# A page reference inside a running header/footer ("Directory - Page 7 of 500")
+_PAGE_REF_RE = re.compile(r"\bpage\s*\d{1,5}(?:\s*(?:of|/)\s*\d{1,5})?", re.IGNORECASE)
+# Runs of horizontal whitespace (OCR column gaps, PSM 11 spacing)
+_HSPACE_RE = re.compile(r"[^\S\n]{2,}")
+
+
+def compact_whitespace(text: str) -> str:
+    """
+    Normalize whitespace without changing line structure.
+
+    Lines are stripped, runs of spaces/tabs inside a line shrink to two spaces
+    (so column gaps stay visible) and runs of blank lines shrink to one.
+    """
+    lines: list[str] = []
+    for raw in text.splitlines():
+        line = _HSPACE_RE.sub("  ", raw.strip())
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return "\n".join(lines).strip("\n")
+
+
+def _line_key(line: str) -> str:
+    """Key for matching a line across pages; the page number itself is ignored."""
+    return _PAGE_REF_RE.sub("page #", " ".join(line.split())).casefold()
+
+
+def _edge_indexes(lines: list[str], edge_lines: int) -> list[int]:
+    """Indexes of the first and last edge_lines non-blank lines."""
+    nonblank = [i for i, line in enumerate(lines) if line.strip()]
+    if len(nonblank) <= 2 * edge_lines:
+        return nonblank
+    return nonblank[:edge_lines] + nonblank[-edge_lines:]
+
+
+@dataclass(frozen=True)
+class PreprocessedText:
+    """A page's text after preprocessing, with what was removed."""
+
+    text: str
+    lines_removed: int
+    chars_removed: int
+
+
+class PagePreprocessor:
+    """
+    Strip running headers, footers and page numbers, then compact whitespace.
+
+    Only lines among the first/last edge_lines of a page are candidates. A
+    candidate is boilerplate once it has been observed on at least min_pages
+    pages and at least min_ratio of all pages observed. Lines are removed
+    from the top and from the bottom only up to the first line that is not
+    boilerplate, so repeated field labels in the body are never removed. Call observe() for every page of a
+    document (in any order) and apply() to get the text to send.
+    """
+
+    def __init__(
+        self,
+        *,
+        edge_lines: int = BOILERPLATE_EDGE_LINES,
+        min_pages: int = BOILERPLATE_MIN_PAGES,
+        min_ratio: float = BOILERPLATE_MIN_RATIO,
+    ) -> None:
+        self.edge_lines = edge_lines
+        self.min_pages = min_pages
+        self.min_ratio = min_ratio
+        self.pages_seen = 0
+        self._counts: Counter[str] = Counter()
+
+    def observe(self, text: str) -> None:
+        """Count the page's edge lines toward boilerplate detection."""
+        lines = text.splitlines()
+        self.pages_seen += 1
+        self._counts.update({_line_key(lines[i]) for i in _edge_indexes(lines, self.edge_lines)})
+
+    def is_boilerplate(self, line: str) -> bool:
+        """True if line is a page number or has repeated across enough pages."""
+        if _PAGE_NUMBER_RE.fullmatch(line.strip()):
+            return True
+        count = self._counts[_line_key(line)]
+        return count >= self.min_pages and count >= self.min_ratio * self.pages_seen
+
+    def apply(self, text: str) -> PreprocessedText:
+        """Return the page text with boilerplate edge lines removed and whitespace compacted."""
+        lines = text.splitlines()
+        nonblank = [i for i, line in enumerate(lines) if line.strip()]
+        drop: set[int] = set()
+        for edge in (nonblank[: self.edge_lines], nonblank[::-1][: self.edge_lines]):
+            for i in edge:
+                if not self.is_boilerplate(lines[i]):
+                    break
+                drop.add(i)
+        cleaned = compact_whitespace("\n".join(line for i, line in enumerate(lines) if i not in drop))
+        return PreprocessedText(
+            text=cleaned,
+            lines_removed=len(drop),
+            chars_removed=len(text) - len(cleaned),
+        )
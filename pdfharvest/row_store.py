@@ -0,0 +1,177 @@
+"""Result rows held in memory up to a budget and spilled to a temporary SQLite file beyond it."""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import weakref
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from pdfharvest.config import RESULT_READ_BATCH_ROWS, get_result_memory_bytes, get_results_dir
+from pdfharvest.exceptions import StorageError
+
+# Approximate CPython overhead of a row list and of each cell string, in bytes
+_ROW_OVERHEAD = 64
+_CELL_OVERHEAD = 56
+
+
+def _row_size(row: list[str]) -> int:
+    return _ROW_OVERHEAD + sum(_CELL_OVERHEAD + len(cell) for cell in row)
+
+
+def _remove_database(conn: sqlite3.Connection, path: Path) -> None:
+    conn.close()
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+class RowStore:
+    """
+    Append-only sequence of result rows with bounded memory.
+
+    Rows are buffered in memory; once the buffer exceeds max_bytes it is
+    written to a temporary SQLite database (created in directory on the
+    first spill) and released. Iteration and slice() read spilled rows back
+    in batches, so serializing or displaying a result holds one batch of
+    rows at a time however large it is. The database file is deleted by
+    close() or when the store is garbage collected.
+
+    A store may be appended to from one thread while another reads it.
+    """
+
+    def __init__(
+        self,
+        rows: Iterable[list[str]] = (),
+        *,
+        max_bytes: int | None = None,
+        directory: Path | None = None,
+        batch_rows: int = RESULT_READ_BATCH_ROWS,
+    ) -> None:
+        self.max_bytes = max_bytes if max_bytes is not None else get_result_memory_bytes()
+        self.directory = directory
+        self.batch_rows = max(1, batch_rows)
+        self._lock = threading.Lock()
+        self._buffer: list[list[str]] = []
+        self._buffer_bytes = 0
+        # Rows in the database (ids 0 .. _spilled - 1), all before the buffer
+        self._spilled = 0
+        self._conn: sqlite3.Connection | None = None
+        self._finalizer: weakref.finalize | None = None
+        # Widest row seen, for padding ragged rows
+        self.width = 0
+        self.extend(rows)
+
+    def __enter__(self) -> RowStore:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._spilled + len(self._buffer)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    @property
+    def spilled(self) -> bool:
+        """True once rows have been written to disk."""
+        return self._conn is not None
+
+    def append(self, row: list[str]) -> None:
+        """Add a row at the end, spilling the buffer to disk if it is over budget."""
+        with self._lock:
+            self._buffer.append(row)
+            self._buffer_bytes += _row_size(row)
+            self.width = max(self.width, len(row))
+            if self._buffer_bytes > self.max_bytes:
+                self._spill()
+
+    def extend(self, rows: Iterable[list[str]]) -> None:
+        """Add rows at the end."""
+        for row in rows:
+            self.append(row)
+
+    def _open(self) -> sqlite3.Connection:
+        directory = self.directory or get_results_dir()
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            fd, name = tempfile.mkstemp(prefix="rows-", suffix=".sqlite3", dir=str(directory))
+            os.close(fd)
+            conn = sqlite3.connect(name, isolation_level=None, check_same_thread=False)
+            # Scratch data: no journal, no fsync
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE rows (id INTEGER PRIMARY KEY, cells TEXT NOT NULL)")
+        except (OSError, sqlite3.Error) as e:
+            raise StorageError(f"Failed to create result spill file in {directory}: {e}") from e
+        self._finalizer = weakref.finalize(self, _remove_database, conn, Path(name))
+        return conn
+
+    def _spill(self) -> None:
+        if self._conn is None:
+            self._conn = self._open()
+        start = self._spilled
+        try:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT INTO rows (id, cells) VALUES (?, ?)",
+                    (
+                        (start + i, json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+                        for i, row in enumerate(self._buffer)
+                    ),
+                )
+        except sqlite3.Error as e:
+            raise StorageError(f"Failed to spill result rows to disk: {e}") from e
+        self._spilled += len(self._buffer)
+        self._buffer = []
+        self._buffer_bytes = 0
+
+    def slice(self, start: int, stop: int | None = None) -> list[list[str]]:
+        """Rows start .. stop - 1 (stop None = to the end), read from disk as needed."""
+        with self._lock:
+            total = self._spilled + len(self._buffer)
+            start = max(0, start)
+            stop = total if stop is None else min(max(stop, start), total)
+            rows: list[list[str]] = []
+            if start < self._spilled and self._conn is not None:
+                try:
+                    cursor = self._conn.execute(
+                        "SELECT cells FROM rows WHERE id >= ? AND id < ? ORDER BY id",
+                        (start, min(stop, self._spilled)),
+                    )
+                    rows = [json.loads(cells) for (cells,) in cursor]
+                except sqlite3.Error as e:
+                    raise StorageError(f"Failed to read spilled result rows: {e}") from e
+            offset = self._spilled
+            rows.extend(self._buffer[max(start - offset, 0) : max(stop - offset, 0)])
+            return rows
+
+    def __iter__(self) -> Iterator[list[str]]:
+        """Rows in order, read batch_rows at a time; rows appended meanwhile are included."""
+        start = 0
+        while True:
+            batch = self.slice(start, start + self.batch_rows)
+            if not batch:
+                return
+            yield from batch
+            start += len(batch)
+
+    def close(self) -> None:
+        """Release the rows and delete the spill file."""
+        with self._lock:
+            self._buffer = []
+            self._buffer_bytes = 0
+            self._spilled = 0
+            self._conn = None
+            if self._finalizer is not None:
+                self._finalizer()
+                self._finalizer = None
@@ -0,0 +1,350 @@
+"""Client-side LLM request scheduling: rate limits, retries and adaptive concurrency."""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from concurrent.futures import CancelledError
+from dataclasses import dataclass, replace
+from email.utils import parsedate_to_datetime
+from typing import Callable, TypeVar
+
+from openai import APIConnectionError, APIStatusError, APITimeoutError, InternalServerError, RateLimitError
+
+from pdfharvest.config import (
+    DEFAULT_LLM_MAX_RETRIES,
+    DEFAULT_MAX_CONCURRENCY,
+    LLM_AIMD_DECREASE,
+    LLM_LATENCY_BACKOFF_FACTOR,
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY,
+    get_llm_requests_per_minute,
+    get_llm_tokens_per_minute,
+)
+
+# Transient API failures worth retrying (rate limit, timeout, network, 5xx)
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+# Weight of the newest sample in the smoothed request latency
+_LATENCY_ALPHA = 0.2
+
+_T = TypeVar("_T")
+
+Clock = Callable[[], float]
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_minute.
+
+    The bucket holds at most one minute's worth of tokens. reserve() takes
+    tokens immediately, letting the balance go negative, and returns how long
+    the caller must wait before using them; callers therefore queue in the
+    order they reserved without holding a lock while they sleep.
+    """
+
+    def __init__(self, rate_per_minute: float, *, clock: Clock | None = None) -> None:
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.capacity = float(rate_per_minute)
+        self._rate = self.capacity / 60.0
+        self._clock = clock or time.monotonic
+        self._tokens = self.capacity
+        self._updated = self._clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        """Tokens available now (negative while reservations are outstanding)."""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def reserve(self, amount: float) -> float:
+        """Take amount tokens (at most capacity); return seconds to wait before use."""
+        with self._lock:
+            self._refill()
+            self._tokens -= min(float(amount), self.capacity)
+            return max(-self._tokens / self._rate, 0.0)
+
+    def adjust(self, amount: float) -> None:
+        """Take (positive) or give back (negative) tokens without waiting."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """Server-requested delay from retry-after-ms / Retry-After headers, if any."""
+    if not isinstance(error, APIStatusError):
+        return None
+    headers = error.response.headers
+    try:
+        return max(float(headers["retry-after-ms"]) / 1000.0, 0.0)
+    except (KeyError, ValueError):
+        pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class SchedulerStats:
+    """Counters of an LlmScheduler since it was created."""
+
+    # API calls attempted, including retries
+    requests: int = 0
+    # Attempts delayed by a local rate limit or a server-requested pause
+    throttled: int = 0
+    # Attempts answered with HTTP 429
+    rate_limited: int = 0
+    # Attempts repeated after a retryable failure
+    retried: int = 0
+    # Calls that failed for good (retries exhausted or not retryable)
+    failed: int = 0
+    # Total seconds spent waiting for rate limits and backoff
+    wait_seconds: float = 0.0
+    # Current adaptive concurrency limit
+    concurrency: int = 0
+
+
+class LlmScheduler:
+    """
+    Pace, retry and bound LLM requests shared by any number of threads.
+
+    Every call passes through, in order: a server-requested pause (set by a
+    429's Retry-After, so one throttled request slows all of them), the
+    requests-per-minute and tokens-per-minute buckets, and a concurrency
+    gate. The concurrency limit adapts AIMD-style: it grows by one per round
+    of successful requests up to max_concurrency, and is multiplied by
+    LLM_AIMD_DECREASE on a 429 or when smoothed latency exceeds
+    LLM_LATENCY_BACKOFF_FACTOR times the best latency seen (at most once per
+    round). Retryable failures (RETRYABLE_ERRORS) are retried up to
+    max_retries times, honoring Retry-After, else after jittered exponential
+    backoff.
+
+    One scheduler is meant to be shared by everything that talks to the same
+    API key, so its limits apply across documents and jobs in a process.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        *,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        min_concurrency: int = 1,
+        max_retries: int = DEFAULT_LLM_MAX_RETRIES,
+        base_delay: float = LLM_RETRY_BASE_DELAY,
+        max_delay: float = LLM_RETRY_MAX_DELAY,
+        clock: Clock | None = None,
+        sleep: Callable[[float], None] | None = None,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock or time.monotonic
+        self._sleep = sleep or time.sleep
+        self._rng = rng or random.Random()
+        self._requests = (
+            TokenBucket(requests_per_minute, clock=self._clock) if requests_per_minute else None
+        )
+        self._tokens = TokenBucket(tokens_per_minute, clock=self._clock) if tokens_per_minute else None
+        self._cond = threading.Condition()
+        self._limit = float(self.max_concurrency)
+        self._in_flight = 0
+        self._resume_at = 0.0
+        self._latency: float | None = None
+        self._best_latency: float | None = None
+        # Bumped on every decrease; requests sent in an earlier epoch do not
+        # move the limit again, so one burst of 429s halves it only once
+        self._epoch = 0
+        self._stats = SchedulerStats()
+
+    @classmethod
+    def from_env(
+        cls, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, *, share: float = 1.0
+    ) -> LlmScheduler:
+        """
+        Scheduler with rate limits from PDFHARVEST_LLM_REQUESTS_PER_MINUTE and
+        PDFHARVEST_LLM_TOKENS_PER_MINUTE, scaled by share (e.g. 1/processes
+        when several processes split one API key's limits).
+        """
+        rpm = get_llm_requests_per_minute()
+        tpm = get_llm_tokens_per_minute()
+        return cls(
+            max_concurrency,
+            requests_per_minute=rpm * share if rpm else None,
+            tokens_per_minute=tpm * share if tpm else None,
+        )
+
+    @property
+    def concurrency(self) -> int:
+        """Requests currently allowed in flight at once."""
+        with self._cond:
+            return int(self._limit)
+
+    def stats(self) -> SchedulerStats:
+        """Snapshot of the counters."""
+        with self._cond:
+            return replace(self._stats, concurrency=int(self._limit))
+
+    def _count(self, **deltas: float) -> None:
+        # Caller holds self._cond
+        self._stats = replace(
+            self._stats,
+            **{name: getattr(self._stats, name) + delta for name, delta in deltas.items()},
+        )
+
+    def retry_delay(self, error: Exception, retry: int) -> float:
+        """Retry-After if the server sent one, else jittered exponential backoff."""
+        requested = retry_after_seconds(error)
+        if requested is not None:
+            return min(requested, self.max_delay)
+        backoff = min(self.base_delay * 2**retry, self.max_delay)
+        # Equal jitter: keep half the backoff, randomize the rest
+        return backoff / 2 + self._rng.uniform(0, backoff / 2)
+
+    def _wait_turn(self, tokens: int) -> None:
+        """Sleep out any server pause and rate-limit reservation for one attempt."""
+        with self._cond:
+            wait = max(self._resume_at - self._clock(), 0.0)
+        if self._requests is not None:
+            wait = max(wait, self._requests.reserve(1))
+        if self._tokens is not None and tokens > 0:
+            wait = max(wait, self._tokens.reserve(tokens))
+        if wait > 0:
+            with self._cond:
+                self._count(throttled=1, wait_seconds=wait)
+            self._sleep(wait)
+
+    def _acquire(self, cancel: threading.Event | None = None) -> int:
+        """Wait for a slot under the concurrency limit; return the current epoch."""
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            if cancel is not None and cancel.is_set():
+                raise CancelledError()
+            self._in_flight += 1
+            self._count(requests=1)
+            return self._epoch
+
+    def _decrease(self) -> None:
+        # Caller holds self._cond
+        self._limit = max(float(self.min_concurrency), self._limit * LLM_AIMD_DECREASE)
+        self._epoch += 1
+
+    def _release(
+        self, epoch: int, *, latency: float | None = None, rate_limited: bool = False
+    ) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            # Requests sent before the last decrease say nothing about the new limit
+            stale = epoch < self._epoch
+            if rate_limited:
+                self._count(rate_limited=1)
+                if not stale:
+                    self._decrease()
+            elif latency is not None:
+                self._latency = (
+                    latency
+                    if self._latency is None
+                    else (1 - _LATENCY_ALPHA) * self._latency + _LATENCY_ALPHA * latency
+                )
+                if self._best_latency is None or self._latency < self._best_latency:
+                    self._best_latency = self._latency
+                if not stale:
+                    if self._latency > LLM_LATENCY_BACKOFF_FACTOR * self._best_latency:
+                        self._decrease()
+                    else:
+                        # Additive increase: about +1 per round of `limit` successes
+                        self._limit = min(
+                            float(self.max_concurrency), self._limit + 1 / self._limit
+                        )
+            self._cond.notify_all()
+
+    def run(
+        self,
+        call: Callable[[], _T],
+        *,
+        tokens: int = 0,
+        on_retry: Callable[[Exception, float], None] | None = None,
+        cancel: threading.Event | None = None,
+    ) -> _T:
+        """
+        Run call() under the scheduler's limits, retrying transient failures.
+
+        Args:
+            call: The API request; raises openai errors on failure.
+            tokens: Estimated tokens the request will use (prompt plus
+                completion), charged to the tokens-per-minute bucket. Correct
+                it afterwards with record_tokens().
+            on_retry: Optional (error, delay_seconds) callback before a retry.
+            cancel: Optional event; once set, no further attempt is sent
+                (e.g. the losing side of a hedged request).
+
+        Returns:
+            call()'s result.
+
+        Raises:
+            CancelledError: If cancel was set before an attempt was sent.
+            Whatever call() raised last, once retries are exhausted or for a
+            non-retryable error.
+        """
+        retry = 0
+        while True:
+            self._wait_turn(tokens)
+            epoch = self._acquire(cancel)
+            started = self._clock()
+            try:
+                result = call()
+            except RETRYABLE_ERRORS as e:
+                rate_limited = isinstance(e, RateLimitError)
+                self._release(epoch, rate_limited=rate_limited)
+                if retry >= self.max_retries:
+                    with self._cond:
+                        self._count(failed=1)
+                    raise
+                delay = self.retry_delay(e, retry)
+                retry += 1
+                with self._cond:
+                    self._count(retried=1)
+                    if rate_limited:
+                        # Pause every caller, not just this one
+                        self._resume_at = max(self._resume_at, self._clock() + delay)
+                if on_retry is not None:
+                    on_retry(e, delay)
+                if not rate_limited and delay > 0:
+                    with self._cond:
+                        self._count(wait_seconds=delay)
+                    self._sleep(delay)
+                continue
+            except BaseException:
+                self._release(epoch)
+                with self._cond:
+                    self._count(failed=1)
+                raise
+            self._release(epoch, latency=self._clock() - started)
+            return result
+
+    def record_tokens(self, estimated: int, actual: int) -> None:
+        """Correct a request's tokens-per-minute charge once its real usage is known."""
+        if self._tokens is not None and actual > 0:
+            self._tokens.adjust(actual - estimated)
@@ -1,21 +1,67 @@
-"""Temporary storage for uploaded PDFs during extraction."""
+"""Content-addressed storage for uploaded PDFs during extraction."""
 
+import hashlib
+import os
 import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import BinaryIO
+from typing import BinaryIO, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
 
 from pdfharvest.config import DEFAULT_CHUNK_SIZE
 from pdfharvest.exceptions import StorageError
 
+# <storage dir>/refs/<sha256>/<ref> marks one holder of <storage dir>/<sha256>.pdf
+REFS_DIR_NAME = "refs"
+_LOCK_FILE_NAME = ".lock"
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    """One reference to a stored PDF blob; release it with release_upload."""
+
+    path: Path
+    # Hex SHA-256 of the contents; also the page cache's document identity
+    document_id: str
+    ref: str
+    # True if an identical file was already stored and nothing was written
+    reused: bool = False
+
+
+@contextmanager
+def _refs_lock(storage_dir: Path) -> Iterator[None]:
+    """Serialize reference changes so a blob is never deleted while being reused."""
+    refs_dir = storage_dir / REFS_DIR_NAME
+    refs_dir.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with (refs_dir / _LOCK_FILE_NAME).open("a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
 
 def save_upload_to_storage(
     stream: BinaryIO,
     storage_dir: Path,
     *,
     chunk_size: int = DEFAULT_CHUNK_SIZE,
-) -> Path:
+) -> StoredUpload:
     """
-    Persist an uploaded file stream to storage_dir with a unique name.
+    Persist an uploaded file stream to storage_dir, named by its SHA-256.
+
+    The hash is computed while the chunks are written to a temporary file.
+    If a file with the same contents is already stored, the temporary file
+    is dropped and the existing one is reused. Every call adds a reference;
+    the file is deleted when its last reference is released.
 
     Args:
         stream: Readable binary stream (e.g. from Streamlit file_uploader).
@@ -23,7 +69,7 @@ def save_upload_to_storage(
         chunk_size: Read/write chunk size in bytes.
 
     Returns:
-        Path to the written file.
+        The stored file's path, content hash and this caller's reference.
 
     Raises:
         StorageError: If directory creation or write fails.
@@ -32,21 +78,85 @@ def save_upload_to_storage(
         storage_dir.mkdir(parents=True, exist_ok=True)
     except OSError as e:
         raise StorageError(f"Failed to write to {storage_dir}: {e}") from e
-    file_name = f"{uuid.uuid4().hex}.pdf"
-    target_path = storage_dir / file_name
+    temp_path = storage_dir / f".upload-{uuid.uuid4().hex}.tmp"
+    digest = hashlib.sha256()
     try:
         stream.seek(0)
-        with target_path.open("wb") as f:
+        with temp_path.open("wb") as f:
             while True:
                 chunk = stream.read(chunk_size)
                 if not chunk:
                     break
+                digest.update(chunk)
                 f.write(chunk)
-        return target_path
+        document_id = digest.hexdigest()
+        target_path = storage_dir / f"{document_id}.pdf"
+        ref = uuid.uuid4().hex
+        with _refs_lock(storage_dir):
+            reused = target_path.exists()
+            if reused:
+                temp_path.unlink()
+            else:
+                os.replace(temp_path, target_path)
+            ref_dir = storage_dir / REFS_DIR_NAME / document_id
+            ref_dir.mkdir(exist_ok=True)
+            (ref_dir / ref).touch()
+        return StoredUpload(target_path, document_id, ref, reused)
     except OSError as e:
+        remove_if_exists(temp_path)
         raise StorageError(f"Failed to write to {storage_dir}: {e}") from e
 
 
+def release_upload(upload: StoredUpload | None) -> None:
+    """
+    Drop one reference to a stored upload; delete the file with its last one.
+
+    No-op for None. Ignore errors (e.g. already released).
+    """
+    if upload is None:
+        return
+    storage_dir = upload.path.parent
+    ref_dir = storage_dir / REFS_DIR_NAME / upload.document_id
+    try:
+        with _refs_lock(storage_dir):
+            remove_if_exists(ref_dir / upload.ref)
+            if ref_dir.is_dir() and any(ref_dir.iterdir()):
+                return
+            remove_if_exists(upload.path)
+            ref_dir.rmdir()
+    except OSError:
+        pass
+
+
+def upload_references(upload: StoredUpload) -> int:
+    """Number of unreleased references to the upload's file."""
+    ref_dir = upload.path.parent / REFS_DIR_NAME / upload.document_id
+    try:
+        return sum(1 for _ in ref_dir.iterdir())
+    except OSError:
+        return 0
+
+
+def file_sha256(path: Path, *, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """
+    Return the hex SHA-256 of a file's contents, used as a document identity.
+
+    Raises:
+        StorageError: If the file cannot be read.
+    """
+    digest = hashlib.sha256()
+    try:
+        with path.open("rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+    except OSError as e:
+        raise StorageError(f"Failed to read {path}: {e}") from e
+    return digest.hexdigest()
+
+
 def remove_if_exists(path: Path | None) -> None:
     """
     Remove a file if it exists. Ignore errors (e.g. already deleted).
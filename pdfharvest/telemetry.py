@@ -0,0 +1,289 @@
+"""Per-stage extraction telemetry: events, run summaries and exporters."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, Sequence
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+from pdfharvest.config import get_prometheus_textfile_path, get_telemetry_jsonl_path
+from pdfharvest.exceptions import StorageError
+
+# Stage names used in StageEvent.stage
+STAGE_PAGE_CACHE = "page_cache"  # page text cache lookup
+STAGE_PROFILE = "profile"  # pypdf text extraction and OCR classification
+STAGE_RENDER = "render"  # poppler rasterization of a batch of pages
+STAGE_OCR = "ocr"  # Tesseract passes for one page
+STAGE_PREPROCESS = "preprocess"  # boilerplate and whitespace removal (opt-in)
+STAGE_LLM = "llm"  # one LLM request (one page, or several when packed)
+STAGE_PARSE = "parse"  # splitting an LLM reply into per-page rows
+
+EventHook = Callable[["StageEvent"], None]
+
+
+def cpu_time() -> float:
+    """
+    CPU seconds used by the calling thread plus finished child processes.
+
+    Child time (poppler, Tesseract) is process-wide, so stages running
+    subprocesses concurrently in several threads may share each other's time.
+    """
+    total = time.thread_time()
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+@dataclass(frozen=True)
+class StageEvent:
+    """One timed pipeline stage for one or more pages."""
+
+    stage: str
+    pages: tuple[int, ...]
+    wall_seconds: float
+    cpu_seconds: float = 0.0
+    # Stage details, e.g. dpi/width/height/psm for OCR, tokens/retries for LLM
+    attrs: dict[str, Any] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+
+@contextmanager
+def timed_stage(
+    hook: EventHook | None, stage: str, pages: Sequence[int], **attrs: Any
+) -> Iterator[dict[str, Any]]:
+    """
+    Time the body and emit a StageEvent to hook (no-op without a hook).
+
+    Yields the attrs dict, so the body can add details it learns (tokens,
+    cache hits) before the event is emitted. If the body raises, the event
+    is still emitted with attrs["error"] set to the exception type.
+    """
+    if hook is None:
+        yield attrs
+        return
+    wall, cpu = time.perf_counter(), cpu_time()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        hook(
+            StageEvent(
+                stage=stage,
+                pages=tuple(pages),
+                wall_seconds=time.perf_counter() - wall,
+                cpu_seconds=cpu_time() - cpu,
+                attrs=attrs,
+            )
+        )
+
+
+def _percentile(ordered: Sequence[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+@dataclass(frozen=True)
+class StageSummary:
+    """Totals and wall-time percentiles (seconds) of one stage's events."""
+
+    count: int
+    wall_seconds: float
+    cpu_seconds: float
+    p50: float
+    p95: float
+    max: float
+
+    @classmethod
+    def of(cls, events: Sequence[StageEvent]) -> StageSummary:
+        walls = sorted(e.wall_seconds for e in events)
+        return cls(
+            count=len(events),
+            wall_seconds=sum(walls),
+            cpu_seconds=sum(e.cpu_seconds for e in events),
+            p50=_percentile(walls, 0.5),
+            p95=_percentile(walls, 0.95),
+            max=walls[-1] if walls else 0.0,
+        )
+
+
+@dataclass(frozen=True)
+class RunSummary:
+    """Totals for one extraction run."""
+
+    pages: int
+    wall_seconds: float
+    stages: dict[str, StageSummary]
+    llm_requests: int = 0
+    llm_cached: int = 0
+    llm_retries: int = 0
+    # Hedged requests: duplicates fired, and duplicates whose reply was used
+    llm_hedges: int = 0
+    llm_hedges_won: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    ocr_pages: int = 0
+    # Estimated page-text tokens removed by preprocessing
+    tokens_saved: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class Telemetry:
+    """
+    Event hook that records StageEvents and forwards them to exporters.
+
+    Pass an instance as ``on_event`` to iter_extraction/run_extraction, then
+    call summary(). Safe to call from several threads.
+    """
+
+    def __init__(
+        self,
+        exporters: Sequence[EventHook] = (),
+        *,
+        prometheus_textfile: Path | None = None,
+    ) -> None:
+        self.events: list[StageEvent] = []
+        self.exporters = list(exporters)
+        self.prometheus_textfile = prometheus_textfile
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> Telemetry:
+        """Telemetry with the exporters configured in the environment."""
+        jsonl = get_telemetry_jsonl_path()
+        return cls(
+            [JsonlExporter(jsonl)] if jsonl is not None else [],
+            prometheus_textfile=get_prometheus_textfile_path(),
+        )
+
+    def __call__(self, event: StageEvent) -> None:
+        with self._lock:
+            self.events.append(event)
+        for exporter in self.exporters:
+            exporter(event)
+
+    def summary(self) -> RunSummary:
+        """Summarize the events recorded so far."""
+        with self._lock:
+            events = list(self.events)
+        by_stage: dict[str, list[StageEvent]] = {}
+        for event in events:
+            by_stage.setdefault(event.stage, []).append(event)
+        llm = by_stage.get(STAGE_LLM, [])
+        pages = {p for e in events if e.stage != STAGE_RENDER for p in e.pages}
+        return RunSummary(
+            pages=len(pages),
+            wall_seconds=time.perf_counter() - self.started,
+            stages={stage: StageSummary.of(group) for stage, group in by_stage.items()},
+            llm_requests=sum(not e.attrs.get("cached") for e in llm),
+            llm_cached=sum(bool(e.attrs.get("cached")) for e in llm),
+            llm_retries=sum(e.attrs.get("retries", 0) for e in llm),
+            llm_hedges=sum(bool(e.attrs.get("hedged")) for e in llm),
+            llm_hedges_won=sum(bool(e.attrs.get("hedge_won")) for e in llm),
+            prompt_tokens=sum(e.attrs.get("prompt_tokens", 0) for e in llm),
+            completion_tokens=sum(e.attrs.get("completion_tokens", 0) for e in llm),
+            ocr_pages=len(by_stage.get(STAGE_OCR, [])),
+            tokens_saved=sum(e.attrs.get("tokens_saved", 0) for e in by_stage.get(STAGE_PREPROCESS, [])),
+        )
+
+    def finish(self) -> RunSummary:
+        """Summarize the run and write the Prometheus textfile, if configured."""
+        summary = self.summary()
+        if self.prometheus_textfile is not None:
+            try:
+                write_prometheus_textfile(summary, self.prometheus_textfile)
+            except StorageError:
+                pass
+        return summary
+
+
+class JsonlExporter:
+    """Append each event as one JSON line to a file (shared by concurrent runs)."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, event: StageEvent) -> None:
+        line = json.dumps(asdict(event), default=str, separators=(",", ":")) + "\n"
+        try:
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError:
+            pass
+
+
+def prometheus_text(summary: RunSummary) -> str:
+    """Render a run summary in the Prometheus text exposition format."""
+    lines = [
+        "# HELP pdfharvest_last_run_pages Pages processed by the last extraction run.",
+        "# TYPE pdfharvest_last_run_pages gauge",
+        f"pdfharvest_last_run_pages {summary.pages}",
+        "# HELP pdfharvest_last_run_seconds Wall time of the last extraction run.",
+        "# TYPE pdfharvest_last_run_seconds gauge",
+        f"pdfharvest_last_run_seconds {summary.wall_seconds:.6f}",
+        "# HELP pdfharvest_last_run_llm_requests LLM requests sent (cache hits excluded).",
+        "# TYPE pdfharvest_last_run_llm_requests gauge",
+        f"pdfharvest_last_run_llm_requests {summary.llm_requests}",
+        "# HELP pdfharvest_last_run_llm_retries LLM request retries.",
+        "# TYPE pdfharvest_last_run_llm_retries gauge",
+        f"pdfharvest_last_run_llm_retries {summary.llm_retries}",
+        "# HELP pdfharvest_last_run_llm_hedges Duplicate requests fired for slow LLM requests.",
+        "# TYPE pdfharvest_last_run_llm_hedges gauge",
+        f'pdfharvest_last_run_llm_hedges{{result="fired"}} {summary.llm_hedges}',
+        f'pdfharvest_last_run_llm_hedges{{result="won"}} {summary.llm_hedges_won}',
+        "# HELP pdfharvest_last_run_tokens LLM tokens by kind (saved = removed by preprocessing).",
+        "# TYPE pdfharvest_last_run_tokens gauge",
+        f'pdfharvest_last_run_tokens{{kind="prompt"}} {summary.prompt_tokens}',
+        f'pdfharvest_last_run_tokens{{kind="completion"}} {summary.completion_tokens}',
+        f'pdfharvest_last_run_tokens{{kind="saved"}} {summary.tokens_saved}',
+        "# HELP pdfharvest_last_run_stage_seconds Stage time by clock (wall, cpu).",
+        "# TYPE pdfharvest_last_run_stage_seconds gauge",
+    ]
+    for stage, s in sorted(summary.stages.items()):
+        lines.append(f'pdfharvest_last_run_stage_seconds{{stage="{stage}",clock="wall"}} {s.wall_seconds:.6f}')
+        lines.append(f'pdfharvest_last_run_stage_seconds{{stage="{stage}",clock="cpu"}} {s.cpu_seconds:.6f}')
+    lines += [
+        "# HELP pdfharvest_last_run_stage_quantile_seconds Per-event stage wall time quantiles.",
+        "# TYPE pdfharvest_last_run_stage_quantile_seconds gauge",
+    ]
+    for stage, s in sorted(summary.stages.items()):
+        for q, value in (("0.5", s.p50), ("0.95", s.p95), ("1", s.max)):
+            lines.append(
+                f'pdfharvest_last_run_stage_quantile_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}'
+            )
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_textfile(summary: RunSummary, path: Path) -> None:
+    """
+    Atomically write a summary for the node_exporter textfile collector.
+
+    Raises:
+        StorageError: If the file cannot be written.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(prometheus_text(summary), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        raise StorageError(f"Failed to write {path}: {e}") from e
@@ -3,12 +3,13 @@
 from __future__ import annotations
 
 from pdfharvest.exceptions import ValidationError
+from pdfharvest.pdf_utils import Document
 
 
 def validate_page_range(
     page_offset_raw: str,
     limit_pages_raw: str,
-    total_pages: int,
+    total_pages: int | Document,
 ) -> tuple[int, int | None]:
     """
     Parse and validate page offset and limit against total pages.
@@ -16,7 +17,7 @@ def validate_page_range(
     Args:
         page_offset_raw: User input for page offset (e.g. "0").
         limit_pages_raw: User input for page limit (e.g. "10" or "").
-        total_pages: Total number of pages in the PDF.
+        total_pages: Total number of pages in the PDF, or the open Document.
 
     Returns:
         (page_offset, limit_pages). limit_pages is None if no limit.
@@ -24,7 +25,10 @@ def validate_page_range(
     Raises:
         ValidationError: If total_pages <= 0, or inputs are invalid, or
             offset >= total_pages.
+        PDFError: If a Document's page tree cannot be read.
     """
+    if isinstance(total_pages, Document):
+        total_pages = total_pages.page_count
     if total_pages <= 0:
         raise ValidationError("PDF has no pages.")
 
@@ -0,0 +1,165 @@
+"""Background worker that runs queued extraction jobs outside the UI process."""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import uuid
+
+from pdfharvest.cache import PageTextCache, ResponseCache
+from pdfharvest.config import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_WORKER_POLL_SECONDS,
+    ENV_OPENROUTER_API_KEY,
+)
+from pdfharvest.exceptions import PDFHarvestError, StorageError
+from pdfharvest.hedging import HedgePolicy
+from pdfharvest.job_queue import JobQueue
+from pdfharvest.jobs import resume_extraction
+from pdfharvest.scheduler import LlmScheduler
+from pdfharvest.telemetry import Telemetry
+
+logger = logging.getLogger(__name__)
+
+
+def _default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def run_job(
+    queue: JobQueue,
+    job_id: str,
+    worker_id: str,
+    *,
+    api_key: str,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ocr_workers: int | None = None,
+    scheduler: LlmScheduler | None = None,
+    hedge: HedgePolicy | None = None,
+) -> bool:
+    """
+    Run one claimed job to completion, keeping its lease alive meanwhile.
+
+    scheduler (shared by run_worker across jobs) paces the job's LLM requests;
+    hedge, if given, duplicates requests that straggle.
+
+    Returns:
+        True if the job finished, False if it was marked failed.
+    """
+    stop_heartbeat = threading.Event()
+
+    def heartbeat() -> None:
+        while not stop_heartbeat.wait(queue.lease / 3):
+            try:
+                queue.heartbeat(job_id, worker_id)
+            except StorageError:
+                logger.warning("Heartbeat for job %s failed", job_id)
+
+    beater = threading.Thread(target=heartbeat, name=f"heartbeat-{job_id[:8]}", daemon=True)
+    beater.start()
+    try:
+        try:
+            page_cache: PageTextCache | None = PageTextCache.default()
+            response_cache: ResponseCache | None = ResponseCache.default()
+        except StorageError:
+            page_cache = None
+            response_cache = None
+        telemetry = Telemetry.default()
+        resume_extraction(
+            job_id,
+            api_key=api_key,
+            max_concurrency=max_concurrency,
+            ocr_workers=ocr_workers,
+            page_cache=page_cache,
+            response_cache=response_cache,
+            on_event=telemetry,
+            scheduler=scheduler,
+            hedge=hedge,
+        )
+    except PDFHarvestError as e:
+        queue.fail(job_id, str(e))
+        logger.warning("Job %s failed: %s", job_id, e)
+        return False
+    except Exception as e:
+        # Keep the worker alive; the journal keeps the pages done so far
+        queue.fail(job_id, f"Unexpected error: {e}")
+        logger.exception("Job %s crashed", job_id)
+        return False
+    finally:
+        stop_heartbeat.set()
+        beater.join()
+    queue.complete(job_id)
+    summary = telemetry.finish()
+    logger.info(
+        "Job %s done: %d page(s) in %.1fs, %d LLM request(s), %d retried, "
+        "%d hedged (%d won), %d+%d tokens",
+        job_id,
+        summary.pages,
+        summary.wall_seconds,
+        summary.llm_requests,
+        summary.llm_retries,
+        summary.llm_hedges,
+        summary.llm_hedges_won,
+        summary.prompt_tokens,
+        summary.completion_tokens,
+    )
+    return True
+
+
+def run_worker(
+    queue: JobQueue | None = None,
+    *,
+    worker_id: str | None = None,
+    api_key: str | None = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ocr_workers: int | None = None,
+    poll_interval: float = DEFAULT_WORKER_POLL_SECONDS,
+    max_jobs: int | None = None,
+    stop: threading.Event | None = None,
+) -> int:
+    """
+    Claim and run queued jobs until stopped.
+
+    Args:
+        queue: Job queue (default: JobQueue.default()).
+        api_key: Key for jobs submitted without one (default: OPENROUTER_API_KEY).
+        max_jobs: Exit after this many jobs (None = run forever).
+        stop: Event that ends the loop between jobs (e.g. set on SIGTERM).
+
+    Returns:
+        Number of jobs run.
+    """
+    queue = queue or JobQueue.default()
+    worker_id = worker_id or _default_worker_id()
+    api_key = api_key or os.getenv(ENV_OPENROUTER_API_KEY, "")
+    stop = stop or threading.Event()
+    # One scheduler for the worker's lifetime: rate limits and the adaptive
+    # concurrency learned from 429s carry over from job to job
+    hedge = HedgePolicy.from_env()
+    scheduler = LlmScheduler.from_env(max_concurrency * (2 if hedge is not None else 1))
+    ran = 0
+    logger.info("Worker %s polling %s", worker_id, queue.path)
+    while not stop.is_set() and (max_jobs is None or ran < max_jobs):
+        claimed = queue.claim(worker_id)
+        if claimed is None:
+            stop.wait(poll_interval)
+            continue
+        job_id, job_api_key = claimed
+        logger.info("Job %s claimed", job_id)
+        if not (job_api_key or api_key):
+            queue.fail(job_id, f"No API key: submit one with the job or set {ENV_OPENROUTER_API_KEY}.")
+        else:
+            run_job(
+                queue,
+                job_id,
+                worker_id,
+                api_key=job_api_key or api_key,
+                max_concurrency=max_concurrency,
+                ocr_workers=ocr_workers,
+                scheduler=scheduler,
+                hedge=hedge,
+            )
+        ran += 1
+    return ran
@@ -0,0 +1,199 @@
+"""Tests for pdfharvest.batch and the run command."""
+
+import csv
+import gzip
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pdfharvest.batch import (
+    SUMMARY_FILE_NAME,
+    find_pdfs,
+    load_prompt,
+    process_document,
+    run_batch,
+)
+from pdfharvest.cli import main
+from pdfharvest.config import OUTPUT_FORMAT_PARQUET
+from pdfharvest.exceptions import ValidationError
+from pdfharvest.extraction import run_extraction
+from tests.test_run_extraction import _make_blank_pdf, _mock_ocr, _page_echo_llm
+
+
+def test_find_pdfs_expands_dirs_globs_and_files(tmp_path: Path) -> None:
+    for name in ("b.pdf", "a.PDF", "notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "c.pdf").write_bytes(b"")
+    found = find_pdfs([str(tmp_path), str(tmp_path / "**" / "*.pdf"), str(tmp_path / "b.pdf")])
+    assert [p.name for p in found] == ["a.PDF", "b.pdf", "c.pdf"]
+    with pytest.raises(ValidationError):
+        find_pdfs([str(tmp_path / "missing-*.pdf")])
+
+
+def test_load_prompt_plain_and_named(tmp_path: Path) -> None:
+    plain = tmp_path / "prompt.txt"
+    plain.write_text("```\nExtract names.\n```\n", encoding="utf-8")
+    assert load_prompt(plain) == "Extract names."
+    collection = tmp_path / "prompts.md"
+    collection.write_text(
+        "# FIRST\n```\nOne.\n```\n\n# SECOND\n```\nTwo\nlines.\n```\n", encoding="utf-8"
+    )
+    assert load_prompt(collection, "second") == "Two\nlines."
+    with pytest.raises(ValidationError):
+        load_prompt(collection, "THIRD")
+
+
+def test_load_prompt_reads_repo_prompts() -> None:
+    prompt = load_prompt(Path(__file__).parent.parent / "prompts.md", "ABCES")
+    assert prompt.startswith("Extract out the contact information.")
+    assert "```" not in prompt
+
+
+def test_process_document_writes_output(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=3)
+    with _mock_ocr("text"):
+        with patch("pdfharvest.extraction._build_llm", return_value=_page_echo_llm()):
+            result = process_document(
+                pdf_path,
+                tmp_path / "doc.csv",
+                "q",
+                limit_pages_raw="2",
+                api_key="k",
+                model="m",
+                use_cache=False,
+            )
+    assert result.ok and (result.pages, result.extracted_pages, result.rows) == (2, 2, 2)
+    assert (tmp_path / "doc.csv").read_text(encoding="utf-8").splitlines() == [
+        "page_number,value",
+        "1,value-1",
+        "2,value-2",
+    ]
+
+
+def test_process_document_writes_gzip_output(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=2)
+    with patch("pdfharvest.extraction._build_llm", return_value=_page_echo_llm()):
+        result = process_document(
+            pdf_path,
+            tmp_path / "doc.csv.gz",
+            "q",
+            api_key="k",
+            model="m",
+            ocr_mode="never",
+            use_cache=False,
+            compress=True,
+        )
+    assert result.ok
+    with gzip.open(tmp_path / "doc.csv.gz", "rt", encoding="utf-8") as f:
+        assert f.read() == "page_number,value\n1,value-1\n2,value-2"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["doc.csv.gz", "doc.pdf"]
+
+
+def test_process_document_writes_parquet_output(tmp_path: Path) -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=3)
+    with patch("pdfharvest.extraction._build_llm", return_value=_page_echo_llm()):
+        result = process_document(
+            pdf_path,
+            tmp_path / "doc.parquet",
+            "q",
+            output_format=OUTPUT_FORMAT_PARQUET,
+            api_key="k",
+            model="m",
+            ocr_mode="never",
+            use_cache=False,
+        )
+    assert result.ok and result.rows == 3
+    table = pq.read_table(tmp_path / "doc.parquet")
+    assert table.to_pydict() == {
+        "page_number": ["1", "2", "3"],
+        "value": ["value-1", "value-2", "value-3"],
+    }
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["doc.parquet", "doc.pdf"]
+
+
+def test_process_document_reports_errors(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=1)
+    result = process_document(
+        pdf_path, tmp_path / "doc.csv", "q", page_offset_raw="5", api_key="k", model="m"
+    )
+    assert not result.ok and "beyond" in result.error
+    assert not (tmp_path / "doc.csv").exists()
+
+
+def test_llm_slots_cap_requests_in_flight(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=6)
+    echo = _page_echo_llm()
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def invoke(messages):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+        return echo.invoke.side_effect(messages)
+
+    llm = MagicMock()
+    llm.invoke.side_effect = invoke
+    with _mock_ocr("text"):
+        with patch("pdfharvest.extraction._build_llm", return_value=llm):
+            rows, _, _ = run_extraction(
+                pdf_path,
+                "q",
+                api_key="k",
+                model="m",
+                max_concurrency=4,
+                llm_slots=threading.BoundedSemaphore(1),
+            )
+    assert len(rows) == 7
+    assert peak == 1
+
+
+def test_run_batch_writes_summary_and_skips_existing(tmp_path: Path) -> None:
+    docs = tmp_path / "in"
+    docs.mkdir()
+    _make_blank_pdf(docs / "one.pdf", num_pages=1)
+    _make_blank_pdf(docs / "two.pdf", num_pages=1)
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "one.csv").write_text("done\n", encoding="utf-8")
+    # two.pdf fails page-range validation in its worker process (no LLM call)
+    results = run_batch(
+        find_pdfs([str(docs)]),
+        "q",
+        out,
+        page_offset_raw="3",
+        api_key="k",
+        model="m",
+        processes=2,
+        skip_existing=True,
+    )
+    assert [(r.pdf_path.name, r.skipped, r.ok) for r in results] == [
+        ("one.pdf", True, True),
+        ("two.pdf", False, False),
+    ]
+    with (out / SUMMARY_FILE_NAME).open(encoding="utf-8") as f:
+        summary = list(csv.DictReader(f))
+    assert [row["status"] for row in summary] == ["skipped", "failed"]
+    assert "beyond" in summary[1]["error"]
+
+
+def test_cli_run_requires_api_key(tmp_path: Path, monkeypatch, capsys) -> None:
+    monkeypatch.delenv("OPENROUTER_API_KEY", raising=False)
+    code = main(["run", str(tmp_path), "--prompt-file", "p.txt", "--output-dir", str(tmp_path)])
+    assert code == 2
+    assert "OPENROUTER_API_KEY" in capsys.readouterr().err
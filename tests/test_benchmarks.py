@@ -0,0 +1,43 @@
+"""Smoke tests for the offline benchmark suite."""
+
+import json
+from pathlib import Path
+
+from pypdf import PdfReader
+
+from benchmarks.corpus import build_corpus
+from benchmarks.run import main, summarize
+from pdfharvest.pdf_utils import profile_page
+
+
+def test_build_corpus_page_kinds(tmp_path: Path) -> None:
+    corpus = build_corpus(tmp_path, text_pages=2, raster_pages=1, mixed_pages=3, large_pages=0)
+    assert sorted(corpus) == ["mixed", "raster", "text"]
+    text = PdfReader(str(corpus["text"]))
+    assert len(text.pages) == 2 and "@" in profile_page(text, 0).text
+    raster = PdfReader(str(corpus["raster"]))
+    assert profile_page(raster, 0).image_coverage > 0.99
+    mixed = PdfReader(str(corpus["mixed"]))
+    coverage = [profile_page(mixed, i).image_coverage > 0.99 for i in range(3)]
+    assert coverage == [False, False, True]
+
+
+def test_summarize_percentiles() -> None:
+    stats = summarize([0.001 * n for n in range(1, 101)])
+    assert stats["count"] == 100
+    assert stats["p50_ms"] == 51.0 and stats["p95_ms"] == 96.0 and stats["max_ms"] == 100.0
+
+
+def test_benchmark_run_writes_results(tmp_path: Path) -> None:
+    output = tmp_path / "bench.json"
+    args = ["--text-pages", "2", "--raster-pages", "1", "--mixed-pages", "3", "--large-pages", "0"]
+    args += ["--repeat", "1", "--llm-latency", "0", "--output", str(output)]
+    assert main(args) == 0
+    results = json.loads(output.read_text(encoding="utf-8"))
+    text = results["corpora"]["text"]
+    assert text["pages"] == 2 and text["rows"] > 0 and text["llm_calls"] == 2
+    assert {"get_total_pages", "extract_text_from_page", "parse_rows", "serialize_rows"} <= set(
+        text["stages"]
+    )
+    # Comparing a run against itself never reports a regression
+    assert main(args + ["--compare", str(output), "--max-regression", "1000"]) == 0
@@ -0,0 +1,90 @@
+"""Tests for pdfharvest.cache."""
+
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from pdfharvest.cache import DiskCache, PageTextCache, ResponseCache
+from pdfharvest.pdf_utils import OcrResult
+
+
+def test_disk_cache_roundtrip_and_counters(tmp_path: Path) -> None:
+    cache = DiskCache(tmp_path / "c.sqlite3", max_bytes=1024 * 1024)
+    assert cache.get("missing") is None
+    cache.set("k", {"a": [1, 2]})
+    assert cache.get("k") == {"a": [1, 2]}
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.hit_rate == 0.5
+
+
+def test_disk_cache_shared_between_instances(tmp_path: Path) -> None:
+    path = tmp_path / "c.sqlite3"
+    DiskCache(path, max_bytes=1024 * 1024).set("k", "v")
+    assert DiskCache(path, max_bytes=1024 * 1024).get("k") == "v"
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = DiskCache(tmp_path / "c.sqlite3", max_bytes=250)
+    cache.set("a", "x" * 100)
+    cache.set("b", "y" * 100)
+    assert cache.get("a") is not None  # "a" is now more recent than "b"
+    cache.set("c", "z" * 100)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_disk_cache_clear(tmp_path: Path) -> None:
+    cache = DiskCache(tmp_path / "c.sqlite3", max_bytes=1024)
+    cache.set("k", 1)
+    cache.clear()
+    assert cache.get("k") is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_page_text_cache_roundtrip(tmp_path: Path) -> None:
+    cache = PageTextCache(tmp_path / "pages.sqlite3", max_bytes=1024 * 1024)
+    ocr = OcrResult(text="scan", psm=6, confidence=88.0, seconds=1.5, attempts=1)
+    cache.put_page("doc", 3, 300, "auto", "scan text", ocr)
+    cache.put_page("doc", 4, 300, "auto", "vector text", None)
+    text, cached_ocr = cache.get_page("doc", 3, 300, "auto")
+    assert text == "scan text"
+    assert cached_ocr is not None and cached_ocr.psm == 6 and cached_ocr.cached
+    assert cache.get_page("doc", 4, 300, "auto") == ("vector text", None)
+    # Any key component changing is a miss
+    assert cache.get_page("doc", 3, 200, "auto") is None
+    assert cache.get_page("doc", 3, 300, "always") is None
+    assert cache.get_page("other", 3, 300, "auto") is None
+
+
+def test_disk_cache_ttl_expires_entries(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("pdfharvest.cache.time.time", lambda: now[0])
+    cache = DiskCache(tmp_path / "c.sqlite3", max_bytes=1024, ttl=60)
+    cache.set("k", "v")
+    now[0] += 30
+    assert cache.get("k") == "v"
+    now[0] += 31
+    assert cache.get("k") is None
+
+
+def test_response_cache_keyed_on_model_and_messages(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path / "r.sqlite3", max_bytes=1024 * 1024)
+    messages = [SystemMessage(content="sys"), HumanMessage(content="page 1")]
+    cache.put_response("model-a", messages, "page_number,x\n1,y")
+    assert cache.get_response("model-a", messages) == "page_number,x\n1,y"
+    assert cache.get_response("model-b", messages) is None
+    assert cache.get_response("model-a", [SystemMessage(content="sys"), HumanMessage(content="page 2")]) is None
+    assert cache.hit_rate == 1 / 3
+
+
+def test_response_cache_bypass_skips_reads_but_stores(tmp_path: Path) -> None:
+    path = tmp_path / "r.sqlite3"
+    messages = [HumanMessage(content="page 1")]
+    ResponseCache(path, max_bytes=1024 * 1024).put_response("m", messages, "old")
+    bypassing = ResponseCache(path, max_bytes=1024 * 1024, bypass=True)
+    assert bypassing.get_response("m", messages) is None
+    assert bypassing.bypassed == 1
+    bypassing.put_response("m", messages, "new")
+    assert ResponseCache(path, max_bytes=1024 * 1024).get_response("m", messages) == "new"
@@ -0,0 +1,95 @@
+"""Tests for pdfharvest.columnar."""
+
+from pathlib import Path
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from pdfharvest import columnar
+from pdfharvest.columnar import ColumnarWriter, column_names, require_columnar, write_columnar
+from pdfharvest.config import (
+    OUTPUT_FORMAT_ARROW,
+    OUTPUT_FORMAT_CSV,
+    OUTPUT_FORMAT_PARQUET,
+)
+from pdfharvest.exceptions import ValidationError
+
+
+def test_column_names_pads_and_deduplicates() -> None:
+    assert column_names(["a", "", "a", " b "], width=6) == [
+        "a",
+        "col_1",
+        "a_2",
+        "b",
+        "col_4",
+        "col_5",
+    ]
+
+
+def test_write_parquet_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "out.parquet"
+    rows = [["page_number", "name"]] + [[str(n), f"n{n}"] for n in range(5)]
+    with ColumnarWriter(path, OUTPUT_FORMAT_PARQUET, batch_rows=2) as writer:
+        writer.extend(rows)
+    assert len(writer) == 6
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 3
+    assert parquet.read().to_pydict() == {
+        "page_number": ["0", "1", "2", "3", "4"],
+        "name": ["n0", "n1", "n2", "n3", "n4"],
+    }
+    assert [p.name for p in tmp_path.iterdir()] == ["out.parquet"]
+
+
+def test_write_arrow_pads_and_joins_ragged_rows(tmp_path: Path) -> None:
+    path = tmp_path / "out.arrow"
+    write_columnar(
+        [["a", "b"], ["1"], ["2", "x", "y"], ["3", "z"]],
+        OUTPUT_FORMAT_ARROW,
+        path,
+        width=3,
+    )
+    with pa.memory_map(str(path)) as source:
+        table = pa.ipc.open_file(source).read_all()
+    assert table.schema.names == ["a", "b", "col_2"]
+    assert table.to_pydict() == {
+        "a": ["1", "2", "3"],
+        "b": ["", "x", "z"],
+        "col_2": ["", "y", ""],
+    }
+
+
+def test_write_columnar_joins_extra_cells_into_last_column(tmp_path: Path) -> None:
+    path = tmp_path / "out.parquet"
+    write_columnar([["name", "amount"], ["Acme", "1", "200"]], OUTPUT_FORMAT_PARQUET, path)
+    assert pq.read_table(path).to_pydict() == {"name": ["Acme"], "amount": ["1,200"]}
+
+
+def test_write_columnar_without_rows_writes_empty_table(tmp_path: Path) -> None:
+    path = tmp_path / "out.parquet"
+    write_columnar([], OUTPUT_FORMAT_PARQUET, path)
+    assert pq.read_table(path).num_rows == 0
+
+
+def test_writer_discards_file_on_error(tmp_path: Path) -> None:
+    path = tmp_path / "out.parquet"
+    with pytest.raises(RuntimeError):
+        with ColumnarWriter(path, batch_rows=1) as writer:
+            writer.extend([["a"], ["1"]])
+            raise RuntimeError("boom")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_writer_rejects_text_format(tmp_path: Path) -> None:
+    with pytest.raises(ValidationError):
+        ColumnarWriter(tmp_path / "out.csv", OUTPUT_FORMAT_CSV)
+
+
+def test_require_columnar_without_pyarrow(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(columnar, "pa", None)
+    assert not columnar.columnar_available()
+    require_columnar(OUTPUT_FORMAT_CSV)
+    with pytest.raises(ValidationError, match="pyarrow"):
+        require_columnar(OUTPUT_FORMAT_PARQUET)
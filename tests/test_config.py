@@ -5,9 +5,29 @@ from pathlib import Path
 import pytest
 
 from pdfharvest.config import (
+    ENV_OPENROUTER_BASE_URL,
+    ENV_PDFHARVEST_JOBS_DIR,
+    ENV_PDFHARVEST_LLM_RPM,
+    ENV_PDFHARVEST_RESULT_MEMORY_MB,
+    DEFAULT_RESULT_MEMORY_MB,
+    OPENROUTER_BASE_URL,
+    get_jobs_dir,
+    get_llm_requests_per_minute,
+    get_openrouter_base_url,
+    get_result_memory_bytes,
+    DEFAULT_OCR_TASK_TIMEOUT,
+    DEFAULT_OCR_WORKERS,
+    ENV_PDFHARVEST_CACHE_DIR,
+    ENV_PDFHARVEST_OCR_TIMEOUT,
+    ENV_PDFHARVEST_OCR_WORKERS,
     ENV_PDFHARVEST_STORAGE_DIR,
+    get_cache_dir,
+    get_ocr_task_timeout,
+    get_ocr_workers,
     get_storage_dir,
+    OUTPUT_FORMAT_ARROW,
     OUTPUT_FORMAT_CSV,
+    OUTPUT_FORMAT_PARQUET,
     OUTPUT_FORMAT_TSV,
     OUTPUT_FORMATS,
 )
@@ -28,4 +48,68 @@ def test_get_storage_dir_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
 def test_output_formats_constants() -> None:
     assert OUTPUT_FORMAT_CSV == "CSV"
     assert OUTPUT_FORMAT_TSV == "TSV"
-    assert OUTPUT_FORMATS == (OUTPUT_FORMAT_CSV, OUTPUT_FORMAT_TSV)
+    assert OUTPUT_FORMATS == (
+        OUTPUT_FORMAT_TSV,
+        OUTPUT_FORMAT_CSV,
+        OUTPUT_FORMAT_PARQUET,
+        OUTPUT_FORMAT_ARROW,
+    )
+
+
+def test_get_ocr_workers_default_and_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(ENV_PDFHARVEST_OCR_WORKERS, raising=False)
+    assert get_ocr_workers() == DEFAULT_OCR_WORKERS
+    monkeypatch.setenv(ENV_PDFHARVEST_OCR_WORKERS, "6")
+    assert get_ocr_workers() == 6
+    monkeypatch.setenv(ENV_PDFHARVEST_OCR_WORKERS, "not-a-number")
+    assert get_ocr_workers() == DEFAULT_OCR_WORKERS
+    monkeypatch.setenv(ENV_PDFHARVEST_OCR_WORKERS, "auto")
+    assert get_ocr_workers() >= 1
+
+
+def test_get_ocr_task_timeout_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv(ENV_PDFHARVEST_OCR_TIMEOUT, "12.5")
+    assert get_ocr_task_timeout() == 12.5
+    monkeypatch.setenv(ENV_PDFHARVEST_OCR_TIMEOUT, "-1")
+    assert get_ocr_task_timeout() == DEFAULT_OCR_TASK_TIMEOUT
+
+
+def test_get_cache_dir_defaults_under_storage_dir(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(ENV_PDFHARVEST_CACHE_DIR, raising=False)
+    monkeypatch.setenv(ENV_PDFHARVEST_STORAGE_DIR, "/custom/storage")
+    assert get_cache_dir() == Path("/custom/storage/cache")
+    monkeypatch.setenv(ENV_PDFHARVEST_CACHE_DIR, "/fast/cache")
+    assert get_cache_dir() == Path("/fast/cache")
+
+
+def test_get_jobs_dir_defaults_under_storage_dir(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(ENV_PDFHARVEST_JOBS_DIR, raising=False)
+    monkeypatch.setenv(ENV_PDFHARVEST_STORAGE_DIR, "/custom/storage")
+    assert get_jobs_dir() == Path("/custom/storage/jobs")
+    monkeypatch.setenv(ENV_PDFHARVEST_JOBS_DIR, "/durable/jobs")
+    assert get_jobs_dir() == Path("/durable/jobs")
+
+
+def test_get_openrouter_base_url_override(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(ENV_OPENROUTER_BASE_URL, raising=False)
+    assert get_openrouter_base_url() == OPENROUTER_BASE_URL
+    monkeypatch.setenv(ENV_OPENROUTER_BASE_URL, "http://127.0.0.1:8080/v1")
+    assert get_openrouter_base_url() == "http://127.0.0.1:8080/v1"
+
+
+def test_get_llm_requests_per_minute(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(ENV_PDFHARVEST_LLM_RPM, raising=False)
+    assert get_llm_requests_per_minute() is None
+    monkeypatch.setenv(ENV_PDFHARVEST_LLM_RPM, "120")
+    assert get_llm_requests_per_minute() == 120.0
+    monkeypatch.setenv(ENV_PDFHARVEST_LLM_RPM, "0")
+    assert get_llm_requests_per_minute() is None
+
+
+def test_get_result_memory_bytes(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(ENV_PDFHARVEST_RESULT_MEMORY_MB, raising=False)
+    assert get_result_memory_bytes() == DEFAULT_RESULT_MEMORY_MB * 1024 * 1024
+    monkeypatch.setenv(ENV_PDFHARVEST_RESULT_MEMORY_MB, "2")
+    assert get_result_memory_bytes() == 2 * 1024 * 1024
+    monkeypatch.setenv(ENV_PDFHARVEST_RESULT_MEMORY_MB, "lots")
+    assert get_result_memory_bytes() == DEFAULT_RESULT_MEMORY_MB * 1024 * 1024
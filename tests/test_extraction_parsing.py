@@ -1,6 +1,19 @@
 """Tests for extraction parsing (no LLM)."""
 
-from pdfharvest.extraction import parse_rows, serialize_rows, strip_code_fences
+import gzip
+from pathlib import Path
+
+import pytest
+
+from pdfharvest.exceptions import StorageError
+from pdfharvest.extraction import (
+    RowStreamParser,
+    iter_serialized,
+    parse_rows,
+    serialize_rows,
+    strip_code_fences,
+    write_rows,
+)
 from pdfharvest.config import OUTPUT_FORMAT_CSV, OUTPUT_FORMAT_TSV
 
 
@@ -54,3 +67,65 @@ def test_parse_rows_page_number_header_lowercase() -> None:
     rows = parse_rows("page_number,foo,bar\n1,alpha,beta", ",")
     assert rows[0][0].strip().lower() == "page_number"
     assert rows == [["page_number", "foo", "bar"], ["1", "alpha", "beta"]]
+
+
+def _feed_in_chunks(text: str, delimiter: str, size: int) -> list[list[str]]:
+    """Stream text through a RowStreamParser in chunks of size characters."""
+    parser = RowStreamParser(delimiter)
+    rows: list[list[str]] = []
+    for start in range(0, len(text), size):
+        rows.extend(parser.feed(text[start : start + size]))
+    return rows + parser.close()
+
+
+def test_row_stream_parser_matches_parse_rows_for_any_chunking() -> None:
+    texts = [
+        ("a,b\n1,2", ","),
+        ('```csv\na,b\n1,"two\nlines, quoted"\n\n2,3\n```\nignored,after', ","),
+        ('x\t"y\n\nz"\n1\t2\n', "\t"),
+        ("```\np,q\n1,2```", ","),
+        ('a,5" screen,b\n1,"never closed\nmore', ","),
+    ]
+    for text, delimiter in texts:
+        for size in range(1, 8):
+            assert _feed_in_chunks(text, delimiter, size) == parse_rows(
+                text, delimiter
+            ), (text, size)
+
+
+def test_row_stream_parser_returns_rows_once_complete() -> None:
+    parser = RowStreamParser(",")
+    assert parser.feed("```csv\na,b\n1,") == [["a", "b"]]
+    assert parser.feed('"multi\nline') == []
+    assert parser.feed('"\n2,x\n') == [["1", "multi\nline"], ["2", "x"]]
+    assert parser.feed("```\n3,y\n") == []
+    assert parser.close() == []
+
+
+def test_iter_serialized_chunks_join_to_serialize_rows() -> None:
+    rows = [["a", "b"]] + [[str(i), f"multi\nline, {i}"] for i in range(50)]
+    chunks = list(iter_serialized(rows, OUTPUT_FORMAT_CSV, chunk_chars=64))
+    assert len(chunks) > 1 and all(len(chunk) < 200 for chunk in chunks)
+    assert "".join(chunks) == serialize_rows(rows, OUTPUT_FORMAT_CSV)
+    assert parse_rows("".join(chunks), ",") == [[c.strip() for c in row] for row in rows]
+    assert list(iter_serialized([], OUTPUT_FORMAT_CSV)) == []
+
+
+def test_write_rows_plain_and_gzip(tmp_path: Path) -> None:
+    rows = [["x", "y"], ["1", "a\tb"]]
+    write_rows(iter(rows), OUTPUT_FORMAT_TSV, tmp_path / "out.tsv")
+    assert (tmp_path / "out.tsv").read_text(encoding="utf-8") == serialize_rows(rows, "TSV")
+    write_rows(rows, OUTPUT_FORMAT_TSV, tmp_path / "out.tsv.gz", compress=True)
+    with gzip.open(tmp_path / "out.tsv.gz", "rt", encoding="utf-8") as f:
+        assert f.read() == serialize_rows(rows, OUTPUT_FORMAT_TSV)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["out.tsv", "out.tsv.gz"]
+
+
+def test_write_rows_failure_leaves_no_file(tmp_path: Path) -> None:
+    def rows():
+        yield ["a"]
+        raise OSError("disk full")
+
+    with pytest.raises(StorageError, match="Failed to write"):
+        write_rows(rows(), OUTPUT_FORMAT_CSV, tmp_path / "out.csv")
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,159 @@
+"""Tests for pdfharvest.hedging and hedged requests in extraction."""
+
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pdfharvest.extraction import run_extraction
+from pdfharvest.hedging import HedgePolicy, Hedger
+from pdfharvest.telemetry import STAGE_LLM, Telemetry
+from tests.test_run_extraction import _make_blank_pdf
+
+_FAST = HedgePolicy(percentile=0.5, min_samples=2, max_extra_fraction=1.0, min_delay=0.05)
+
+
+def _warm_up(hedger: Hedger, n: int = 2) -> None:
+    """Record n fast requests so the hedging threshold is known."""
+    for _ in range(n):
+        hedger.run(lambda cancel: "ok", lambda cancel: "unused")
+
+
+def test_no_hedge_until_enough_samples() -> None:
+    with Hedger(_FAST, max_workers=1) as hedger:
+        assert hedger.threshold() is None
+        _warm_up(hedger)
+        assert hedger.threshold() == _FAST.min_delay
+        assert (hedger.requests, hedger.fired, hedger.won) == (2, 0, 0)
+
+
+def test_straggler_is_hedged_and_loser_cancelled() -> None:
+    primary_cancelled = threading.Event()
+
+    def slow(cancel: threading.Event) -> str:
+        if cancel.wait(timeout=5):
+            primary_cancelled.set()
+        return "late"
+
+    with Hedger(_FAST, max_workers=1) as hedger:
+        _warm_up(hedger)
+        outcome = hedger.run(slow, lambda cancel: "hedge")
+        assert (outcome.result, outcome.hedged, outcome.hedge_won) == ("hedge", True, True)
+        assert primary_cancelled.wait(timeout=5)
+        assert (hedger.fired, hedger.won) == (1, 1)
+
+
+def test_invalid_or_failed_hedge_does_not_win() -> None:
+    release = threading.Event()
+
+    def slow(cancel: threading.Event) -> str:
+        release.wait(timeout=5)
+        return "primary"
+
+    def empty_hedge(cancel: threading.Event) -> str:
+        release.set()
+        return ""
+
+    with Hedger(_FAST, max_workers=1) as hedger:
+        _warm_up(hedger)
+        outcome = hedger.run(slow, empty_hedge, valid=bool)
+        assert (outcome.result, outcome.hedged, outcome.hedge_won) == ("primary", True, False)
+
+        def failing_hedge(cancel: threading.Event) -> str:
+            release.set()
+            raise RuntimeError("hedge failed")
+
+        release.clear()
+        assert hedger.run(slow, failing_hedge).result == "primary"
+
+
+def test_both_failing_raises_primary_error() -> None:
+    def slow_failure(cancel: threading.Event) -> str:
+        threading.Event().wait(0.2)
+        raise ValueError("primary failed")
+
+    def hedge_failure(cancel: threading.Event) -> str:
+        raise RuntimeError("hedge failed")
+
+    with Hedger(_FAST, max_workers=1) as hedger:
+        _warm_up(hedger)
+        with pytest.raises(ValueError, match="primary failed"):
+            hedger.run(slow_failure, hedge_failure)
+
+
+def test_extra_request_budget_is_capped() -> None:
+    policy = HedgePolicy(percentile=0.5, min_samples=2, max_extra_fraction=0.0, min_delay=0.01)
+
+    def slow(cancel: threading.Event) -> str:
+        threading.Event().wait(0.1)
+        return "primary"
+
+    with Hedger(policy, max_workers=1) as hedger:
+        _warm_up(hedger)
+        outcome = hedger.run(slow, lambda cancel: "hedge")
+        assert (outcome.result, outcome.hedged) == ("primary", False)
+        assert hedger.fired == 0
+
+
+def test_policy_from_env(monkeypatch) -> None:
+    monkeypatch.delenv("PDFHARVEST_HEDGE", raising=False)
+    assert HedgePolicy.from_env() is None
+    monkeypatch.setenv("PDFHARVEST_HEDGE", "1")
+    monkeypatch.setenv("PDFHARVEST_HEDGE_MODEL", "fast/model")
+    assert HedgePolicy.from_env() == HedgePolicy(fallback_model="fast/model")
+
+
+def test_run_extraction_hedges_straggling_page_to_fallback_model(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=4)
+    release = threading.Event()
+
+    def reply(messages, source: str):
+        human = messages[-1].content
+        page = human.split("[Page ", 1)[1].split("]", 1)[0]
+        if source == "primary" and page == "4":
+            release.wait(timeout=5)
+        body = f"{page},{source}"
+        if "include_header: yes" in human:
+            body = "page_number,source\n" + body
+        return MagicMock(content=body, usage_metadata=None, response_metadata={})
+
+    def build_llm(api_key, model, **kwargs):
+        llm = MagicMock()
+        source = "fallback" if model == "fallback-model" else "primary"
+        llm.invoke.side_effect = lambda messages: reply(messages, source)
+        return llm
+
+    policy = HedgePolicy(
+        percentile=0.5,
+        min_samples=2,
+        max_extra_fraction=0.5,
+        min_delay=0.05,
+        fallback_model="fallback-model",
+    )
+    telemetry = Telemetry()
+    try:
+        with patch("pdfharvest.extraction._build_llm", side_effect=build_llm):
+            rows, _, _ = run_extraction(
+                pdf_path,
+                "q",
+                api_key="k",
+                model="m",
+                ocr_mode="never",
+                hedge=policy,
+                on_event=telemetry,
+            )
+    finally:
+        release.set()
+    assert rows == [
+        ["page_number", "source"],
+        ["1", "primary"],
+        ["2", "primary"],
+        ["3", "primary"],
+        ["4", "fallback"],
+    ]
+    summary = telemetry.summary()
+    assert (summary.llm_hedges, summary.llm_hedges_won) == (1, 1)
+    hedged = [e for e in telemetry.events if e.stage == STAGE_LLM and e.attrs["hedged"]]
+    assert [e.pages for e in hedged] == [(4,)]
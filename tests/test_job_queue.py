@@ -0,0 +1,92 @@
+"""Tests for pdfharvest.job_queue and pdfharvest.worker."""
+
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from pdfharvest.config import MAX_JOB_ATTEMPTS
+from pdfharvest.job_queue import JOB_DONE, JOB_FAILED, JOB_RUNNING, JobQueue
+from pdfharvest.jobs import create_job, load_job
+from pdfharvest.worker import run_worker
+from tests.test_jobs import _failing_after
+from tests.test_run_extraction import _make_blank_pdf, _mock_ocr, _page_echo_llm
+
+
+def test_claim_takes_oldest_job_once(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path / "queue.sqlite3", lease=60)
+    queue.submit("a" * 32, api_key="key-a")
+    queue.submit("b" * 32)
+    assert queue.claim("w1") == ("a" * 32, "key-a")
+    assert queue.claim("w2") == ("b" * 32, None)
+    assert queue.claim("w3") is None
+    job = queue.get("a" * 32)
+    assert job is not None
+    assert (job.status, job.worker, job.attempts) == (JOB_RUNNING, "w1", 1)
+
+
+def test_complete_and_fail_forget_api_key(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path / "queue.sqlite3", lease=60)
+    queue.submit("a" * 32, api_key="secret")
+    queue.submit("b" * 32, api_key="secret")
+    queue.claim("w")
+    queue.claim("w")
+    queue.complete("a" * 32)
+    queue.fail("b" * 32, "boom")
+    assert [(j.status, j.error) for j in queue.jobs()] == [(JOB_DONE, None), (JOB_FAILED, "boom")]
+    # Resubmitting a failed job queues it again
+    queue.submit("b" * 32)
+    assert queue.claim("w") == ("b" * 32, None)
+
+
+def test_stale_running_job_is_requeued_then_failed(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path / "queue.sqlite3", lease=0.05)
+    queue.submit("a" * 32)
+    for attempt in range(MAX_JOB_ATTEMPTS):
+        assert queue.claim(f"w{attempt}") is not None
+        time.sleep(0.1)  # worker died: no heartbeat
+    assert queue.claim("w-last") is None
+    job = queue.get("a" * 32)
+    assert job is not None and job.status == JOB_FAILED
+
+
+def test_heartbeat_keeps_lease(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path / "queue.sqlite3", lease=0.2)
+    queue.submit("a" * 32)
+    queue.claim("w1")
+    for _ in range(3):
+        time.sleep(0.1)
+        queue.heartbeat("a" * 32, "w1")
+    assert queue.claim("w2") is None
+
+
+def test_worker_runs_queued_jobs(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("PDFHARVEST_STORAGE_DIR", str(tmp_path))
+    monkeypatch.delenv("PDFHARVEST_JOBS_DIR", raising=False)
+    monkeypatch.delenv("PDFHARVEST_CACHE_DIR", raising=False)
+    queue = JobQueue.default()
+    ok_pdf, bad_pdf = tmp_path / "ok.pdf", tmp_path / "bad.pdf"
+    _make_blank_pdf(ok_pdf, num_pages=3)
+    _make_blank_pdf(bad_pdf, num_pages=3)
+    ok = create_job(ok_pdf, "q", model="m")
+    bad = create_job(bad_pdf, "other q", model="m")
+    queue.submit(ok, api_key="k")
+    with _mock_ocr("text"):
+        with patch("pdfharvest.extraction._build_llm", return_value=_page_echo_llm()):
+            assert run_worker(queue, poll_interval=0.01, max_jobs=1) == 1
+        queue.submit(bad, api_key="k")
+        with patch("pdfharvest.extraction._build_llm", return_value=_failing_after(1)):
+            assert run_worker(queue, poll_interval=0.01, max_jobs=1) == 1
+    assert load_job(ok).finished
+    assert len(load_job(bad).pages) == 1
+    assert queue.get(ok).status == JOB_DONE
+    failed = queue.get(bad)
+    assert failed.status == JOB_FAILED and "quota exceeded" in failed.error
+
+
+def test_worker_fails_job_without_api_key(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.delenv("OPENROUTER_API_KEY", raising=False)
+    queue = JobQueue(tmp_path / "queue.sqlite3", lease=60)
+    queue.submit("a" * 32)
+    assert run_worker(queue, poll_interval=0.01, max_jobs=1) == 1
+    job = queue.get("a" * 32)
+    assert job.status == JOB_FAILED and "API key" in job.error
@@ -0,0 +1,143 @@
+"""Tests for pdfharvest.jobs (resumable extraction journal)."""
+
+from io import BytesIO
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pdfharvest.exceptions import ExtractionError, StorageError, ValidationError
+from pdfharvest.jobs import (
+    JOURNAL_FILE_NAME,
+    create_job,
+    delete_job,
+    list_jobs,
+    load_job,
+    resume_extraction,
+)
+from pdfharvest.storage import save_upload_to_storage
+from tests.test_run_extraction import _make_blank_pdf, _mock_ocr, _page_echo_llm
+
+
+def _new_job(tmp_path: Path, num_pages: int = 5, **kwargs) -> tuple[str, Path]:
+    pdf_path = tmp_path / "upload.pdf"
+    _make_blank_pdf(pdf_path, num_pages=num_pages)
+    jobs_dir = tmp_path / "jobs"
+    job_id = create_job(pdf_path, "q", model="m", jobs_dir=jobs_dir, **kwargs)
+    return job_id, jobs_dir
+
+
+def _failing_after(pages: int) -> MagicMock:
+    """Echo LLM that raises once it is asked for a page beyond `pages`."""
+    llm = _page_echo_llm()
+    echo = llm.invoke.side_effect
+
+    def invoke(messages):
+        page = int(messages[-1].content.split("[Page ", 1)[1].split("]", 1)[0])
+        if page > pages:
+            raise RuntimeError("quota exceeded")
+        return echo(messages)
+
+    llm.invoke.side_effect = invoke
+    return llm
+
+
+def test_create_job_moves_pdf_and_records_settings(tmp_path: Path) -> None:
+    job_id, jobs_dir = _new_job(tmp_path, page_offset=1, limit_pages=3, pack_tokens=500)
+    assert not (tmp_path / "upload.pdf").exists()
+    job = load_job(job_id, jobs_dir=jobs_dir)
+    assert job.pdf_path.is_file()
+    assert (job.page_offset, job.limit_pages, job.pack_tokens) == (1, 3, 500)
+    assert job.pages == [] and not job.finished
+    assert [j.job_id for j in list_jobs(jobs_dir=jobs_dir)] == [job_id]
+
+
+def test_resume_continues_from_first_unfinished_page(tmp_path: Path) -> None:
+    job_id, jobs_dir = _new_job(tmp_path)
+    with _mock_ocr("text"):
+        with patch("pdfharvest.extraction._build_llm", return_value=_failing_after(2)):
+            with pytest.raises(ExtractionError):
+                resume_extraction(job_id, api_key="k", jobs_dir=jobs_dir)
+    job = load_job(job_id, jobs_dir=jobs_dir)
+    assert [p.page_number for p in job.pages] == [1, 2]
+    assert job.header == ["page_number", "value"]
+    assert not job.finished
+
+    mock_llm = _page_echo_llm()
+    with _mock_ocr("text"):
+        with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
+            rows, extracted, total = resume_extraction(job_id, api_key="k", jobs_dir=jobs_dir)
+    assert rows[0] == ["page_number", "value"]
+    assert rows[1:] == [[str(n), f"value-{n}"] for n in range(1, 6)]
+    assert (extracted, total) == (5, 5)
+    # Only unfinished pages were sent, and the header was not re-discovered
+    sent = [c.args[0][-1].content for c in mock_llm.invoke.call_args_list]
+    assert [s.split("[Page ", 1)[1].split("]", 1)[0] for s in sent] == ["3", "4", "5"]
+    assert not any("include_header: yes" in s for s in sent)
+    assert load_job(job_id, jobs_dir=jobs_dir).finished
+
+
+def test_resume_finished_job_makes_no_requests(tmp_path: Path) -> None:
+    job_id, jobs_dir = _new_job(tmp_path, num_pages=2)
+    with _mock_ocr("text"):
+        with patch("pdfharvest.extraction._build_llm", return_value=_page_echo_llm()):
+            first = resume_extraction(job_id, api_key="k", jobs_dir=jobs_dir)
+    with patch("pdfharvest.extraction._build_llm") as build_llm:
+        assert resume_extraction(job_id, api_key="k", jobs_dir=jobs_dir) == first
+    build_llm.assert_not_called()
+
+
+def test_load_job_drops_torn_last_line(tmp_path: Path) -> None:
+    job_id, jobs_dir = _new_job(tmp_path, num_pages=3)
+    with _mock_ocr("text"):
+        with patch("pdfharvest.extraction._build_llm", return_value=_failing_after(1)):
+            with pytest.raises(ExtractionError):
+                resume_extraction(job_id, api_key="k", jobs_dir=jobs_dir)
+    journal = jobs_dir / job_id / JOURNAL_FILE_NAME
+    with journal.open("a", encoding="utf-8") as f:
+        f.write('{"type": "page", "page": 2, "ro')
+    assert [p.page_number for p in load_job(job_id, jobs_dir=jobs_dir).pages] == [1]
+    assert journal.read_text(encoding="utf-8").endswith("\n")
+
+
+def test_job_id_is_validated_and_missing_job_raises(tmp_path: Path) -> None:
+    with pytest.raises(ValidationError):
+        load_job("../etc", jobs_dir=tmp_path)
+    with pytest.raises(StorageError):
+        load_job("0" * 32, jobs_dir=tmp_path)
+
+
+def test_delete_job(tmp_path: Path) -> None:
+    job_id, jobs_dir = _new_job(tmp_path, num_pages=1)
+    delete_job(job_id, jobs_dir=jobs_dir)
+    assert not (jobs_dir / job_id).exists()
+    assert list_jobs(jobs_dir=jobs_dir) == []
+
+
+def test_jobs_share_a_stored_upload_until_both_are_deleted(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "upload.pdf"
+    _make_blank_pdf(pdf_path, num_pages=2)
+    storage_dir = tmp_path / "storage"
+    jobs_dir = tmp_path / "jobs"
+    uploads = [save_upload_to_storage(BytesIO(pdf_path.read_bytes()), storage_dir) for _ in range(2)]
+    assert uploads[1].reused
+    job_ids = [create_job(u, "q", model="m", jobs_dir=jobs_dir) for u in uploads]
+    job = load_job(job_ids[0], jobs_dir=jobs_dir)
+    assert job.pdf_path == uploads[0].path.resolve()
+    assert job.document_id == uploads[0].document_id
+
+    with _mock_ocr("text"):
+        with patch("pdfharvest.extraction._build_llm", return_value=_page_echo_llm()):
+            with patch("pdfharvest.pdf_utils.hashlib") as hashlib:
+                page_cache = MagicMock(get_page=MagicMock(return_value=None))
+                rows, _, _ = resume_extraction(
+                    job_ids[0], api_key="k", jobs_dir=jobs_dir, page_cache=page_cache
+                )
+    assert len(rows) == 3
+    # The job's document id keys the page cache; the PDF is not hashed again
+    hashlib.sha256.assert_not_called()
+
+    delete_job(job_ids[0], jobs_dir=jobs_dir)
+    assert uploads[0].path.exists()
+    delete_job(job_ids[1], jobs_dir=jobs_dir)
+    assert not uploads[0].path.exists()
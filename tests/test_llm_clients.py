@@ -0,0 +1,82 @@
+"""Tests for pdfharvest.llm_clients."""
+
+from pathlib import Path
+
+from pdfharvest.extraction import run_extraction
+from pdfharvest.llm_clients import LlmClientPool
+from tests.test_run_extraction import _make_blank_pdf
+from tests.test_scheduler import _FakeClock, stub_api  # noqa: F401 (fixture)
+
+URL = "https://llm.example/v1"
+
+
+def test_lease_reuses_client_per_key_and_headers() -> None:
+    pool = LlmClientPool()
+    with pool.lease("key-a", URL, {"X-Title": "t"}) as first:
+        with pool.lease("key-a", URL, {"X-Title": "t"}) as again:
+            assert again is first
+    with pool.lease("key-b", URL, {"X-Title": "t"}) as other:
+        assert other is not first
+    with pool.lease("key-a", URL) as no_headers:
+        assert no_headers is not first
+    assert (pool.created, pool.reused, len(pool)) == (3, 1, 3)
+    pool.discard()
+    assert first.is_closed and len(pool) == 0
+
+
+def test_client_limits_and_timeouts() -> None:
+    pool = LlmClientPool(max_connections=5, timeout=42.0, connect_timeout=3.0)
+    with pool.lease("k", URL) as client:
+        assert client.timeout.read == 42.0 and client.timeout.connect == 3.0
+    pool.discard()
+
+
+def test_idle_clients_are_closed_but_leased_ones_survive() -> None:
+    clock = _FakeClock()
+    pool = LlmClientPool(idle_seconds=60, clock=clock)
+    with pool.lease("old-key", URL) as old:
+        pass
+    with pool.lease("busy-key", URL) as busy:
+        clock.now += 120
+        with pool.lease("new-key", URL):
+            pass
+        assert old.is_closed  # rotated key, unused for longer than idle_seconds
+        assert not busy.is_closed
+    assert len(pool) == 2
+
+
+def test_discard_defers_close_until_last_lease_ends() -> None:
+    pool = LlmClientPool()
+    with pool.lease("k", URL) as client:
+        pool.discard("k")
+        assert not client.is_closed and len(pool) == 0
+        with pool.lease("k", URL) as replacement:
+            assert replacement is not client
+    assert client.is_closed and not replacement.is_closed
+    pool.discard()
+
+
+def test_least_recently_used_clients_are_evicted_over_the_cap() -> None:
+    pool = LlmClientPool(max_clients=2)
+    clients = []
+    for key in ("a", "b", "c"):
+        with pool.lease(key, URL) as client:
+            clients.append(client)
+    assert [c.is_closed for c in clients] == [True, False, False]
+    pool.discard()
+
+
+def test_runs_share_one_keep_alive_connection(tmp_path: Path, stub_api) -> None:  # noqa: F811
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=2)
+    pool = LlmClientPool()
+    for _ in range(2):
+        rows, _, _ = run_extraction(
+            pdf_path, "q", api_key="k", model="stub-model", ocr_mode="never", llm_clients=pool
+        )
+        assert len(rows) == 3
+    assert (pool.created, pool.reused) == (1, 1)
+    assert stub_api["requests"] == 4
+    # Serial requests over one pooled connection: a single client port
+    assert len(stub_api["ports"]) == 1
+    pool.discard()
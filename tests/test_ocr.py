@@ -0,0 +1,61 @@
+"""Tests for pdfharvest.ocr (process-pool OCR executor)."""
+
+import os
+import time
+from pathlib import Path
+
+from pdfharvest.ocr import OcrExecutor
+
+
+def _echo_task(pdf_path: Path, page_number: int, temp_dir: str) -> str:
+    return f"page {page_number}"
+
+
+def _raising_task(pdf_path: Path, page_number: int, temp_dir: str) -> str:
+    if page_number == 2:
+        raise RuntimeError("malformed page")
+    return f"page {page_number}"
+
+
+def _crashing_task(pdf_path: Path, page_number: int, temp_dir: str) -> str:
+    if page_number == 2:
+        os._exit(1)
+    return f"page {page_number}"
+
+
+def _slow_task(pdf_path: Path, page_number: int, temp_dir: str) -> str:
+    if page_number == 1:
+        time.sleep(30)
+    return f"page {page_number}"
+
+
+def _run_pages(executor: OcrExecutor, pages: list[int], tmp_path: Path) -> list[str | None]:
+    futures = [executor.submit(tmp_path / "x.pdf", n, str(tmp_path)) for n in pages]
+    return [executor.result(f) for f in futures]
+
+
+def test_ocr_executor_returns_results_in_submission_order(tmp_path: Path) -> None:
+    with OcrExecutor(2, task=_echo_task) as executor:
+        results = _run_pages(executor, [1, 2, 3, 4], tmp_path)
+    assert results == ["page 1", "page 2", "page 3", "page 4"]
+
+
+def test_ocr_executor_failed_page_yields_none(tmp_path: Path) -> None:
+    with OcrExecutor(2, task=_raising_task) as executor:
+        results = _run_pages(executor, [1, 2, 3], tmp_path)
+    assert results == ["page 1", None, "page 3"]
+
+
+def test_ocr_executor_survives_worker_crash(tmp_path: Path) -> None:
+    with OcrExecutor(2, task=_crashing_task) as executor:
+        results = _run_pages(executor, [1, 2, 3], tmp_path)
+        # The pool is rebuilt and keeps accepting work
+        assert _run_pages(executor, [4], tmp_path) == ["page 4"]
+    assert results[1] is None
+    assert results[2] in ("page 3", None)
+
+
+def test_ocr_executor_timeout_yields_none(tmp_path: Path) -> None:
+    with OcrExecutor(2, task=_slow_task, task_timeout=3, shutdown_timeout=0.1) as executor:
+        results = _run_pages(executor, [1, 2], tmp_path)
+    assert results == [None, "page 2"]
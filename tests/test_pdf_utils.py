@@ -4,13 +4,26 @@ from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
+from PIL import Image
 from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
 
+from pdfharvest.config import OCR_MODE_ALWAYS, OCR_MODE_AUTO, OCR_MODE_NEVER, OCR_SPARSE_PSM
 from pdfharvest.exceptions import PDFError
+from pdfharvest.storage import file_sha256
 from pdfharvest.pdf_utils import (
+    Document,
+    OcrResult,
+    OcrStrategy,
+    PageProfile,
     extract_text_from_page,
     get_total_pages,
+    needs_ocr,
+    ocr_image,
+    ocr_image_file,
     ocr_page,
+    profile_page,
+    render_pages,
 )
 
 
@@ -67,6 +80,18 @@ def test_ocr_page_returns_empty_when_no_images(tmp_path: Path) -> None:
     assert result == ""
 
 
+def _tesseract_data(text: str, conf: float) -> dict[str, list]:
+    """Build an image_to_data DICT result with one line of words at a fixed confidence."""
+    words = text.split()
+    return {
+        "text": words,
+        "conf": [conf] * len(words),
+        "block_num": [1] * len(words),
+        "par_num": [1] * len(words),
+        "line_num": [1] * len(words),
+    }
+
+
 def test_ocr_page_returns_text_from_tesseract(tmp_path: Path) -> None:
     pdf_path = tmp_path / "x.pdf"
     _make_blank_pdf(pdf_path)
@@ -74,21 +99,193 @@ def test_ocr_page_returns_text_from_tesseract(tmp_path: Path) -> None:
     with patch("pdfharvest.pdf_utils.convert_from_path") as convert:
         convert.return_value = [mock_image]
         with patch("pdfharvest.pdf_utils.pytesseract") as pyt:
-            pyt.image_to_string.return_value = "extracted text"
+            pyt.image_to_osd.return_value = {"rotate": 0}
+            pyt.image_to_data.return_value = _tesseract_data("extracted text", 95.0)
             result = ocr_page(pdf_path, 1, str(tmp_path))
     assert result == "extracted text"
     mock_image.close.assert_called_once()
 
 
 def test_ocr_page_closes_image_on_tesseract_error(tmp_path: Path) -> None:
-    """When tesseract raises, image.close() is still called (in finally), then exception propagates."""
+    """When tesseract raises, the page yields no text and image.close() is still called."""
     pdf_path = tmp_path / "x.pdf"
     _make_blank_pdf(pdf_path)
     mock_image = MagicMock()
     with patch("pdfharvest.pdf_utils.convert_from_path") as convert:
         convert.return_value = [mock_image]
         with patch("pdfharvest.pdf_utils.pytesseract") as pyt:
-            pyt.image_to_string.side_effect = Exception("tesseract error")
-            with pytest.raises(Exception, match="tesseract error"):
-                ocr_page(pdf_path, 1, str(tmp_path))
+            pyt.image_to_osd.side_effect = Exception("tesseract error")
+            pyt.image_to_data.side_effect = Exception("tesseract error")
+            assert ocr_page(pdf_path, 1, str(tmp_path)) == ""
     mock_image.close.assert_called_once()
+
+
+def test_ocr_image_single_pass_when_confident() -> None:
+    with patch("pdfharvest.pdf_utils.pytesseract") as pyt:
+        pyt.image_to_osd.return_value = {"rotate": 0}
+        pyt.image_to_data.return_value = _tesseract_data("clear scan", 92.0)
+        result = ocr_image(MagicMock())
+    assert result.text == "clear scan"
+    assert result.psm == 6
+    assert result.attempts == 1
+    assert pyt.image_to_data.call_count == 1
+    assert result.seconds >= 0
+
+
+def test_ocr_image_escalates_and_picks_highest_confidence() -> None:
+    passes = {
+        "--psm 6": _tesseract_data("long but garbled output here", 20.0),
+        "--psm 3": _tesseract_data("short good", 75.0),
+    }
+    with patch("pdfharvest.pdf_utils.pytesseract") as pyt:
+        pyt.image_to_osd.return_value = {"rotate": 0}
+        pyt.image_to_data.side_effect = lambda image, config, output_type: passes[config]
+        result = ocr_image(MagicMock())
+    # Escalation stops at the first pass above the threshold; confidence beats length
+    assert result.text == "short good"
+    assert result.psm == 3
+    assert result.attempts == 2
+
+
+def test_ocr_image_uses_sparse_mode_when_osd_fails() -> None:
+    with patch("pdfharvest.pdf_utils.pytesseract") as pyt:
+        pyt.image_to_osd.side_effect = Exception("Too few characters")
+        pyt.image_to_data.return_value = _tesseract_data("Acme 555-0100", 88.0)
+        result = ocr_image(MagicMock())
+    assert result.psm == OCR_SPARSE_PSM
+    assert pyt.image_to_data.call_args.kwargs["config"] == f"--psm {OCR_SPARSE_PSM}"
+
+
+def test_ocr_image_rotates_page_from_osd() -> None:
+    image = MagicMock()
+    with patch("pdfharvest.pdf_utils.pytesseract") as pyt:
+        pyt.image_to_osd.return_value = {"rotate": 90}
+        pyt.image_to_data.return_value = _tesseract_data("upright now", 90.0)
+        result = ocr_image(image)
+    image.rotate.assert_called_once_with(-90, expand=True)
+    assert result.rotation == 90
+
+
+def test_ocr_strategy_remembers_confident_psm_and_rotation() -> None:
+    strategy = OcrStrategy()
+    assert strategy.plan() == (None, None)
+    strategy.record(OcrResult(text="low", psm=11, confidence=10.0, rotation=0))
+    assert strategy.plan() == (None, None)
+    strategy.record(OcrResult(text="good", psm=3, confidence=80.0, rotation=0))
+    assert strategy.plan() == (3, 0)
+    with patch("pdfharvest.pdf_utils.pytesseract") as pyt:
+        pyt.image_to_data.return_value = _tesseract_data("next page", 85.0)
+        result = ocr_image(MagicMock(), psm=3, rotation=0)
+    # Known rotation: no OSD; remembered mode is tried first
+    pyt.image_to_osd.assert_not_called()
+    assert result.psm == 3
+
+
+def _make_text_pdf(path: Path, text: str) -> None:
+    """Write a one-page letter-size PDF with a Helvetica text layer."""
+    writer = PdfWriter()
+    page = writer.add_blank_page(width=612, height=792)
+    font = DictionaryObject(
+        {
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type1"),
+            NameObject("/BaseFont"): NameObject("/Helvetica"),
+        }
+    )
+    page[NameObject("/Resources")] = DictionaryObject(
+        {NameObject("/Font"): DictionaryObject({NameObject("/F1"): writer._add_object(font)})}
+    )
+    content = DecodedStreamObject()
+    content.set_data(f"BT /F1 10 Tf 72 720 Td ({text}) Tj ET".encode("latin-1"))
+    page[NameObject("/Contents")] = writer._add_object(content)
+    with path.open("wb") as f:
+        writer.write(f)
+
+
+def test_profile_page_text_layer(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "text.pdf"
+    _make_text_pdf(pdf_path, "Acme Corp, 12 Main Street, Springfield " * 3)
+    profile = profile_page(PdfReader(str(pdf_path)), 0)
+    assert "Acme Corp" in profile.text
+    assert profile.image_coverage == 0.0
+    assert profile.garbage_ratio == 0.0
+    assert not needs_ocr(profile, OCR_MODE_AUTO)
+
+
+def test_profile_page_full_page_image(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "scan.pdf"
+    Image.new("RGB", (200, 300), "white").save(pdf_path)
+    profile = profile_page(PdfReader(str(pdf_path)), 0)
+    assert profile.text == ""
+    assert profile.image_coverage == pytest.approx(1.0)
+    assert needs_ocr(profile, OCR_MODE_AUTO)
+
+
+def test_needs_ocr_image_page_with_caption_only() -> None:
+    profile = PageProfile(
+        text="x" * 60, image_coverage=0.9, char_density=0.6, garbage_ratio=0.0
+    )
+    assert needs_ocr(profile, OCR_MODE_AUTO)
+
+
+def test_needs_ocr_garbage_text_layer() -> None:
+    profile = PageProfile(
+        text="�" * 80, image_coverage=0.0, char_density=10.0, garbage_ratio=1.0
+    )
+    assert needs_ocr(profile, OCR_MODE_AUTO)
+
+
+def test_needs_ocr_forced_modes() -> None:
+    blank = PageProfile(text="", image_coverage=1.0, char_density=0.0, garbage_ratio=0.0)
+    assert needs_ocr(blank, OCR_MODE_ALWAYS)
+    assert not needs_ocr(blank, OCR_MODE_NEVER)
+
+
+def test_render_pages_single_invocation_maps_pages(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "x.pdf"
+    _make_blank_pdf(pdf_path, num_pages=12)
+    paths = [str(tmp_path / f"abc-{n:02d}.png") for n in range(9, 12)]
+    with patch("pdfharvest.pdf_utils.convert_from_path", return_value=paths) as convert:
+        rendered = render_pages(pdf_path, 9, 11, str(tmp_path))
+    convert.assert_called_once()
+    assert convert.call_args.kwargs["first_page"] == 9
+    assert convert.call_args.kwargs["last_page"] == 11
+    assert rendered == {n: tmp_path / f"abc-{n:02d}.png" for n in range(9, 12)}
+
+
+def test_render_pages_returns_empty_on_failure(tmp_path: Path) -> None:
+    with patch("pdfharvest.pdf_utils.convert_from_path", side_effect=RuntimeError("boom")):
+        assert render_pages(tmp_path / "x.pdf", 1, 3, str(tmp_path)) == {}
+
+
+def test_ocr_image_file_deletes_image(tmp_path: Path) -> None:
+    image_path = tmp_path / "page-1.png"
+    Image.new("RGB", (10, 10), "white").save(image_path)
+    with patch("pdfharvest.pdf_utils.pytesseract") as pyt:
+        pyt.image_to_data.return_value = _tesseract_data("scanned words", 90.0)
+        assert ocr_image_file(image_path, psm=6, rotation=0).text == "scanned words"
+    assert not image_path.exists()
+
+
+def test_document_caches_count_hash_and_page_info(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=3)
+    with Document(pdf_path) as document:
+        assert document.page_count == 3
+        assert get_total_pages(document) == 3
+        assert document.document_id == file_sha256(pdf_path)
+        with patch("pdfharvest.pdf_utils.profile_page", wraps=profile_page) as profile:
+            info = document.page_info(1)
+            assert document.page_info(1) is info
+        profile.assert_called_once()
+        assert (info.text_length, info.image_coverage) == (0, 0.0)
+    assert Document(pdf_path, document_id="known").document_id == "known"
+
+
+def test_document_raises_pdf_error_on_bad_files(tmp_path: Path) -> None:
+    for name, content in (("empty.pdf", b""), ("bad.pdf", b"not a pdf")):
+        (tmp_path / name).write_bytes(content)
+        with pytest.raises(PDFError):
+            Document(tmp_path / name).page_count
+    with pytest.raises(PDFError):
+        Document(tmp_path / "missing.pdf")
@@ -0,0 +1,99 @@
+"""Tests for pdfharvest.preprocess and opt-in preprocessing in extraction."""
+
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from pdfharvest.extraction import _preprocess_page_texts, run_extraction
+from pdfharvest.preprocess import PagePreprocessor, compact_whitespace
+from pdfharvest.telemetry import STAGE_PREPROCESS, Telemetry
+from tests.test_run_extraction import _make_blank_pdf
+
+
+def _directory_page(n: int) -> str:
+    return (
+        "ACME Member Directory 2024\n"
+        "Confidential\n"
+        f"Name: Member {n}\n"
+        f"Phone: 555-01{n:02}\n"
+        f"Name: Member {n}b\n"
+        f"Phone: 555-02{n:02}\n"
+        f"Directory - Page {n} of 40\n"
+        f"{n}"
+    )
+
+
+def test_compact_whitespace_keeps_lines_and_column_gaps() -> None:
+    text = "  Name      Phone \t\n\n\n\nJane   555-0100   \n\n"
+    assert compact_whitespace(text) == "Name  Phone\n\nJane  555-0100"
+
+
+def test_strips_repeated_edge_lines_and_page_numbers() -> None:
+    preprocessor = PagePreprocessor()
+    for n in range(1, 6):
+        preprocessor.observe(_directory_page(n))
+    cleaned = preprocessor.apply(_directory_page(3))
+    assert cleaned.text == "Name: Member 3\nPhone: 555-0103\nName: Member 3b\nPhone: 555-0203"
+    assert cleaned.lines_removed == 4
+    assert cleaned.chars_removed > 0
+
+
+def test_body_lines_and_rare_lines_are_kept() -> None:
+    preprocessor = PagePreprocessor(min_pages=3)
+    pages = [f"Title {n}\nLabel:\nbody {n}\nLabel:\nmore {n}\nLabel:\nend {n}\nLabel:\nlast {n}" for n in range(5)]
+    pages[0] = "Special notice\n" + pages[0]
+    for text in pages:
+        preprocessor.observe(text)
+    # "Label:" repeats on every page but below a unique line; "Special notice" is on one page
+    assert preprocessor.apply(pages[0]).text.startswith("Special notice\nTitle 0\nLabel:")
+    assert preprocessor.apply(pages[1]).text.count("Label:") == 4
+
+
+def test_short_documents_only_lose_page_numbers() -> None:
+    preprocessor = PagePreprocessor()
+    pages = [_directory_page(1), _directory_page(2)]
+    for text in pages:
+        preprocessor.observe(text)
+    cleaned = preprocessor.apply(pages[0]).text
+    assert cleaned.startswith("ACME Member Directory 2024\nConfidential")
+    assert cleaned.endswith("Directory - Page 1 of 40")
+
+
+def test_first_pages_are_held_back_for_detection() -> None:
+    items = iter([(n, _directory_page(n), None) for n in range(1, 7)])
+    events = []
+    out = list(_preprocess_page_texts(items, events.append, sample_pages=4))
+    assert [n for n, _, _ in out] == [1, 2, 3, 4, 5, 6]
+    # Page 1 is cleaned using what pages 2-4 taught
+    assert not out[0][1].startswith("ACME")
+    assert [e.stage for e in events] == [STAGE_PREPROCESS] * 6
+    assert all(e.attrs["tokens_saved"] > 0 for e in events)
+
+
+def test_run_extraction_preprocess_reports_tokens_saved(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=4)
+    contexts = []
+
+    def invoke(messages):
+        human = messages[-1].content
+        contexts.append(human)
+        page = human.split("[Page ", 1)[1].split("]", 1)[0]
+        return MagicMock(content=f"page_number,value\n{page},x")
+
+    llm = MagicMock()
+    llm.invoke.side_effect = invoke
+    texts = {n: _directory_page(n) for n in range(1, 5)}
+    telemetry = Telemetry()
+
+    def page_texts(document, page_offset, limit_pages, *args):
+        for n in range(page_offset + 1, page_offset + 1 + (limit_pages or 4)):
+            yield n, texts[n], None
+
+    with patch("pdfharvest.extraction._iter_page_text", side_effect=page_texts):
+        with patch("pdfharvest.extraction._build_llm", return_value=llm):
+            rows, _, _ = run_extraction(
+                pdf_path, "q", api_key="k", model="m", on_event=telemetry, preprocess=True
+            )
+    assert len(rows) == 5
+    assert not any("Confidential" in c or "Page 2 of 40" in c for c in contexts)
+    assert telemetry.summary().tokens_saved > 0
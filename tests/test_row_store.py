@@ -0,0 +1,49 @@
+"""Tests for pdfharvest.row_store."""
+
+from pathlib import Path
+
+import pytest
+
+from pdfharvest.exceptions import StorageError
+from pdfharvest.extraction import serialize_rows
+from pdfharvest.row_store import RowStore
+
+
+def _rows(n: int) -> list[list[str]]:
+    return [["page_number", "value"]] + [[str(i), f"v{i}, \"quoted\"\n"] for i in range(1, n)]
+
+
+def test_small_result_stays_in_memory(tmp_path: Path) -> None:
+    with RowStore(_rows(10), directory=tmp_path) as store:
+        assert len(store) == 10 and not store.spilled
+        assert list(store) == _rows(10)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_large_result_spills_and_reads_back_in_order(tmp_path: Path) -> None:
+    rows = _rows(500) + [["ragged", "row", "wider"]]
+    store = RowStore(rows, max_bytes=2000, directory=tmp_path, batch_rows=7)
+    assert store.spilled and len(store) == 501
+    assert len(list(tmp_path.iterdir())) == 1
+    assert list(store) == rows
+    assert store.slice(0, 1) == [rows[0]]
+    assert store.slice(495, 600) == rows[495:]
+    assert store.slice(10, 5) == []
+    assert store.width == 3
+    assert serialize_rows(store, "CSV") == serialize_rows(rows, "CSV")
+    store.close()
+    assert list(tmp_path.iterdir()) == [] and len(store) == 0
+
+
+def test_spill_file_removed_when_store_is_collected(tmp_path: Path) -> None:
+    store = RowStore(_rows(200), max_bytes=100, directory=tmp_path)
+    assert len(list(tmp_path.iterdir())) == 1
+    del store
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spill_failure_raises_storage_error(tmp_path: Path) -> None:
+    blocker = tmp_path / "file"
+    blocker.write_text("not a directory")
+    with pytest.raises(StorageError, match="spill file"):
+        RowStore(_rows(50), max_bytes=100, directory=blocker / "results")
@@ -1,14 +1,26 @@
 """Tests for run_extraction and extraction pipeline (with mocked LLM)."""
 
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
 from unittest.mock import MagicMock, patch
 
 import pytest
+from langchain_core.messages import AIMessageChunk
 from pypdf import PdfWriter
 
-from pdfharvest.config import OUTPUT_FORMAT_CSV, OUTPUT_FORMAT_TSV
-from pdfharvest.exceptions import ExtractionError
-from pdfharvest.extraction import run_extraction
+from pdfharvest.config import (
+    OCR_RENDER_BATCH_PAGES,
+    OUTPUT_FORMAT_CSV,
+    OUTPUT_FORMAT_PARQUET,
+    OUTPUT_FORMAT_TSV,
+)
+from pdfharvest.exceptions import ExtractionError, ValidationError
+from pdfharvest.cache import PageTextCache, ResponseCache
+from pdfharvest.extraction import _split_page_rows, iter_extraction, run_extraction
+from pdfharvest.pdf_utils import Document, OcrResult
+from pdfharvest.row_store import RowStore
 
 
 def _make_blank_pdf(path: Path, num_pages: int = 1) -> None:
@@ -19,6 +31,19 @@ def _make_blank_pdf(path: Path, num_pages: int = 1) -> None:
         writer.write(f)
 
 
+@contextmanager
+def _mock_ocr(text: str = "page text") -> Iterator[MagicMock]:
+    """Patch page rendering and OCR so every rendered page reads as text; yields the render mock."""
+
+    def render(pdf_path, first_page, last_page, temp_dir, dpi=None):
+        return {n: Path(temp_dir) / f"page-{n}.png" for n in range(first_page, last_page + 1)}
+
+    with patch("pdfharvest.extraction.render_pages", side_effect=render) as render_mock:
+        ocr_result = OcrResult(text=text, psm=6, confidence=90.0, attempts=1)
+        with patch("pdfharvest.extraction.ocr_image_file", return_value=ocr_result):
+            yield render_mock
+
+
 def test_run_extraction_zero_effective_pages_returns_empty(tmp_path: Path) -> None:
     pdf_path = tmp_path / "blank.pdf"
     _make_blank_pdf(pdf_path)
@@ -45,7 +70,7 @@ def test_run_extraction_with_mocked_ocr_and_llm(tmp_path: Path) -> None:
     mock_response.content = "page_number,value\n1,extracted"
     mock_llm.invoke.return_value = mock_response
 
-    with patch("pdfharvest.extraction.ocr_page", return_value="page text here"):
+    with _mock_ocr("page text here"):
         with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
             rows, extracted, total = run_extraction(
                 pdf_path,
@@ -73,7 +98,7 @@ def test_run_extraction_calls_progress_callback(tmp_path: Path) -> None:
     def capture(p: float, t: str) -> None:
         progress_calls.append((p, t))
 
-    with patch("pdfharvest.extraction.ocr_page", return_value="x"):
+    with _mock_ocr("x"):
         with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
             run_extraction(
                 pdf_path,
@@ -93,7 +118,7 @@ def test_run_extraction_tsv_format(tmp_path: Path) -> None:
     _make_blank_pdf(pdf_path)
     mock_llm = MagicMock()
     mock_llm.invoke.return_value = MagicMock(content="page_number\tval\n1\tdata")
-    with patch("pdfharvest.extraction.ocr_page", return_value="text"):
+    with _mock_ocr("text"):
         with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
             rows, _, _ = run_extraction(
                 pdf_path,
@@ -107,6 +132,26 @@ def test_run_extraction_tsv_format(tmp_path: Path) -> None:
     assert rows[1] == ["1", "data"]
 
 
+def test_run_extraction_columnar_format_asks_for_csv(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "blank.pdf"
+    _make_blank_pdf(pdf_path)
+    mock_llm = MagicMock()
+    mock_llm.invoke.return_value = MagicMock(content="page_number,val\n1,data")
+    with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
+        rows, _, _ = run_extraction(
+            pdf_path,
+            "q",
+            limit_pages=1,
+            output_format=OUTPUT_FORMAT_PARQUET,
+            api_key="k",
+            model="m",
+            ocr_mode="never",
+        )
+    assert rows == [["page_number", "val"], ["1", "data"]]
+    system = mock_llm.invoke.call_args.args[0][0].content
+    assert "CSV format" in system and OUTPUT_FORMAT_PARQUET not in system
+
+
 def test_run_extraction_skips_duplicate_header_row(tmp_path: Path) -> None:
     pdf_path = tmp_path / "blank.pdf"
     _make_blank_pdf(pdf_path)
@@ -115,7 +160,7 @@ def test_run_extraction_skips_duplicate_header_row(tmp_path: Path) -> None:
     mock_llm.invoke.return_value = MagicMock(
         content="page_number,name\n1,Alice\npage_number,name\n2,Bob"
     )
-    with patch("pdfharvest.extraction.ocr_page", return_value="page text"):
+    with _mock_ocr("page text"):
         with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
             # One page only - so single invoke
             rows, _, _ = run_extraction(
@@ -138,7 +183,7 @@ def test_run_extraction_skips_page_when_llm_returns_empty(tmp_path: Path) -> Non
     mock_response.content = ""
     mock_response.__str__ = lambda self: ""  # getattr(..., "content") or str(result) -> ""
     mock_llm.invoke.return_value = mock_response
-    with patch("pdfharvest.extraction.ocr_page", return_value="text"):
+    with _mock_ocr("text"):
         with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
             rows, extracted, total = run_extraction(
                 pdf_path,
@@ -158,7 +203,7 @@ def test_run_extraction_page_number_is_actual_pdf_page(tmp_path: Path) -> None:
     _make_blank_pdf(pdf_path, num_pages=5)
     mock_llm = MagicMock()
     mock_llm.invoke.return_value = MagicMock(content="page_number,val\n1,ignored")
-    with patch("pdfharvest.extraction.ocr_page", return_value="text"):
+    with _mock_ocr("text"):
         with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
             rows, _, _ = run_extraction(
                 pdf_path,
@@ -176,7 +221,7 @@ def test_run_extraction_raises_on_llm_failure(tmp_path: Path) -> None:
     _make_blank_pdf(pdf_path)
     mock_llm = MagicMock()
     mock_llm.invoke.side_effect = RuntimeError("API error")
-    with patch("pdfharvest.extraction.ocr_page", return_value="x"):
+    with _mock_ocr("x"):
         with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
             with pytest.raises(ExtractionError, match="LLM invocation failed"):
                 run_extraction(
@@ -186,3 +231,406 @@ def test_run_extraction_raises_on_llm_failure(tmp_path: Path) -> None:
                     api_key="k",
                     model="m",
                 )
+
+
+def _page_echo_llm() -> MagicMock:
+    """Mock LLM that echoes the page number from the context, with a header when asked."""
+    mock_llm = MagicMock()
+
+    def invoke(messages):
+        human = messages[-1].content
+        page = human.split("[Page ", 1)[1].split("]", 1)[0]
+        body = f"{page},value-{page}"
+        if "include_header: yes" in human:
+            body = "page_number,value\n" + body
+        return MagicMock(content=body)
+
+    mock_llm.invoke.side_effect = invoke
+    return mock_llm
+
+
+def test_run_extraction_concurrent_keeps_page_order(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "blank.pdf"
+    _make_blank_pdf(pdf_path, num_pages=6)
+    mock_llm = _page_echo_llm()
+    progress_calls: list[tuple[float, str]] = []
+    with _mock_ocr("text"):
+        with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
+            rows, extracted, total = run_extraction(
+                pdf_path,
+                "q",
+                api_key="k",
+                model="m",
+                max_concurrency=3,
+                progress_callback=lambda p, t: progress_calls.append((p, t)),
+            )
+    assert rows[0] == ["page_number", "value"]
+    assert rows[1:] == [[str(n), f"value-{n}"] for n in range(1, 7)]
+    assert extracted == 6
+    assert total == 6
+    assert [t for _, t in progress_calls] == [f"Extracting page {n}/6" for n in range(1, 7)]
+    assert progress_calls[-1][0] == 1.0
+    # Only the first page asks for a header
+    headers_requested = [
+        "include_header: yes" in c.args[0][-1].content for c in mock_llm.invoke.call_args_list
+    ]
+    assert headers_requested.count(True) == 1
+
+
+def test_run_extraction_concurrent_raises_on_llm_failure(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "blank.pdf"
+    _make_blank_pdf(pdf_path, num_pages=4)
+    mock_llm = _page_echo_llm()
+    echo = mock_llm.invoke.side_effect
+
+    def invoke(messages):
+        if "[Page 3]" in messages[-1].content:
+            raise RuntimeError("API error")
+        return echo(messages)
+
+    mock_llm.invoke.side_effect = invoke
+    with _mock_ocr("text"):
+        with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
+            with pytest.raises(ExtractionError, match="LLM invocation failed"):
+                run_extraction(
+                    pdf_path,
+                    "q",
+                    api_key="k",
+                    model="m",
+                    max_concurrency=2,
+                )
+
+
+def test_run_extraction_reports_ocr_pages(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "blank.pdf"
+    _make_blank_pdf(pdf_path, num_pages=2)
+    mock_llm = _page_echo_llm()
+    ocr_results: dict[int, OcrResult] = {}
+    with _mock_ocr("scanned") as render:
+        with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
+            run_extraction(pdf_path, "q", api_key="k", model="m", ocr_results=ocr_results)
+    # Blank pages have no text layer, so auto mode OCRs both from one render
+    assert sorted(ocr_results) == [1, 2]
+    assert ocr_results[1].psm == 6
+    render.assert_called_once()
+    assert render.call_args.args[1:3] == (1, 2)
+
+
+def test_run_extraction_ocr_mode_never_skips_ocr(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "blank.pdf"
+    _make_blank_pdf(pdf_path, num_pages=2)
+    mock_llm = _page_echo_llm()
+    ocr_results: dict[int, OcrResult] = {}
+    with _mock_ocr() as render:
+        with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
+            rows, _, _ = run_extraction(
+                pdf_path, "q", api_key="k", model="m", ocr_mode="never", ocr_results=ocr_results
+            )
+    render.assert_not_called()
+    assert ocr_results == {}
+    assert len(rows) == 3
+
+
+def test_run_extraction_rejects_unknown_ocr_mode(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "blank.pdf"
+    _make_blank_pdf(pdf_path)
+    with pytest.raises(ValidationError, match="OCR mode"):
+        run_extraction(pdf_path, "q", api_key="k", model="m", ocr_mode="sometimes")
+
+
+def test_run_extraction_renders_ocr_pages_in_batches(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "blank.pdf"
+    _make_blank_pdf(pdf_path, num_pages=10)
+    mock_llm = _page_echo_llm()
+    with _mock_ocr("scanned") as render:
+        with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
+            rows, _, _ = run_extraction(pdf_path, "q", api_key="k", model="m")
+    ranges = [c.args[1:3] for c in render.call_args_list]
+    assert ranges == [(1, OCR_RENDER_BATCH_PAGES), (OCR_RENDER_BATCH_PAGES + 1, 10)]
+    assert [r[0] for r in rows[1:]] == [str(n) for n in range(1, 11)]
+
+
+def test_run_extraction_second_run_served_from_page_cache(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "blank.pdf"
+    _make_blank_pdf(pdf_path, num_pages=3)
+    cache_path = tmp_path / "cache" / "pages.sqlite3"
+    first_cache = PageTextCache(cache_path, max_bytes=1024 * 1024)
+    with _mock_ocr("scanned") as render:
+        with patch("pdfharvest.extraction._build_llm", return_value=_page_echo_llm()):
+            run_extraction(pdf_path, "q", api_key="k", model="m", page_cache=first_cache)
+    assert render.call_count == 1
+    assert (first_cache.hits, first_cache.misses) == (0, 3)
+
+    second_cache = PageTextCache(cache_path, max_bytes=1024 * 1024)
+    ocr_results: dict[int, OcrResult] = {}
+    mock_llm = _page_echo_llm()
+    with _mock_ocr("scanned") as render:
+        with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
+            rows, _, _ = run_extraction(
+                pdf_path,
+                "q",
+                api_key="k",
+                model="m",
+                page_cache=second_cache,
+                ocr_results=ocr_results,
+            )
+    render.assert_not_called()
+    assert (second_cache.hits, second_cache.misses) == (3, 0)
+    assert all(r.cached for r in ocr_results.values())
+    assert "scanned" in mock_llm.invoke.call_args_list[0].args[0][-1].content
+    assert len(rows) == 4
+
+
+def test_run_extraction_rerun_served_from_response_cache(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "blank.pdf"
+    _make_blank_pdf(pdf_path, num_pages=3)
+    cache_path = tmp_path / "responses.sqlite3"
+    results = []
+    for _ in range(2):
+        mock_llm = _page_echo_llm()
+        cache = ResponseCache(cache_path, max_bytes=1024 * 1024)
+        with _mock_ocr("scanned"):
+            with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
+                rows, _, _ = run_extraction(
+                    pdf_path, "q", api_key="k", model="m", response_cache=cache
+                )
+        results.append((rows, mock_llm.invoke.call_count, cache.hits))
+    assert results[0][1:] == (3, 0)
+    assert results[1][1:] == (0, 3)
+    assert results[0][0] == results[1][0]
+
+
+def _pack_echo_llm() -> MagicMock:
+    """Mock LLM that answers one row per [Page N] marker in the request."""
+    mock_llm = MagicMock()
+
+    def invoke(messages):
+        human = messages[-1].content
+        pages = [part.split("]", 1)[0] for part in human.split("[Page ")[1:]]
+        lines = [f"{page},value-{page}" for page in pages]
+        if "include_header: yes" in human:
+            lines.insert(0, "page_number,value")
+        return MagicMock(content="\n".join(lines))
+
+    mock_llm.invoke.side_effect = invoke
+    return mock_llm
+
+
+def test_run_extraction_packs_pages_within_token_budget(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "blank.pdf"
+    _make_blank_pdf(pdf_path, num_pages=6)
+    mock_llm = _pack_echo_llm()
+    progress_calls: list[tuple[float, str]] = []
+    # Each page context is ~5 tokens; a budget of 10 packs two pages per request
+    with _mock_ocr("short text"):
+        with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
+            rows, extracted, total = run_extraction(
+                pdf_path,
+                "q",
+                api_key="k",
+                model="m",
+                pack_tokens=10,
+                max_concurrency=2,
+                progress_callback=lambda p, t: progress_calls.append((p, t)),
+            )
+    assert mock_llm.invoke.call_count == 3
+    assert rows[0] == ["page_number", "value"]
+    assert rows[1:] == [[str(n), f"value-{n}"] for n in range(1, 7)]
+    assert (extracted, total) == (6, 6)
+    assert len(progress_calls) == 6
+
+
+def test_split_page_rows_attributes_rows_by_page_number() -> None:
+    output = "page_number,name\n3,Alice\nx,Bob\n4,Carol\n9,Dan"
+    header, by_page = _split_page_rows(output, ",", [3, 4], None)
+    assert header == ["page_number", "name"]
+    # Rows without a valid requested page follow the previous row's page
+    assert by_page == {3: [["3", "Alice"], ["3", "Bob"]], 4: [["4", "Carol"], ["4", "Dan"]]}
+
+
+def test_iter_extraction_yields_page_results_in_order(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "blank.pdf"
+    _make_blank_pdf(pdf_path, num_pages=4)
+    with _mock_ocr("scanned"):
+        with patch("pdfharvest.extraction._build_llm", return_value=_page_echo_llm()):
+            results = list(
+                iter_extraction(pdf_path, "q", api_key="k", model="m", max_concurrency=2)
+            )
+    assert [r.page_number for r in results] == [1, 2, 3, 4]
+    assert results[0].header == ["page_number", "value"]
+    assert all(r.header is None for r in results[1:])
+    assert [r.rows for r in results] == [[[str(n), f"value-{n}"]] for n in range(1, 5)]
+    assert all(r.ocr_used for r in results)
+    assert all(r.text_seconds >= 0 and r.llm_seconds >= 0 for r in results)
+
+
+def test_iter_extraction_closing_early_stops_requests(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "blank.pdf"
+    _make_blank_pdf(pdf_path, num_pages=5)
+    mock_llm = _page_echo_llm()
+    with _mock_ocr("scanned"):
+        with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
+            pages = iter_extraction(pdf_path, "q", api_key="k", model="m")
+            first = next(pages)
+            pages.close()
+    assert first.page_number == 1
+    assert mock_llm.invoke.call_count == 1
+
+
+def test_run_extraction_reuses_open_document(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=2)
+    with Document(pdf_path) as document:
+        with _mock_ocr("text"):
+            with patch("pdfharvest.extraction._build_llm", return_value=_page_echo_llm()):
+                with patch("pdfharvest.pdf_utils.PdfReader") as reader:
+                    rows, _, total = run_extraction(document, "q", api_key="k", model="m")
+        reader.assert_not_called()
+        assert (len(rows), total) == (3, 2)
+        # Left open for the caller
+        assert document.page_count == 2 and document.page_info(0).text_length == 0
+
+
+@contextmanager
+def _recording_profiles(fail_on: int | None = None) -> Iterator[list[int]]:
+    """Record the zero-based pages Document.profile is called for (optionally failing one)."""
+    profiled: list[int] = []
+    original = Document.profile
+
+    def profile(self, page_index):
+        if page_index == fail_on:
+            raise RuntimeError("broken page")
+        profiled.append(page_index)
+        return original(self, page_index)
+
+    with patch.object(Document, "profile", profile):
+        yield profiled
+
+
+def test_page_text_is_acquired_while_llm_request_is_in_flight(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=20)
+    echo = _page_echo_llm()
+    seen_during_first_request: list[int] = []
+
+    def invoke(messages):
+        if "[Page 1]" in messages[-1].content:
+            time.sleep(0.3)
+            seen_during_first_request.extend(profiled)
+        return echo.invoke.side_effect(messages)
+
+    llm = MagicMock()
+    llm.invoke.side_effect = invoke
+    with _mock_ocr("text"), _recording_profiles() as profiled:
+        with patch("pdfharvest.extraction._build_llm", return_value=llm):
+            rows, _, _ = run_extraction(
+                pdf_path,
+                "q",
+                api_key="k",
+                model="m",
+                max_concurrency=1,
+                ocr_mode="never",
+                prefetch_pages=2,
+            )
+    assert len(rows) == 21
+    # Serial LLM requests, yet later pages were profiled during the first one;
+    # backpressure stops the text stage 2 queued pages (+1 waiting) ahead
+    assert 2 <= len(seen_during_first_request) <= 4
+
+
+def test_prefetch_disabled_acquires_text_between_requests(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=3)
+    echo = _page_echo_llm()
+    seen: list[int] = []
+
+    def invoke(messages):
+        seen.append(len(profiled))
+        return echo.invoke.side_effect(messages)
+
+    llm = MagicMock()
+    llm.invoke.side_effect = invoke
+    with _mock_ocr("text"), _recording_profiles() as profiled:
+        with patch("pdfharvest.extraction._build_llm", return_value=llm):
+            run_extraction(
+                pdf_path,
+                "q",
+                api_key="k",
+                model="m",
+                max_concurrency=1,
+                ocr_mode="never",
+                prefetch_pages=0,
+            )
+    assert seen == [1, 2, 3]
+
+
+def test_page_text_errors_reach_the_caller(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=5)
+    with _mock_ocr("text"), _recording_profiles(fail_on=2):
+        with patch("pdfharvest.extraction._build_llm", return_value=_page_echo_llm()):
+            with pytest.raises(RuntimeError, match="broken page"):
+                run_extraction(pdf_path, "q", api_key="k", model="m")
+
+
+def test_run_extraction_streams_rows_before_reply_finishes(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "blank.pdf"
+    _make_blank_pdf(pdf_path, num_pages=2)
+    streamed: list[tuple[int, list[str] | None, list[list[str]]]] = []
+    seen_mid_reply: list[int] = []
+
+    def stream(messages, **kwargs):
+        human = messages[-1].content
+        page = human.split("[Page ", 1)[1].split("]", 1)[0]
+        header = "page_number,value\n" if "include_header: yes" in human else ""
+        chunks = ["```csv\n" + header + f"{page},fir", f'st\n{page},"sec', f'ond"\n{page},third']
+        for chunk in chunks:
+            yield AIMessageChunk(content=chunk)
+            seen_mid_reply.append(len(streamed))
+        yield AIMessageChunk(content="\n```")
+
+    mock_llm = MagicMock()
+    mock_llm.stream.side_effect = stream
+    with patch("pdfharvest.extraction._build_llm", return_value=mock_llm):
+        rows, extracted, _ = run_extraction(
+            pdf_path,
+            "q",
+            api_key="k",
+            model="m",
+            ocr_mode="never",
+            on_rows=lambda page, header, page_rows: streamed.append((page, header, page_rows)),
+        )
+    mock_llm.invoke.assert_not_called()
+    assert rows == [
+        ["page_number", "value"],
+        ["1", "first"],
+        ["1", "second"],
+        ["1", "third"],
+        ["2", "first"],
+        ["2", "second"],
+        ["2", "third"],
+    ]
+    assert extracted == 2
+    # The first row was reported while the reply was still streaming
+    assert seen_mid_reply[:3] == [0, 1, 2]
+    assert streamed[0] == (1, ["page_number", "value"], [["1", "first"]])
+    assert streamed[2][2] == rows[1:4]
+    assert [page for page, _, _ in streamed] == [1, 1, 1, 2, 2, 2]
+
+
+def test_run_extraction_appends_to_row_store(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "blank.pdf"
+    _make_blank_pdf(pdf_path, num_pages=3)
+    with patch("pdfharvest.extraction._build_llm", return_value=_page_echo_llm()):
+        with RowStore(max_bytes=1, directory=tmp_path / "spill") as store:
+            rows, extracted, total = run_extraction(
+                pdf_path, "q", api_key="k", model="m", ocr_mode="never", output_rows=store
+            )
+            assert rows is store and store.spilled
+            assert list(rows) == [
+                ["page_number", "value"],
+                ["1", "value-1"],
+                ["2", "value-2"],
+                ["3", "value-3"],
+            ]
+    assert (extracted, total) == (3, 3)
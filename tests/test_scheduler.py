@@ -0,0 +1,309 @@
+"""Tests for pdfharvest.scheduler, including end-to-end runs against a stub API server."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+
+import httpx
+import openai
+import pytest
+
+from pdfharvest.exceptions import ExtractionError
+from pdfharvest.extraction import run_extraction
+from pdfharvest.scheduler import LlmScheduler, TokenBucket, retry_after_seconds
+from pdfharvest.telemetry import Telemetry
+from tests.test_run_extraction import _make_blank_pdf
+
+_REQUEST = httpx.Request("POST", "https://example.invalid/v1/chat/completions")
+
+
+class _FakeClock:
+    """Manual clock; sleeping advances it."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _rate_limited(headers: dict[str, str] | None = None) -> openai.RateLimitError:
+    response = httpx.Response(429, headers=headers or {}, request=_REQUEST)
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_token_bucket_reserves_ahead_and_refills() -> None:
+    clock = _FakeClock()
+    bucket = TokenBucket(60, clock=clock)  # one token per second
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    assert bucket.reserve(2) == pytest.approx(3.0)
+    clock.now += 3.0
+    assert bucket.available == pytest.approx(0.0)
+    bucket.adjust(-10)  # usage was lower than reserved
+    assert bucket.available == pytest.approx(10.0)
+    # Requests larger than a minute's worth wait for a full bucket, not forever
+    assert bucket.reserve(1000) == pytest.approx(50.0)
+
+
+def test_retry_after_headers() -> None:
+    assert retry_after_seconds(_rate_limited({"retry-after": "3"})) == 3.0
+    assert retry_after_seconds(_rate_limited({"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(_rate_limited({"retry-after": "soon"})) is None
+    assert retry_after_seconds(_rate_limited()) is None
+    assert retry_after_seconds(openai.APIConnectionError(request=_REQUEST)) is None
+
+
+def test_retry_delay_is_jittered_and_capped() -> None:
+    scheduler = LlmScheduler(base_delay=0.5, max_delay=3.0)
+    error = openai.APIConnectionError(request=_REQUEST)
+    delays = [scheduler.retry_delay(error, 2) for _ in range(50)]
+    assert all(1.0 <= d <= 2.0 for d in delays) and len(set(delays)) > 1
+    assert all(1.5 <= scheduler.retry_delay(error, 10) <= 3.0 for _ in range(10))
+    assert scheduler.retry_delay(_rate_limited({"retry-after": "60"}), 0) == 3.0
+
+
+def test_rate_limit_pauses_and_retries() -> None:
+    clock = _FakeClock()
+    scheduler = LlmScheduler(4, clock=clock, sleep=clock.sleep)
+    replies = iter([_rate_limited({"retry-after": "2"}), "ok"])
+
+    def call() -> str:
+        reply = next(replies)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    retries: list[float] = []
+    assert scheduler.run(call, on_retry=lambda e, delay: retries.append(delay)) == "ok"
+    assert retries == [2.0] and clock.sleeps == [2.0]
+    stats = scheduler.stats()
+    assert (stats.requests, stats.rate_limited, stats.retried, stats.throttled) == (2, 1, 1, 1)
+    assert stats.concurrency == 2
+
+
+def test_non_retryable_errors_fail_immediately() -> None:
+    scheduler = LlmScheduler(sleep=lambda s: None)
+    response = httpx.Response(400, request=_REQUEST)
+    calls = []
+
+    def call() -> None:
+        calls.append(1)
+        raise openai.BadRequestError("bad", response=response, body=None)
+
+    with pytest.raises(openai.BadRequestError):
+        scheduler.run(call)
+    assert len(calls) == 1
+    assert (scheduler.stats().failed, scheduler.stats().retried) == (1, 0)
+
+
+def test_requests_per_minute_throttles() -> None:
+    clock = _FakeClock()
+    scheduler = LlmScheduler(requests_per_minute=60, clock=clock, sleep=clock.sleep)
+    for _ in range(61):
+        scheduler.run(lambda: None)
+    assert clock.sleeps == [pytest.approx(1.0)]
+    assert scheduler.stats().throttled == 1
+
+
+def test_tokens_per_minute_uses_recorded_usage() -> None:
+    clock = _FakeClock()
+    scheduler = LlmScheduler(tokens_per_minute=600, clock=clock, sleep=clock.sleep)
+    scheduler.run(lambda: None, tokens=100)
+    scheduler.record_tokens(100, 580)  # actual usage was much higher
+    scheduler.run(lambda: None, tokens=100)
+    assert clock.sleeps == [pytest.approx(8.0)]  # 80 tokens short at 10 tokens/s
+
+
+def test_concurrent_rate_limits_halve_the_limit_once() -> None:
+    scheduler = LlmScheduler(8, max_retries=1, clock=lambda: 0.0, sleep=lambda s: None)
+    barrier = threading.Barrier(4)
+    attempts: dict[int, int] = {}
+    lock = threading.Lock()
+
+    def call(worker: int) -> None:
+        with lock:
+            attempts[worker] = attempts.get(worker, 0) + 1
+            first = attempts[worker] == 1
+        if first:
+            barrier.wait(timeout=5)
+            raise _rate_limited({"retry-after": "0"})
+
+    threads = [
+        threading.Thread(target=scheduler.run, args=(lambda w=w: call(w),)) for w in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    stats = scheduler.stats()
+    assert (stats.rate_limited, stats.retried, stats.failed) == (4, 4, 0)
+    assert stats.concurrency == 4
+
+
+def test_slow_responses_reduce_then_successes_restore_concurrency() -> None:
+    clock = _FakeClock()
+    scheduler = LlmScheduler(8, clock=clock, sleep=clock.sleep)
+
+    def call_taking(seconds: float):
+        def call() -> None:
+            clock.now += seconds
+
+        return call
+
+    for _ in range(3):
+        scheduler.run(call_taking(1.0))
+    assert scheduler.concurrency == 8
+    for _ in range(4):
+        scheduler.run(call_taking(5.0))
+    assert scheduler.concurrency == 4
+    for _ in range(40):
+        scheduler.run(call_taking(1.0))
+    assert scheduler.concurrency == 8
+
+
+def _completion(content: str) -> dict:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "stub-model",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 50, "completion_tokens": 5, "total_tokens": 55},
+    }
+
+
+def _event_stream(content: str) -> str:
+    """Server-sent events streaming content line by line, then token usage."""
+    chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 0}
+    events = [
+        {**chunk, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+        for piece in content.splitlines(keepends=True)
+    ]
+    events.append(
+        {
+            **chunk,
+            "choices": [],
+            "usage": {"prompt_tokens": 50, "completion_tokens": 5, "total_tokens": 55},
+        }
+    )
+    return "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+
+
+@pytest.fixture
+def stub_api(monkeypatch) -> Iterator[dict]:
+    """
+    OpenAI-compatible chat completions server on localhost.
+
+    Responses are taken from state["script"] (status, headers) in order; once
+    it is empty every request gets a 200 echoing the requested page number
+    (as server-sent events for streaming requests).
+    Connections are kept alive; state["ports"] collects client ports seen.
+    """
+    state: dict = {"script": [], "requests": 0, "ports": set()}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                state["requests"] += 1
+                state["ports"].add(self.client_address[1])
+                status, headers = state["script"].pop(0) if state["script"] else (200, {})
+            content_type = "application/json"
+            if status == 200:
+                human = body["messages"][-1]["content"]
+                page = human.split("[Page ", 1)[1].split("]", 1)[0]
+                content = f"page_number,value\n{page},v{page}"
+                if body.get("stream"):
+                    content_type = "text/event-stream"
+                    data = _event_stream(content).encode()
+                else:
+                    data = json.dumps(_completion(content)).encode()
+            else:
+                payload = {"error": {"message": f"stub {status}", "code": status}}
+                data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENROUTER_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    try:
+        yield state
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_extraction_against_stub_server_retries_429_and_5xx(tmp_path: Path, stub_api) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=2)
+    stub_api["script"] = [(429, {"Retry-After": "0"}), (429, {"Retry-After": "0"}), (503, {})]
+    scheduler = LlmScheduler(2, base_delay=0.01)
+    rows, _, _ = run_extraction(
+        pdf_path, "q", api_key="k", model="stub-model", ocr_mode="never", scheduler=scheduler
+    )
+    assert rows == [["page_number", "value"], ["1", "v1"], ["2", "v2"]]
+    assert stub_api["requests"] == 5
+    stats = scheduler.stats()
+    assert (stats.requests, stats.rate_limited, stats.retried, stats.failed) == (5, 2, 3, 0)
+
+
+def test_extraction_against_stub_server_gives_up(tmp_path: Path, stub_api) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=1)
+    stub_api["script"] = [(400, {})]
+    scheduler = LlmScheduler()
+    with pytest.raises(ExtractionError, match="LLM invocation failed"):
+        run_extraction(
+            pdf_path, "q", api_key="k", model="stub-model", ocr_mode="never", scheduler=scheduler
+        )
+    assert stub_api["requests"] == 1
+    assert scheduler.stats().failed == 1
+
+
+def test_streamed_extraction_against_stub_server(tmp_path: Path, stub_api) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=2)
+    stub_api["script"] = [(429, {"Retry-After": "0"})]
+    streamed: list[tuple[int, list[list[str]]]] = []
+    telemetry = Telemetry()
+    rows, _, _ = run_extraction(
+        pdf_path,
+        "q",
+        api_key="k",
+        model="stub-model",
+        ocr_mode="never",
+        scheduler=LlmScheduler(2, base_delay=0.01),
+        on_event=telemetry,
+        on_rows=lambda page, header, page_rows: streamed.append((page, page_rows)),
+    )
+    assert rows == [["page_number", "value"], ["1", "v1"], ["2", "v2"]]
+    assert streamed == [(1, [["1", "v1"]]), (2, [["2", "v2"]])]
+    summary = telemetry.finish()
+    assert (summary.prompt_tokens, summary.completion_tokens) == (100, 10)
@@ -6,16 +6,22 @@ from pathlib import Path
 import pytest
 
 from pdfharvest.exceptions import StorageError
-from pdfharvest.storage import remove_if_exists, save_upload_to_storage
+from pdfharvest.storage import (
+    file_sha256,
+    release_upload,
+    remove_if_exists,
+    save_upload_to_storage,
+    upload_references,
+)
 
 
 def test_save_upload_to_storage_creates_file(tmp_path: Path) -> None:
     content = b"fake pdf content"
     stream = BytesIO(content)
     result = save_upload_to_storage(stream, tmp_path)
-    assert result.parent == tmp_path
-    assert result.suffix == ".pdf"
-    assert result.read_bytes() == content
+    assert result.path.parent == tmp_path
+    assert result.path.suffix == ".pdf"
+    assert result.path.read_bytes() == content
 
 
 def test_save_upload_to_storage_creates_parent_dirs(tmp_path: Path) -> None:
@@ -23,7 +29,7 @@ def test_save_upload_to_storage_creates_parent_dirs(tmp_path: Path) -> None:
     stream = BytesIO(b"x")
     result = save_upload_to_storage(stream, storage_dir)
     assert storage_dir.exists()
-    assert result.read_bytes() == b"x"
+    assert result.path.read_bytes() == b"x"
 
 
 def test_save_upload_to_storage_respects_chunk_size(tmp_path: Path) -> None:
@@ -43,6 +49,40 @@ def test_save_upload_to_storage_raises_on_write_error(tmp_path: Path) -> None:
         save_upload_to_storage(stream, not_a_dir)
 
 
+def test_save_upload_to_storage_names_file_by_content_hash(tmp_path: Path) -> None:
+    result = save_upload_to_storage(BytesIO(b"abc"), tmp_path, chunk_size=1)
+    assert result.document_id == file_sha256(result.path)
+    assert result.path.name == f"{result.document_id}.pdf"
+    assert not result.reused
+    assert not list(tmp_path.glob(".upload-*"))
+
+
+def test_save_upload_to_storage_deduplicates_identical_uploads(tmp_path: Path) -> None:
+    first = save_upload_to_storage(BytesIO(b"same"), tmp_path)
+    second = save_upload_to_storage(BytesIO(b"same"), tmp_path)
+    other = save_upload_to_storage(BytesIO(b"other"), tmp_path)
+    assert second.path == first.path and second.reused
+    assert other.path != first.path
+    assert len(list(tmp_path.glob("*.pdf"))) == 2
+    assert upload_references(first) == 2
+    assert first.ref != second.ref
+
+
+def test_release_upload_deletes_file_with_last_reference(tmp_path: Path) -> None:
+    first = save_upload_to_storage(BytesIO(b"same"), tmp_path)
+    second = save_upload_to_storage(BytesIO(b"same"), tmp_path)
+    release_upload(first)
+    assert first.path.exists() and upload_references(second) == 1
+    release_upload(first)  # releasing twice does not drop another holder's reference
+    assert first.path.exists()
+    release_upload(second)
+    assert not first.path.exists() and upload_references(second) == 0
+    release_upload(None)
+    # A new upload of the same content after release is written again
+    third = save_upload_to_storage(BytesIO(b"same"), tmp_path)
+    assert not third.reused and third.path.read_bytes() == b"same"
+
+
 def test_remove_if_exists_none() -> None:
     remove_if_exists(None)
 
@@ -58,3 +98,16 @@ def test_remove_if_exists_removes_file(tmp_path: Path) -> None:
     assert f.exists()
     remove_if_exists(f)
     assert not f.exists()
+
+
+def test_file_sha256(tmp_path: Path) -> None:
+    f = tmp_path / "file.pdf"
+    f.write_bytes(b"abc")
+    assert file_sha256(f, chunk_size=1) == (
+        "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
+    )
+
+
+def test_file_sha256_missing_file_raises(tmp_path: Path) -> None:
+    with pytest.raises(StorageError, match="Failed to read"):
+        file_sha256(tmp_path / "missing.pdf")
@@ -0,0 +1,153 @@
+"""Tests for pdfharvest.telemetry and the stage events emitted by extraction."""
+
+import json
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import httpx
+import openai
+import pytest
+
+from pdfharvest.exceptions import ExtractionError
+from pdfharvest.extraction import run_extraction
+from pdfharvest.telemetry import (
+    STAGE_LLM,
+    STAGE_OCR,
+    STAGE_PARSE,
+    STAGE_PROFILE,
+    JsonlExporter,
+    StageEvent,
+    StageSummary,
+    Telemetry,
+    timed_stage,
+    write_prometheus_textfile,
+)
+from tests.test_run_extraction import _make_blank_pdf, _mock_ocr
+
+
+def _usage_llm() -> MagicMock:
+    """Mock LLM whose replies carry token usage like langchain's AIMessage."""
+    llm = MagicMock()
+
+    def invoke(messages):
+        human = messages[-1].content
+        page = human.split("[Page ", 1)[1].split("]", 1)[0]
+        body = f"{page},value-{page}"
+        if "include_header: yes" in human:
+            body = "page_number,value\n" + body
+        return MagicMock(content=body, usage_metadata={"input_tokens": 100, "output_tokens": 7})
+
+    llm.invoke.side_effect = invoke
+    return llm
+
+
+def test_timed_stage_emits_event_with_attrs() -> None:
+    events: list[StageEvent] = []
+    with timed_stage(events.append, STAGE_PARSE, [3], rows=0) as attrs:
+        attrs["rows"] = 2
+    assert len(events) == 1
+    assert (events[0].stage, events[0].pages, events[0].attrs) == (STAGE_PARSE, (3,), {"rows": 2})
+    assert events[0].wall_seconds >= 0 and events[0].cpu_seconds >= 0
+
+
+def test_timed_stage_records_error_and_reraises() -> None:
+    events: list[StageEvent] = []
+    with pytest.raises(ValueError):
+        with timed_stage(events.append, STAGE_LLM, [1]):
+            raise ValueError("boom")
+    assert events[0].attrs["error"] == "ValueError"
+
+
+def test_timed_stage_without_hook_is_noop() -> None:
+    with timed_stage(None, STAGE_LLM, [1], cached=False) as attrs:
+        attrs["cached"] = True
+    assert attrs == {"cached": True}
+
+
+def test_stage_summary_percentiles() -> None:
+    events = [StageEvent(STAGE_LLM, (i,), wall_seconds=float(i)) for i in range(1, 101)]
+    summary = StageSummary.of(events)
+    assert summary.count == 100
+    assert summary.wall_seconds == sum(range(1, 101))
+    assert (summary.p50, summary.p95, summary.max) == (51.0, 96.0, 100.0)
+
+
+def test_run_extraction_reports_stages_and_tokens(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=3)
+    telemetry = Telemetry()
+    with _mock_ocr("text"):
+        with patch("pdfharvest.extraction._build_llm", return_value=_usage_llm()):
+            rows, _, _ = run_extraction(pdf_path, "q", api_key="k", model="m", on_event=telemetry)
+    assert len(rows) == 4
+    stages = {event.stage for event in telemetry.events}
+    assert {STAGE_PROFILE, STAGE_OCR, STAGE_LLM, STAGE_PARSE} <= stages
+    summary = telemetry.summary()
+    assert summary.pages == 3
+    assert summary.llm_requests == 3 and summary.llm_retries == 0
+    assert (summary.prompt_tokens, summary.completion_tokens) == (300, 21)
+    assert summary.ocr_pages == 3
+    assert summary.stages[STAGE_LLM].count == 3
+
+
+def test_llm_connection_errors_are_retried_and_counted(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=1)
+    error = openai.APIConnectionError(request=httpx.Request("POST", "https://example.invalid"))
+    reply = MagicMock(content="page_number,value\n1,a", usage_metadata=None, response_metadata={})
+    llm = MagicMock()
+    llm.invoke.side_effect = [error, reply]
+    telemetry = Telemetry()
+    with _mock_ocr("text"), patch("pdfharvest.scheduler.time.sleep") as sleep:
+        with patch("pdfharvest.extraction._build_llm", return_value=llm):
+            rows, _, _ = run_extraction(pdf_path, "q", api_key="k", model="m", on_event=telemetry)
+    assert rows == [["page_number", "value"], ["1", "a"]]
+    assert sleep.call_count == 1
+    assert telemetry.summary().llm_retries == 1
+
+
+def test_llm_errors_fail_after_max_retries(tmp_path: Path) -> None:
+    pdf_path = tmp_path / "doc.pdf"
+    _make_blank_pdf(pdf_path, num_pages=1)
+    llm = MagicMock()
+    llm.invoke.side_effect = openai.APIConnectionError(
+        request=httpx.Request("POST", "https://example.invalid")
+    )
+    telemetry = Telemetry()
+    with _mock_ocr("text"), patch("pdfharvest.scheduler.time.sleep"):
+        with patch("pdfharvest.extraction._build_llm", return_value=llm):
+            with pytest.raises(ExtractionError):
+                run_extraction(pdf_path, "q", api_key="k", model="m", on_event=telemetry)
+    assert llm.invoke.call_count == 5  # first attempt + DEFAULT_LLM_MAX_RETRIES
+    llm_events = [e for e in telemetry.events if e.stage == STAGE_LLM]
+    assert llm_events[0].attrs["error"] == "ExtractionError"
+
+
+def test_jsonl_exporter_and_prometheus_textfile(tmp_path: Path) -> None:
+    jsonl = tmp_path / "events" / "events.jsonl"
+    prom = tmp_path / "metrics" / "pdfharvest.prom"
+    telemetry = Telemetry([JsonlExporter(jsonl)], prometheus_textfile=prom)
+    telemetry(StageEvent(STAGE_LLM, (1,), 0.5, attrs={"prompt_tokens": 10, "completion_tokens": 2}))
+    telemetry(StageEvent(STAGE_PARSE, (1,), 0.001))
+    summary = telemetry.finish()
+
+    lines = [json.loads(line) for line in jsonl.read_text(encoding="utf-8").splitlines()]
+    assert [line["stage"] for line in lines] == [STAGE_LLM, STAGE_PARSE]
+    assert lines[0]["pages"] == [1] and lines[0]["attrs"]["prompt_tokens"] == 10
+
+    text = prom.read_text(encoding="utf-8")
+    assert "pdfharvest_last_run_pages 1\n" in text
+    assert 'pdfharvest_last_run_tokens{kind="prompt"} 10\n' in text
+    assert 'pdfharvest_last_run_stage_seconds{stage="llm",clock="wall"} 0.500000' in text
+    assert summary.llm_requests == 1
+    # Rewritten in place, no temp files left behind
+    write_prometheus_textfile(summary, prom)
+    assert sorted(p.name for p in prom.parent.iterdir()) == ["pdfharvest.prom"]
+
+
+def test_telemetry_default_reads_environment(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("PDFHARVEST_TELEMETRY_JSONL", str(tmp_path / "events.jsonl"))
+    monkeypatch.delenv("PDFHARVEST_PROMETHEUS_TEXTFILE", raising=False)
+    telemetry = Telemetry.default()
+    assert [e.path for e in telemetry.exporters] == [tmp_path / "events.jsonl"]
+    assert telemetry.prometheus_textfile is None
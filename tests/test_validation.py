@@ -50,3 +50,18 @@ def test_validate_page_range_invalid_limit_raises() -> None:
         validate_page_range("", "x", total_pages=10)
     with pytest.raises(ValidationError, match="positive integer"):
         validate_page_range("", "0", total_pages=10)
+
+
+def test_validate_page_range_accepts_document(tmp_path) -> None:
+    from pypdf import PdfWriter
+
+    from pdfharvest.pdf_utils import Document
+
+    writer = PdfWriter()
+    for _ in range(4):
+        writer.add_blank_page(width=72, height=72)
+    writer.write(tmp_path / "doc.pdf")
+    with Document(tmp_path / "doc.pdf") as document:
+        assert validate_page_range("1", "2", document) == (1, 2)
+        with pytest.raises(ValidationError):
+            validate_page_range("4", "", document)